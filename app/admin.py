@@ -1,29 +1,250 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
 # Register your models here.
 
+from . import moderation
 from .models import *
 
-admin.site.register(User)
-admin.site.register(Place)
-admin.site.register(PlaceImage)
-admin.site.register(Review)
-admin.site.register(TouristGuide)
-admin.site.register(TravelPackage)
-admin.site.register(Itinerary)
-admin.site.register(Event)
-admin.site.register(ForumPost)
-admin.site.register(ForumReply)
-admin.site.register(Wishlist)
-admin.site.register(VisitedPlace)
-admin.site.register(Booking)
-admin.site.register(EventBooking)
-admin.site.register(Notification)
-admin.site.register(OwnershipClaim)
-admin.site.register(TravelStory)
-admin.site.register(FAQ)
-admin.site.register(UserFollow)
 
+class EstimatedCountPaginator(Paginator):
+    """Avoid ``COUNT(*)`` over millions of rows on every changelist page.
 
+    An unfiltered list is sized from the highest primary key, one index
+    probe; a filtered one is counted up to ``exact_limit`` rows only.
+    Small tables still get an exact count.
+    """
 
+    exact_limit = 10_000
 
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            highest = queryset.model._default_manager.order_by('-pk').values_list('pk', flat=True).first() or 0
+            if highest > self.exact_limit:
+                return highest
+        return queryset.order_by()[:self.exact_limit].count()
+
+
+class FastAdmin(admin.ModelAdmin):
+    """Changelist defaults for large tables.
+
+    Subclasses add ``list_select_related`` so ``list_display`` never queries
+    per row, and raw-id or autocomplete widgets so change forms do not load a
+    whole table into a dropdown.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    # The stock filters (is_staff, groups...) are unindexed scans over every user.
+    list_filter = ()
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Profile', {'fields': ('bio', 'profile_image', 'cover_image')}),
+    )
+
+
+@admin.register(Place)
+class PlaceAdmin(FastAdmin):
+    list_display = ('name', 'location', 'country', 'is_verified', 'rating_avg', 'rating_count')
+    list_filter = ('is_verified',)
+    search_fields = ('name', 'slug')
+    raw_id_fields = ('admin',)
+    readonly_fields = ('rating_count', 'rating_sum', 'rating_avg', 'rating_1', 'rating_2', 'rating_3', 'rating_4',
+                       'rating_5')
+
+
+@admin.register(PlaceImage)
+class PlaceImageAdmin(FastAdmin):
+    list_display = ('id', 'place', 'user', 'upload_date', 'is_approved')
+    list_select_related = ('place', 'user')
+    list_filter = ('is_approved',)
+    autocomplete_fields = ('place',)
+    raw_id_fields = ('user',)
+    actions = ('approve', 'reject')
+
+    @admin.action(description='Approve selected images')
+    def approve(self, request, queryset):
+        changed = moderation.set_images_approved(queryset, True)
+        self.message_user(request, f'{changed} images approved.')
+
+    @admin.action(description='Reject selected images')
+    def reject(self, request, queryset):
+        changed = moderation.set_images_approved(queryset, False)
+        self.message_user(request, f'{changed} images rejected.')
+
+
+@admin.register(Review)
+class ReviewAdmin(FastAdmin):
+    list_display = ('id', 'user', 'place', 'rating', 'date', 'is_moderated')
+    list_select_related = ('user', 'place')
+    list_filter = ('is_moderated',)
+    autocomplete_fields = ('place',)
+    raw_id_fields = ('user',)
+    actions = ('approve', 'reject')
+
+    @admin.action(description='Approve selected reviews')
+    def approve(self, request, queryset):
+        changed = moderation.set_reviews_moderated(queryset, True)
+        self.message_user(request, f'{changed} reviews approved.')
+
+    @admin.action(description='Reject selected reviews')
+    def reject(self, request, queryset):
+        changed = moderation.set_reviews_moderated(queryset, False)
+        self.message_user(request, f'{changed} reviews rejected.')
+
+
+@admin.register(TouristGuide)
+class TouristGuideAdmin(FastAdmin):
+    list_display = ('user', 'languages')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(TravelPackage)
+class TravelPackageAdmin(FastAdmin):
+    list_display = ('title', 'guide', 'duration', 'price', 'capacity', 'seats_remaining')
+    list_select_related = ('guide__user',)
+    raw_id_fields = ('guide',)
+
+
+@admin.register(Itinerary)
+class ItineraryAdmin(FastAdmin):
+    list_display = ('package', 'day_number')
+    list_select_related = ('package',)
+    raw_id_fields = ('package',)
+
+
+@admin.register(Event)
+class EventAdmin(FastAdmin):
+    list_display = ('title', 'place', 'event_type', 'start_date', 'end_date', 'capacity', 'seats_remaining')
+    list_select_related = ('place',)
+    autocomplete_fields = ('place',)
+
+
+@admin.register(ForumPost)
+class ForumPostAdmin(FastAdmin):
+    list_display = ('id', 'user', 'place', 'post_date', 'reply_count', 'last_activity_at')
+    list_select_related = ('user', 'place')
+    autocomplete_fields = ('place',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(ForumReply)
+class ForumReplyAdmin(FastAdmin):
+    list_display = ('id', 'post', 'user', 'reply_date')
+    list_select_related = ('post__user', 'post__place', 'user')
+    raw_id_fields = ('post', 'user')
+
+
+@admin.register(Wishlist)
+class WishlistAdmin(FastAdmin):
+    list_display = ('user', 'place', 'date_added')
+    list_select_related = ('user', 'place')
+    autocomplete_fields = ('place',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(VisitedPlace)
+class VisitedPlaceAdmin(FastAdmin):
+    list_display = ('user', 'place', 'visit_date')
+    list_select_related = ('user', 'place')
+    autocomplete_fields = ('place',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(Booking)
+class BookingAdmin(FastAdmin):
+    list_display = ('id', 'user', 'package', 'status', 'seats', 'booking_date')
+    list_select_related = ('user', 'package')
+    raw_id_fields = ('user', 'package')
+
+
+@admin.register(EventBooking)
+class EventBookingAdmin(FastAdmin):
+    list_display = ('id', 'user', 'event', 'status', 'seats', 'date', 'time')
+    list_select_related = ('user', 'event')
+    raw_id_fields = ('user', 'event')
+
+
+@admin.register(Notification)
+class NotificationAdmin(FastAdmin):
+    list_display = ('id', 'user', 'is_read', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(OwnershipClaim)
+class OwnershipClaimAdmin(FastAdmin):
+    list_display = ('id', 'user', 'place', 'status', 'submitted_at')
+    list_select_related = ('user', 'place')
+    list_filter = ('status',)
+    autocomplete_fields = ('place',)
+    raw_id_fields = ('user',)
+    actions = ('approve', 'reject')
+
+    @admin.action(description='Approve selected claims')
+    def approve(self, request, queryset):
+        changed = moderation.set_claims_status(queryset, ClaimStatus.APPROVED)
+        self.message_user(request, f'{changed} claims approved.')
+
+    @admin.action(description='Reject selected claims')
+    def reject(self, request, queryset):
+        changed = moderation.set_claims_status(queryset, ClaimStatus.REJECTED)
+        self.message_user(request, f'{changed} claims rejected.')
+
+
+@admin.register(TravelStory)
+class TravelStoryAdmin(FastAdmin):
+    list_display = ('title', 'user', 'published_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(FAQ)
+class FAQAdmin(FastAdmin):
+    list_display = ('id', 'place', 'question')
+    list_select_related = ('place',)
+    autocomplete_fields = ('place',)
+
+
+@admin.register(UserFollow)
+class UserFollowAdmin(FastAdmin):
+    list_display = ('follower', 'followed', 'followed_at')
+    list_select_related = ('follower', 'followed')
+    raw_id_fields = ('follower', 'followed')
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(FastAdmin):
+    list_display = ('user', 'followers', 'following', 'stories', 'reviews', 'places_visited', 'wishlist')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    # Maintained by signals and ``rebuild_user_stats``; edits here would only be reconciled away.
+    readonly_fields = ('followers', 'following', 'stories', 'reviews', 'places_visited', 'wishlist')
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(FastAdmin):
+    list_display = ('name', 'ref_count', 'created_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'ref_count', 'created_at')
+
+
+@admin.register(ImageUpload)
+class ImageUploadAdmin(FastAdmin):
+    list_display = ('id', 'user', 'place', 'filename', 'size', 'received', 'status', 'updated_at')
+    list_select_related = ('user', 'place')
+    list_filter = ('status',)
+    raw_id_fields = ('user', 'place', 'image')
+    readonly_fields = ('received', 'status', 'error', 'image')
@@ -0,0 +1,44 @@
+import functools
+
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotFound
+
+from ..performance import TimedJSONRenderer
+
+
+_renderer = TimedJSONRenderer()
+
+
+def json_response(data, status=200, headers=None):
+    """Render ``data`` exactly as DRF's ``JSONRenderer`` would for a sync view."""
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json', headers=headers)
+
+
+def async_api_view(methods=('GET',)):
+    """The parts of ``@api_view`` an async, read-only view needs, without its thread hop.
+
+    DRF views are synchronous, so under ASGI each one runs in a worker
+    thread.  This keeps the view on the event loop, exposes ``query_params``
+    so the helpers in ``params`` and ``pagination`` work unchanged, and turns
+    ``APIException`` and ``Http404`` into the same JSON errors DRF returns.
+    Requests are anonymous: there is no authentication or permission check.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _error(MethodNotAllowed(request.method), headers={'Allow': ', '.join(methods)})
+            request.query_params = request.GET
+            try:
+                return await view(request, *args, **kwargs)
+            except Http404 as exc:
+                return _error(NotFound(*exc.args))
+            except APIException as exc:
+                return _error(exc)
+        return wrapper
+    return decorator
+
+
+def _error(exc, headers=None):
+    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return json_response(detail, status=exc.status_code, headers=headers)
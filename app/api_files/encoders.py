@@ -0,0 +1,184 @@
+"""Read-only serialization straight from ``values_list()`` rows.
+
+A ``ModelSerializer`` builds a model instance per row, then for every
+field looks the attribute up and calls the field's ``to_representation``;
+on large listings that costs far more than the query.  ``row_encoder()``
+reads the serializer's fields once and compiles a function turning one
+``values_list()`` tuple into the dict the serializer would have produced,
+with each field's conversion inlined (a ``DecimalField`` is quantized and
+formatted exactly as DRF does it, a ``TimeField`` becomes its ISO string,
+a foreign key is its raw ``_id`` column).  Rendered by the same renderer,
+the bytes are identical to the serializer's.
+
+Only fields reading one model column through an unmodified DRF
+``to_representation`` can be compiled; anything else (method fields,
+nested serializers, custom fields) raises ``UnsupportedField`` when the
+encoder is built, never while rows are encoded.
+"""
+
+import decimal
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.query import ValuesListIterable
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from ..performance import TimedSerializerMixin
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+def _decimal(field):
+    if field.localize or field.normalize_output:
+        raise UnsupportedField(f'{field.field_name}: localized or normalized decimals are not compiled')
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None:
+        return (lambda value: '{:f}'.format(value)) if coerce_to_string else None
+    # The same quantum, rounding and precision as DecimalField.quantize().
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    if coerce_to_string:
+        return lambda value: '{:f}'.format(value.quantize(quantum, rounding=rounding, context=context))
+    return lambda value: value.quantize(quantum, rounding=rounding, context=context)
+
+
+def _time(field):
+    output_format = getattr(field, 'format', api_settings.TIME_FORMAT)
+    if output_format is None:
+        return None
+    if output_format.lower() == ISO_8601:
+        return lambda value: value.isoformat()
+    return lambda value: value.strftime(output_format)
+
+
+# DRF field class -> builder of the conversion its to_representation applies to a
+# column value (None: the value is already its representation).  A field matches
+# only if it inherits that exact to_representation.
+CONVERTERS = [
+    (serializers.PrimaryKeyRelatedField, lambda field: None),
+    (serializers.BooleanField, lambda field: bool),
+    (serializers.IntegerField, lambda field: int),
+    (serializers.FloatField, lambda field: float),
+    (serializers.CharField, lambda field: str),
+    (serializers.DecimalField, _decimal),
+    (serializers.TimeField, _time),
+    (serializers.ReadOnlyField, lambda field: None),
+]
+
+
+def _column(model, field):
+    """The ``values_list()`` column ``field`` reads, and whether it can be NULL."""
+    if '.' in field.source or field.source == '*':
+        raise UnsupportedField(f'{field.field_name}: source {field.source!r} is not a column')
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise UnsupportedField(f'{field.field_name}: {model.__name__} has no field {field.source!r}')
+    if not model_field.concrete or model_field.many_to_many:
+        raise UnsupportedField(f'{field.field_name}: {field.source!r} is not a column')
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is not None:
+        raise UnsupportedField(f'{field.field_name}: pk_field is not compiled')
+    return model_field.attname, model_field.null
+
+
+def _converter(field):
+    for base, build in CONVERTERS:
+        if type(field).to_representation is base.to_representation:
+            return build(field)
+    raise UnsupportedField(f'{field.field_name}: {type(field).__name__} is not compiled')
+
+
+class RowIterable(ValuesListIterable):
+    # ValuesListIterable runs its query as soon as it is iterated, while
+    # aiterator() creates the iterator on the event loop; deferring the query
+    # to the first next() lets aiterator() run it in a thread like any other.
+    def __iter__(self):
+        yield from super().__iter__()
+
+
+class RowEncoder:
+    """Encodes rows of ``values(queryset)`` as ``serializer_class`` would encode their instances.
+
+    ``to_representation()`` takes one row, so the encoder can stand in for
+    a serializer in ``stream_json_array()``.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        # Only the timing wrapper may sit in front of Serializer.to_representation.
+        own = next(klass for klass in serializer_class.__mro__
+                   if klass is not TimedSerializerMixin and 'to_representation' in vars(klass))
+        if own is not serializers.Serializer:
+            raise UnsupportedField(f'{serializer_class.__name__} overrides to_representation')
+        serializer = serializer_class(fields=list(fields)) if fields is not None else serializer_class()
+        self.model = serializer_class.Meta.model
+        self.columns = []
+        items, namespace = [], {}
+        for index, field in enumerate(serializer._readable_fields):
+            column, null = _column(self.model, field)
+            convert = _converter(field)
+            self.columns.append(column)
+            value = f'row[{index}]'
+            if convert is not None:
+                namespace[f'convert_{index}'] = convert
+                value = f'convert_{index}({value})'
+                if null:
+                    value = f'(None if row[{index}] is None else {value})'
+            items.append(f'{field.field_name!r}: {value}')
+        self.columns = tuple(self.columns)
+        source = f"def encode(row):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f'<row encoder for {serializer_class.__name__}>', 'exec'), namespace)
+        self.to_representation = namespace['encode']
+
+    def _selected(self, ordering):
+        extra = []
+        for name in ordering:
+            column = self.model._meta.get_field(name.lstrip('-')).attname
+            if column not in self.columns and column not in extra:
+                extra.append(column)
+        return (*self.columns, *extra)
+
+    def values(self, queryset, ordering=()):
+        """``queryset`` as the tuples the encoder reads, plus any ``ordering`` column a cursor needs."""
+        rows = queryset.values_list(*self._selected(ordering))
+        rows._iterable_class = RowIterable
+        return rows
+
+    def position(self, row, ordering):
+        """``position_of()`` for a row of ``values(queryset, ordering)``."""
+        selected = self._selected(ordering)
+        return [row[selected.index(self.model._meta.get_field(name.lstrip('-')).attname)] for name in ordering]
+
+    def encode(self, rows):
+        return list(map(self.to_representation, rows))
+
+
+# Clients choose ?fields=, so the cache is bounded whatever subsets they ask for.
+ENCODER_CACHE_SIZE = 256
+
+
+@functools.cache
+def _declared_fields(serializer_class):
+    return tuple(serializer_class().fields)
+
+
+@functools.lru_cache(maxsize=ENCODER_CACHE_SIZE)
+def _cached_encoder(serializer_class, fields):
+    return RowEncoder(serializer_class, fields)
+
+
+def row_encoder(serializer_class, fields=None):
+    """The compiled ``RowEncoder`` of ``serializer_class``, restricted to ``fields`` if given; built once.
+
+    ``fields`` is taken in declared order without repeats, as the serializer
+    renders it, so every spelling of one projection shares an encoder.
+    """
+    if fields is not None:
+        fields = set(fields)
+        fields = tuple(name for name in _declared_fields(serializer_class) if name in fields)
+    return _cached_encoder(serializer_class, fields)
@@ -0,0 +1,118 @@
+import base64
+import datetime
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+from .params import get_int
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(values):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would skip rows
+    # that differ from the cursor only in microseconds.
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """The values ``encode_cursor`` wrote for ``ordering``, converted back to ``model``'s field types.
+
+    Cursors come from the client, so anything that does not decode into one
+    valid, non-null value per field is rejected rather than queried with.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise NotFound('Invalid cursor')
+    try:
+        values = [_field(model, name).to_python(value) for name, value in zip(ordering, values)]
+    except (TypeError, ValueError, ValidationError):
+        raise NotFound('Invalid cursor')
+    if None in values:
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def _field(model, name):
+    *path, last = name.lstrip('-').split('__')
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(last)
+
+
+def position_of(obj, ordering):
+    values = []
+    for field in ordering:
+        value = obj
+        for attr in field.lstrip('-').split('__'):
+            value = getattr(value, attr)
+        values.append(value)
+    return values
+
+
+def after_position(ordering, values):
+    """Build a ``Q`` matching rows that sort strictly after ``values``."""
+    clauses = []
+    for i, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clause = Q(**{f'{field.lstrip("-")}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            clause &= Q(**{previous.lstrip('-'): value})
+        clauses.append(clause)
+    return reduce(operator.or_, clauses)
+
+
+def apply_cursor(request, queryset, ordering):
+    """Order ``queryset`` by ``ordering`` and skip past ``?cursor=``, if any.
+
+    ``ordering`` must end in a unique, non-null column (normally ``id``) so
+    the position of every row is total and stable.
+    """
+    queryset = queryset.order_by(*ordering)
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        queryset = queryset.filter(after_position(ordering, decode_cursor(cursor, queryset.model, ordering)))
+    return queryset
+
+
+def paginate_keyset(request, queryset, ordering, default_limit=DEFAULT_LIMIT, max_limit=MAX_LIMIT,
+                    position=position_of):
+    """Return one keyset page of ``queryset`` and the URL of the next one.
+
+    ``position(row, ordering)`` reads the cursor values from the last row;
+    pass one when the rows are not model instances.
+    """
+    limit = get_int(request, 'limit', default_limit, minimum=1, maximum=max_limit)
+    rows = list(apply_cursor(request, queryset, ordering)[:limit + 1])
+    return _page(request, rows, ordering, limit, position)
+
+
+async def apaginate_keyset(request, queryset, ordering, default_limit=DEFAULT_LIMIT, max_limit=MAX_LIMIT,
+                           position=position_of):
+    """``paginate_keyset`` for async views."""
+    limit = get_int(request, 'limit', default_limit, minimum=1, maximum=max_limit)
+    rows = [obj async for obj in apply_cursor(request, queryset, ordering)[:limit + 1]]
+    return _page(request, rows, ordering, limit, position)
+
+
+def _page(request, rows, ordering, limit, position):
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = encode_cursor(position(rows[-1], ordering))
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+    return rows, next_url
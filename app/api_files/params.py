@@ -0,0 +1,83 @@
+import datetime
+
+from rest_framework.exceptions import ValidationError
+
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+
+def get_bool(request, name, default=False):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    return value.lower() in TRUE_VALUES
+
+
+def get_int(request, name, default=None, minimum=None, maximum=None):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'A valid integer is required.'})
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def get_fields(request, serializer_class):
+    """Parse ``?fields=a,b,c`` against the fields declared on ``serializer_class``.
+
+    Returns ``None`` when the parameter is absent so callers can skip the
+    projection entirely.
+    """
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    requested = [name.strip() for name in value.split(',') if name.strip()]
+    available = serializer_class().fields
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}."})
+    return requested
+
+
+def get_float(request, name, default=None, minimum=None, maximum=None, required=False):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        if required:
+            raise ValidationError({name: 'This parameter is required.'})
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValidationError({name: 'A valid number is required.'})
+    if value != value:
+        raise ValidationError({name: 'A valid number is required.'})
+    if minimum is not None and value < minimum:
+        raise ValidationError({name: f'Must be at least {minimum}.'})
+    if maximum is not None and value > maximum:
+        raise ValidationError({name: f'Must be at most {maximum}.'})
+    return value
+
+
+def get_date(request, name, default=None, required=False):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        if required:
+            raise ValidationError({name: 'This parameter is required.'})
+        return default
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'A valid date (YYYY-MM-DD) is required.'})
+
+
+def get_choice(request, name, choices, default):
+    value = request.query_params.get(name, default)
+    if value not in choices:
+        raise ValidationError({name: f"Must be one of: {', '.join(choices)}."})
+    return value
@@ -1,10 +1,240 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from ..models import Place
+from .. import counters
+from ..performance import TimedSerializerMixin
+from ..models import FAQ, Activity, Booking, Event, EventBooking, ForumPost, ForumReply, ImageUpload, Itinerary, Notification, Place, PlaceImage, Review, TouristGuide, TravelPackage, TravelStory, User, UserStats
 
 
 
 
-class PlaceSerializer(serializers.ModelSerializer):
+class ModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """The base of every model serializer here, so its time shows up in ``Server-Timing``."""
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Expose a rendition map as absolute URLs plus ready-made ``srcset`` strings."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        result = {'width': value['width'], 'height': value['height'], 'srcset': {}, 'urls': {}}
+        for fmt, sizes in value.items():
+            if not isinstance(sizes, dict):
+                continue
+            urls = {}
+            for width, name in sorted(sizes.items(), key=lambda item: int(item[0])):
+                url = default_storage.url(name)
+                urls[width] = request.build_absolute_uri(url) if request is not None else url
+            result['urls'][fmt] = urls
+            result['srcset'][fmt] = ', '.join(f'{url} {width}w' for width, url in urls.items())
+        return result
+
+
+class DynamicFieldsModelSerializer(ModelSerializer):
+    """A ModelSerializer that accepts a ``fields`` argument restricting its output."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class PlaceSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Place
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['rating_count', 'rating_sum', 'rating_avg',
+                            'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+class NearbyPlaceSerializer(PlaceSerializer):
+    distance_km = serializers.FloatField(read_only=True)
+
+
+class ScoredPlaceSerializer(PlaceSerializer):
+    score = serializers.FloatField(read_only=True)
+
+
+class PlaceImageSerializer(ModelSerializer):
+    renditions = ImageRenditionsField(source='image_renditions')
+
+    class Meta:
+        model = PlaceImage
+        fields = ['id', 'place', 'user', 'image', 'renditions', 'upload_date', 'is_approved']
+
+
+class UserSummarySerializer(ModelSerializer):
+    profile_image_renditions = ImageRenditionsField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_image', 'profile_image_renditions']
+
+
+class UserStatsSerializer(ModelSerializer):
+    class Meta:
+        model = UserStats
+        fields = ['followers', 'following', 'stories', 'reviews', 'places_visited', 'wishlist']
+
+
+class UserProfileSerializer(ModelSerializer):
+    """A public profile; expects the user with ``stats`` joined in (see ``counters.stats_for``)."""
+
+    profile_image_renditions = ImageRenditionsField()
+    cover_image_renditions = ImageRenditionsField()
+    stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'bio', 'profile_image', 'profile_image_renditions', 'cover_image',
+                  'cover_image_renditions', 'joined_date', 'stats']
+
+    def get_stats(self, user):
+        return UserStatsSerializer(counters.stats_for(user)).data
+
+
+class TravelPackageSerializer(ModelSerializer):
+    renditions = ImageRenditionsField(source='image_renditions')
+
+    class Meta:
+        model = TravelPackage
+        exclude = ['image_renditions']
+
+
+class ItinerarySerializer(ModelSerializer):
+    class Meta:
+        model = Itinerary
+        fields = ['day_number', 'description']
+
+
+class GuideSummarySerializer(ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+    languages = serializers.SlugRelatedField(source='language_tags', slug_field='code', many=True, read_only=True)
+
+    class Meta:
+        model = TouristGuide
+        fields = ['id', 'user', 'languages']
+
+
+class PackageCatalogueSerializer(TravelPackageSerializer):
+    """A package with its guide and ordered days; expects ``package_catalogue_queryset()``."""
+
+    guide = GuideSummarySerializer(read_only=True)
+    itineraries = ItinerarySerializer(many=True, read_only=True)
+
+
+class TravelStorySerializer(ModelSerializer):
+    renditions = ImageRenditionsField(source='image_renditions')
+
+    class Meta:
+        model = TravelStory
+        exclude = ['image_renditions']
+
+
+class ReviewSerializer(ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user', 'rating', 'content', 'date']
+
+
+class EventSerializer(ModelSerializer):
+    class Meta:
+        model = Event
+        fields = ['id', 'title', 'description', 'start_date', 'end_date', 'event_type']
+
+
+class EventPlaceSerializer(ModelSerializer):
+    class Meta:
+        model = Place
+        fields = ['id', 'name', 'slug', 'country', 'state', 'location']
+
+
+class CalendarEventSerializer(EventSerializer):
+    place = EventPlaceSerializer(read_only=True)
+
+    class Meta(EventSerializer.Meta):
+        fields = [*EventSerializer.Meta.fields, 'place']
+
+
+class FAQSerializer(ModelSerializer):
+    class Meta:
+        model = FAQ
+        fields = ['id', 'question', 'answer']
+
+
+class ForumPostSerializer(ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = ForumPost
+        fields = ['id', 'user', 'content', 'post_date', 'reply_count']
+
+
+class ForumThreadSerializer(ForumPostSerializer):
+    class Meta(ForumPostSerializer.Meta):
+        fields = [*ForumPostSerializer.Meta.fields, 'last_activity_at']
+
+
+class ForumReplySerializer(ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = ForumReply
+        fields = ['id', 'user', 'content', 'reply_date']
+
+
+class PlaceDetailSerializer(PlaceSerializer):
+    """A place with its related content; expects ``place_detail_queryset()``."""
+
+    images = PlaceImageSerializer(source='approved_images', many=True, read_only=True)
+    reviews = ReviewSerializer(source='latest_reviews', many=True, read_only=True)
+    events = EventSerializer(source='upcoming_events', many=True, read_only=True)
+    faqs = FAQSerializer(many=True, read_only=True)
+    forum_posts = ForumPostSerializer(source='latest_forum_posts', many=True, read_only=True)
+
+
+class ActivitySerializer(ModelSerializer):
+    actor = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Activity
+        fields = ['id', 'verb', 'actor', 'object_id', 'place', 'created_at']
+
+
+class NotificationSerializer(ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'content', 'is_read', 'created_at']
+
+
+class BookingSerializer(ModelSerializer):
+    class Meta:
+        model = Booking
+        fields = ['id', 'package', 'status', 'seats', 'booking_date', 'hold_expires_at', 'idempotency_key']
+
+
+class EventBookingSerializer(ModelSerializer):
+    class Meta:
+        model = EventBooking
+        fields = ['id', 'event', 'status', 'seats', 'date', 'time', 'hold_expires_at', 'idempotency_key']
+
+
+class ImageUploadRequestSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+
+class ImageUploadSerializer(ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'place', 'filename', 'size', 'received', 'status', 'error', 'image', 'created_at']
+
+
+class BookingRequestSerializer(serializers.Serializer):
+    seats = serializers.IntegerField(min_value=1, max_value=20, default=1)
+    hold = serializers.BooleanField(default=False)
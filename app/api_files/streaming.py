@@ -0,0 +1,62 @@
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+STREAM_CHUNK_SIZE = 2000
+FLUSH_EVERY = 100
+
+
+def _encoded_rows(serializer, queryset, chunk_size):
+    # Same options as DRF's JSONRenderer so streamed and buffered bodies match.
+    encode = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    buffer = ['[']
+    first = True
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        if not first:
+            buffer.append(',')
+        first = False
+        buffer.append(encode(serializer.to_representation(obj)))
+        if len(buffer) >= FLUSH_EVERY:
+            yield ''.join(buffer)
+            buffer = []
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+async def _aencoded_rows(serializer, queryset, chunk_size):
+    encode = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    buffer = ['[']
+    first = True
+    async for obj in queryset.aiterator(chunk_size=chunk_size):
+        if not first:
+            buffer.append(',')
+        first = False
+        buffer.append(encode(serializer.to_representation(obj)))
+        if len(buffer) >= FLUSH_EVERY:
+            yield ''.join(buffer)
+            buffer = []
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+def stream_json_array(serializer, queryset, chunk_size=STREAM_CHUNK_SIZE):
+    """Stream ``queryset`` as a JSON array, encoding rows as they leave the cursor.
+
+    ``serializer`` may also be a ``RowEncoder`` over a ``values_list()`` queryset.
+    """
+    return StreamingHttpResponse(
+        _encoded_rows(serializer, queryset, chunk_size),
+        content_type='application/json',
+    )
+
+
+def astream_json_array(serializer, queryset, chunk_size=STREAM_CHUNK_SIZE):
+    """``stream_json_array`` for async views: rows are fetched with ``aiterator()``.
+
+    Under ASGI the body is produced on the event loop; only the database
+    fetches, one per ``chunk_size`` rows, run in a thread.
+    """
+    return StreamingHttpResponse(
+        _aencoded_rows(serializer, queryset, chunk_size),
+        content_type='application/json',
+    )
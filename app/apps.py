@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class appConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from . import performance, signals  # noqa: F401
+        performance.install()
@@ -0,0 +1,5 @@
+"""Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks never touch the configured database: they run inside a throwaway
+file-backed copy created with the test-database machinery.
+"""
@@ -0,0 +1,101 @@
+"""Running the app under real servers, for the HTTP benchmarks.
+
+The server processes import a generated settings module that points the
+database at the benchmark's scratch file, so they serve exactly the data
+the command generated.
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+# Imported by the server processes in place of main.settings.
+SETTINGS_MODULE = '''from main.settings import *
+from main.database import sqlite_database
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1']
+DATABASES = {{'default': sqlite_database({path!r}, SQLITE_PRAGMAS)}}
+if SQLITE_READ_REPLICA:
+    DATABASES['replica'] = sqlite_database({path!r}, SQLITE_PRAGMAS, read_only=True)
+# Measure the read path itself, not the response cache.
+RESPONSE_CACHE_ENABLED = False
+FEED_WORKERS = 0
+IMAGE_RENDITION_WORKERS = 0
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, options):
+    if server == 'gunicorn':
+        return [
+            sys.executable, '-m', 'gunicorn', 'main.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--worker-class', 'gthread', '--workers', str(options['workers']), '--threads', str(options['threads']),
+            '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'main.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(options['workers']), '--log-level', 'warning', '--no-access-log',
+    ]
+
+
+def wait_until_serving(port, path, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'Server exited with status {process.returncode}.')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', path)
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server on port {port} did not answer within {timeout}s.')
+
+
+def require_servers(command):
+    missing = [name for name in ('gunicorn', 'uvicorn') if find_spec(name) is None]
+    if missing:
+        raise CommandError(f"{command} needs {' and '.join(missing)}: pip install {' '.join(missing)}")
+
+
+def server_environment(directory, path):
+    """Environment for server processes serving the database at ``path``; the settings go in ``directory``."""
+    with open(os.path.join(directory, 'bench_settings.py'), 'w') as module:
+        module.write(SETTINGS_MODULE.format(path=str(path)))
+    return {
+        **os.environ, 'DJANGO_SETTINGS_MODULE': 'bench_settings',
+        'PYTHONPATH': os.pathsep.join([directory, str(settings.BASE_DIR), os.environ.get('PYTHONPATH', '')]),
+    }
+
+
+@contextmanager
+def serving(server, options, env, probe_path):
+    """Run ``server`` (gunicorn or uvicorn) on a free port until the block ends; yields the port."""
+    port = free_port()
+    process = subprocess.Popen(server_command(server, port, options), env=env, cwd=settings.BASE_DIR)
+    try:
+        wait_until_serving(port, probe_path, process)
+        yield port
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
@@ -0,0 +1,225 @@
+"""The benchmark suite run by ``manage.py bench_suite``, and how its runs are compared.
+
+Each benchmark is a function taking the ``Fixture`` (ids picked from the
+generated data) and returning the callable to time.  Serializer benchmarks
+render already-loaded rows, so they time serialization alone; queryset
+benchmarks evaluate each of ``canonical_queries()``; view benchmarks run a
+request through the whole Django stack in process.  Alongside the latency
+percentiles every benchmark records how many queries one call ran, on every
+database alias, since a query count that grows is a regression whatever the
+timings say.
+
+Results are plain JSON, ``{"meta": {...}, "results": {name: {...}}}``, so
+CI can keep the file of a known-good run and ``compare()`` a new one
+against it.
+"""
+
+import datetime
+import platform
+import sys
+from contextlib import ExitStack
+from dataclasses import dataclass
+
+import django
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+
+from ..api_files.encoders import row_encoder
+from ..api_files.serializers import (
+    CalendarEventSerializer, ForumReplySerializer, PackageCatalogueSerializer, PlaceDetailSerializer, PlaceSerializer,
+    UserProfileSerializer,
+)
+from ..event_calendar import CALENDAR_ORDERING, events_between
+from ..forum import REPLY_ORDERING
+from ..models import ForumPost, ForumReply, Place, User
+from ..queries import canonical_queries, package_catalogue_queryset, place_detail_queryset
+from .utils import measure
+
+
+FORMAT_VERSION = 1
+# Synthetic events run through 2024 and 2025; "now" sits in the middle so calendars and upcoming events have rows.
+NOW = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@dataclass
+class Fixture:
+    """Rows the benchmarks read: the busiest place, user and thread rather than arbitrary ones."""
+
+    place_id: int
+    user_id: int
+    thread_id: int
+    now: datetime.datetime = NOW
+
+    @classmethod
+    def pick(cls, now=NOW):
+        place_id = Place.objects.order_by('-rating_count', 'id').values_list('id', flat=True).first()
+        users = User.objects.annotate(count=Count('followers')).order_by('-count', 'id')
+        user_id = users.values_list('id', flat=True).first()
+        thread_id = ForumPost.objects.order_by('-reply_count', 'id').values_list('id', flat=True).first()
+        return cls(place_id=place_id or 1, user_id=user_id or 1, thread_id=thread_id or 1, now=now)
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# Serializers: rows are loaded once, only rendering is timed.
+
+@benchmark('serializer place list')
+def place_list(fixture):
+    places = list(Place.objects.order_by('id')[:500])
+    return lambda: PlaceSerializer(places, many=True).data
+
+
+@benchmark('serializer place list, row encoder')
+def place_list_rows(fixture):
+    encoder = row_encoder(PlaceSerializer)
+    rows = list(encoder.values(Place.objects.order_by('id')[:500]))
+    return lambda: encoder.encode(rows)
+
+
+@benchmark('serializer place detail')
+def place_detail(fixture):
+    place = place_detail_queryset(fixture.now).get(pk=fixture.place_id)
+    return lambda: PlaceDetailSerializer(place).data
+
+
+@benchmark('serializer package catalogue')
+def package_catalogue(fixture):
+    packages = list(package_catalogue_queryset().order_by('price', 'id')[:100])
+    return lambda: PackageCatalogueSerializer(packages, many=True).data
+
+
+@benchmark('serializer event calendar')
+def event_calendar(fixture):
+    events = events_between(fixture.now, fixture.now + datetime.timedelta(days=31))
+    events = list(events.order_by(*CALENDAR_ORDERING)[:500])
+    return lambda: CalendarEventSerializer(events, many=True).data
+
+
+@benchmark('serializer thread replies')
+def thread_replies(fixture):
+    replies = ForumReply.objects.filter(post_id=fixture.thread_id).select_related('user')
+    replies = list(replies.order_by(*REPLY_ORDERING)[:200])
+    return lambda: ForumReplySerializer(replies, many=True).data
+
+
+@benchmark('serializer user profile')
+def user_profile(fixture):
+    user = User.objects.select_related('stats').get(pk=fixture.user_id)
+    return lambda: UserProfileSerializer(user).data
+
+
+# Views: the whole request, in process; the caller disables the response cache.
+VIEWS = {
+    'view place list': '/app/?limit=50',
+    'view place list by rating': '/app/?limit=50&ordering=-rating',
+    'view place detail': '/app/places/{fixture.place_id}/',
+    'view places nearby': '/app/places/nearby?lat=27.7172&lng=85.3240&radius_km=25',
+    'view similar places': '/app/places/{fixture.place_id}/similar',
+    'view place forum': '/app/places/{fixture.place_id}/forum',
+    'view thread replies': '/app/forum/{fixture.thread_id}/replies',
+    'view event calendar': '/app/events?from={day}&to={day}',
+    'view package catalogue': '/app/packages',
+    'view user profile': '/app/users/{fixture.user_id}/',
+}
+
+
+def view_benchmarks(fixture):
+    """``{name: callable}`` issuing each of ``VIEWS`` through the test client."""
+    client = Client()
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise AssertionError(f'GET {url} answered {response.status_code}')
+        return response
+
+    return {
+        name: (lambda url=path.format(fixture=fixture, day=fixture.now.date()): get(url))
+        for name, path in VIEWS.items()
+    }
+
+
+def queryset_benchmarks(fixture):
+    """``{name: callable}`` evaluating each canonical query afresh."""
+    return {
+        f'query {label}': (lambda queryset=queryset: list(queryset.all()))
+        for label, queryset in canonical_queries(fixture.place_id, fixture.user_id, fixture.now)
+    }
+
+
+def count_queries(fn):
+    """How many queries one call of ``fn`` runs, across every database alias."""
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        # Wrappers neither open connections nor need DEBUG, unlike CaptureQueriesContext.
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        fn()
+    return count
+
+
+def run(fixture, repeat=20, warmup=2, only=None, log=None):
+    """Time every benchmark whose name contains ``only`` (any of them when None); ``{name: result}``."""
+    log = log or (lambda name, result: None)
+    setups = {name: setup(fixture) for name, setup in BENCHMARKS.items() if not only or only in name}
+    for group in (queryset_benchmarks(fixture), view_benchmarks(fixture)):
+        setups.update({name: fn for name, fn in group.items() if not only or only in name})
+    results = {}
+    for name, fn in setups.items():
+        results[name] = {**measure(fn, repeat, warmup), 'queries': count_queries(fn)}
+        log(name, results[name])
+    return results
+
+
+def report(results, **meta):
+    """The JSON document for one run: ``results`` plus what it ran on."""
+    return {
+        'meta': {
+            'format': FORMAT_VERSION,
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'machine': platform.machine(),
+            'platform': platform.platform(terse=True),
+            **meta,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, tolerance=0.25, min_delta_ms=0.5):
+    """Regressions of ``current`` against ``baseline`` (both ``report()`` documents), as messages.
+
+    A benchmark regresses when it runs more queries or fails more requests,
+    or when its median is more than ``tolerance`` slower and by at least
+    ``min_delta_ms``, so sub-millisecond jitter never fails a build.
+    Benchmarks missing from either run are ignored, as are query counts a
+    run did not record (the HTTP load driver's).
+    """
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if 'queries' in now and now['queries'] > before.get('queries', now['queries']):
+            regressions.append(f"{name}: {before['queries']} -> {now['queries']} queries")
+        if now.get('errors', 0) > before.get('errors', 0):
+            regressions.append(f"{name}: {before.get('errors', 0)} -> {now['errors']} errors")
+        slower = now['p50_ms'] - before['p50_ms']
+        if slower >= min_delta_ms and now['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {before['p50_ms']:.2f}ms -> {now['p50_ms']:.2f}ms")
+    return regressions
@@ -0,0 +1,498 @@
+import datetime
+import itertools
+import random
+from collections import Counter
+
+from django.db import transaction
+
+from .. import counters, event_calendar, feed, forum, notifications, recommendations, search
+from ..guides import language_codes
+from ..models import (
+    FAQ, Activity, Booking, BookingStatus, ClaimStatus, Event, EventBooking, ForumPost, ForumReply, GuideLanguage,
+    Itinerary, Notification, OwnershipClaim, Place, PlaceImage, Review, TouristGuide, TravelPackage, TravelStory,
+    User, UserFollow, VisitedPlace, Wishlist,
+)
+from ..ratings import rebuild_place_ratings
+
+
+BATCH_SIZE = 5000
+
+# Rough centres for clustered synthetic places: Kathmandu, Pokhara, Delhi,
+# Paris, New York, Tokyo, Sydney, Rio, Cape Town and Fiji (near the antimeridian).
+CLUSTERS = [
+    (27.7172, 85.3240), (28.2096, 83.9856), (28.6139, 77.2090), (48.8566, 2.3522),
+    (40.7128, -74.0060), (35.6762, 139.6503), (-33.8688, 151.2093), (-22.9068, -43.1729),
+    (-33.9249, 18.4241), (-17.7134, 178.0650),
+]
+
+
+WORDS = (
+    'temple stupa lake trek mountain valley river waterfall sunrise sunset festival market '
+    'village monastery heritage museum garden forest trail summit glacier bridge palace '
+    'square courtyard viewpoint hike boating paragliding rafting wildlife safari jungle '
+    'spicy momo tea coffee guide permit ticket crowd quiet peaceful beautiful stunning '
+    'crowded expensive cheap friendly clean dusty muddy steep easy difficult family '
+    'photography history culture architecture carving pagoda shrine prayer flags bells'
+).split()
+
+
+# A long tail of made-up words (``kalami``, ``roteshi``...) so that, as in real
+# text, most terms are rare and only a handful appear everywhere.
+SYLLABLES = 'ka la mi pu ro te shi na bo du ri ge'.split()
+RARE_WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+def word(rng):
+    return rng.choice(WORDS) if rng.random() < 0.7 else rng.choice(RARE_WORDS)
+
+
+def sentence(rng, words=12):
+    return ' '.join(word(rng) for _ in range(words)).capitalize() + '.'
+
+
+def paragraph(rng, sentences=4):
+    return ' '.join(sentence(rng, rng.randint(6, 18)) for _ in range(sentences))
+
+
+def _batched(rows, model, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def make_users(count, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    start = User.objects.count()
+    with transaction.atomic():
+        _batched(
+            (User(username=f'user{start + i}', email=f'user{start + i}@example.com', bio=f'bio {rng.random()}')
+             for i in range(count)),
+            User, batch_size,
+        )
+    return list(User.objects.values_list('id', flat=True))
+
+
+def random_point(rng, spread_km=150.0):
+    """A point scattered around one of the cluster centres, or anywhere at all."""
+    if rng.random() < 0.2:
+        return rng.uniform(-60, 70), rng.uniform(-180, 180)
+    lat, lng = rng.choice(CLUSTERS)
+    spread = spread_km / 111.0
+    lat = min(89.9, max(-89.9, rng.gauss(lat, spread)))
+    lng = (rng.gauss(lng, spread) + 180) % 360 - 180
+    return lat, lng
+
+
+def place_rows(count, seed=0, admin_ids=None, slug_prefix=None):
+    """Field dicts for ``count`` synthetic places; ``slug_prefix`` adds slugs ``<prefix>-<i>``."""
+    rng = random.Random(seed)
+    for i in range(count):
+        lat, lng = random_point(rng)
+        row = dict(
+            name=f'Place {i}',
+            short_description=f'Short description of place {i}',
+            long_description=paragraph(rng),
+            country='Nepal' if i % 3 == 0 else 'Elsewhere',
+            state=f'State {i % 50}',
+            location=f'Location {i % 500}',
+            latitude=round(lat, 6),
+            longitude=round(lng, 6),
+            opening_time=datetime.time(rng.randint(5, 10)),
+            closing_time=datetime.time(rng.randint(16, 22)),
+            admin_id=rng.choice(admin_ids) if admin_ids else None,
+            is_verified=rng.random() < 0.3,
+        )
+        if slug_prefix:
+            row['slug'] = f'{slug_prefix}-{i}'
+        yield row
+
+
+def make_places(count, seed=0, admin_ids=None, batch_size=BATCH_SIZE):
+    with transaction.atomic():
+        _batched((Place(**row) for row in place_rows(count, seed, admin_ids)), Place, batch_size)
+
+
+def make_reviews(count, user_ids, place_ids, seed=0, moderated_ratio=0.8, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        _batched(
+            (Review(user_id=rng.choice(user_ids), place_id=rng.choice(place_ids), rating=rng.randint(1, 5),
+                    content=paragraph(rng, rng.randint(1, 4)), is_moderated=rng.random() < moderated_ratio)
+             for _ in range(count)),
+            Review, batch_size,
+        )
+
+
+def make_faqs(count, place_ids, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        _batched(
+            (FAQ(place_id=rng.choice(place_ids), question=sentence(rng, 8).rstrip('.') + '?', answer=paragraph(rng, 2))
+             for _ in range(count)),
+            FAQ, batch_size,
+        )
+
+
+EVENT_TYPES = ['festival', 'concert', 'exhibition', 'market', 'tour', 'workshop', 'ceremony', 'sport']
+
+
+def event_duration(rng):
+    """Mostly a few hours, sometimes several days, occasionally a season-long exhibition."""
+    roll = rng.random()
+    if roll < 0.7:
+        return datetime.timedelta(hours=rng.randint(1, 8))
+    if roll < 0.95:
+        return datetime.timedelta(days=rng.randint(1, 7))
+    return datetime.timedelta(days=rng.randint(30, 120))
+
+
+def make_events(count, place_ids, seed=0, start=None, days=730, batch_size=BATCH_SIZE):
+    """Events spread evenly over ``days`` from ``start`` (two years from 2024-01-01 by default)."""
+    rng = random.Random(seed)
+    start = start or datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    span = days * 86400
+
+    def rows():
+        for _ in range(count):
+            begins = start + datetime.timedelta(seconds=rng.randrange(span) // 900 * 900)
+            yield Event(place_id=rng.choice(place_ids), title=sentence(rng, 4).rstrip('.'),
+                        description=sentence(rng), start_date=begins, end_date=begins + event_duration(rng),
+                        event_type=rng.choice(EVENT_TYPES))
+
+    with transaction.atomic():
+        _batched(rows(), Event, batch_size)
+
+
+def make_stories(count, user_ids, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        _batched(
+            (TravelStory(user_id=rng.choice(user_ids), title=sentence(rng, 5).rstrip('.'), content=paragraph(rng, 8))
+             for _ in range(count)),
+            TravelStory, batch_size,
+        )
+
+
+def popularity(ids, rng, skew=1.0):
+    """``(ranked ids, cumulative weights)`` for ``rng.choices``: a few ids are picked far more than the rest."""
+    ranked = list(ids)
+    rng.shuffle(ranked)
+    return ranked, list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(len(ranked))))
+
+
+def make_follows(user_ids, per_user=50, skew=1.1, seed=0, batch_size=BATCH_SIZE):
+    """Follow edges whose targets follow a power law: a few users get most followers."""
+    rng = random.Random(seed)
+    ranked, cum_weights = popularity(user_ids, rng, skew)
+
+    def rows():
+        for follower in user_ids:
+            targets = set(rng.choices(ranked, cum_weights=cum_weights, k=rng.randint(1, per_user * 2)))
+            targets.discard(follower)
+            for followed in targets:
+                yield UserFollow(follower_id=follower, followed_id=followed)
+
+    with transaction.atomic():
+        _batched(rows(), UserFollow, batch_size)
+
+
+def _new_ids(model, after):
+    return list(model.objects.filter(pk__gt=after).order_by('pk').values_list('pk', flat=True))
+
+
+def _last_id(model):
+    return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def _moment(rng, days=730):
+    """A time within ``days`` before 2026-01-01."""
+    end = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    return end - datetime.timedelta(seconds=rng.randrange(days * 86400))
+
+
+def make_popular_reviews(count, user_ids, place_ids, seed=0, moderated_ratio=0.8, batch_size=BATCH_SIZE):
+    """Reviews concentrated on popular places, as real reviews are; ratings lean positive."""
+    rng = random.Random(seed)
+    places, cum_weights = popularity(place_ids, rng)
+    with transaction.atomic():
+        _batched(
+            (Review(user_id=rng.choice(user_ids), place_id=rng.choices(places, cum_weights=cum_weights)[0],
+                    rating=rng.choices((1, 2, 3, 4, 5), weights=(5, 7, 15, 35, 38))[0],
+                    content=paragraph(rng, rng.randint(1, 4)), is_moderated=rng.random() < moderated_ratio)
+             for _ in range(count)),
+            Review, batch_size,
+        )
+
+
+def make_images(count, user_ids, place_ids, seed=0, approved_ratio=0.7, batch_size=BATCH_SIZE):
+    """Image rows for popular places; the names point at no file, so nothing renders them."""
+    rng = random.Random(seed)
+    places, cum_weights = popularity(place_ids, rng)
+    with transaction.atomic():
+        _batched(
+            (PlaceImage(place_id=rng.choices(places, cum_weights=cum_weights)[0], user_id=rng.choice(user_ids),
+                        image=f'synthetic/places/{i}.jpg', is_approved=rng.random() < approved_ratio)
+             for i in range(count)),
+            PlaceImage, batch_size,
+        )
+
+
+LANGUAGES = ['English', 'Nepali', 'Hindi', 'French', 'German', 'Japanese', 'Mandarin', 'Spanish', 'Tibetan']
+
+
+def make_guides(user_ids, seed=0, batch_size=BATCH_SIZE):
+    """A guide for each of ``user_ids``, with the language tags the signal would have written."""
+    rng = random.Random(seed)
+    after = _last_id(TouristGuide)
+    with transaction.atomic():
+        _batched(
+            (TouristGuide(user_id=user_id, languages=', '.join(rng.sample(LANGUAGES, rng.randint(1, 3))),
+                          contact_info=f'guide{user_id}@example.com', about=paragraph(rng, 2))
+             for user_id in user_ids),
+            TouristGuide, batch_size,
+        )
+        guides = TouristGuide.objects.filter(pk__gt=after).values_list('pk', 'languages')
+        _batched(
+            (GuideLanguage(guide_id=guide_id, code=code)
+             for guide_id, languages in guides.iterator() for code in language_codes(languages)),
+            GuideLanguage, batch_size,
+        )
+    return _new_ids(TouristGuide, after)
+
+
+def make_packages(count, guide_ids, seed=0, batch_size=BATCH_SIZE):
+    """Packages of 1 to 14 days with one itinerary row per day; capacity is unlimited."""
+    rng = random.Random(seed)
+    after = _last_id(TravelPackage)
+    with transaction.atomic():
+        _batched(
+            (TravelPackage(guide_id=rng.choice(guide_ids), title=sentence(rng, 4).rstrip('.'),
+                           description=paragraph(rng, 3), duration=rng.randint(1, 14),
+                           price=f'{rng.randint(50, 5000)}.{rng.choice(("00", "50", "99"))}',
+                           inclusions=sentence(rng), exclusions=sentence(rng))
+             for _ in range(count)),
+            TravelPackage, batch_size,
+        )
+        packages = TravelPackage.objects.filter(pk__gt=after).values_list('pk', 'duration')
+        _batched(
+            (Itinerary(package_id=package_id, day_number=day, description=sentence(rng))
+             for package_id, duration in packages.iterator() for day in range(1, duration + 1)),
+            Itinerary, batch_size,
+        )
+    return _new_ids(TravelPackage, after)
+
+
+def make_forum(posts, replies, user_ids, place_ids, seed=0, batch_size=BATCH_SIZE):
+    """Threads on popular places and replies on popular threads; run ``rebuild_thread_stats`` after."""
+    rng = random.Random(seed)
+    places, place_weights = popularity(place_ids, rng)
+    after = _last_id(ForumPost)
+    with transaction.atomic():
+        _batched(
+            (ForumPost(user_id=rng.choice(user_ids), place_id=rng.choices(places, cum_weights=place_weights)[0],
+                       content=paragraph(rng, rng.randint(1, 3)))
+             for _ in range(posts)),
+            ForumPost, batch_size,
+        )
+        threads, thread_weights = popularity(_new_ids(ForumPost, after), rng)
+        _batched(
+            (ForumReply(post_id=rng.choices(threads, cum_weights=thread_weights)[0], user_id=rng.choice(user_ids),
+                        content=sentence(rng, rng.randint(5, 30)))
+             for _ in range(replies if threads else 0)),
+            ForumReply, batch_size,
+        )
+
+
+def make_wishlists(user_ids, place_ids, per_user=5, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    places, cum_weights = popularity(place_ids, rng)
+
+    def rows():
+        for user_id in user_ids:
+            for place_id in set(rng.choices(places, cum_weights=cum_weights, k=rng.randint(0, per_user * 2))):
+                yield Wishlist(user_id=user_id, place_id=place_id)
+
+    with transaction.atomic():
+        _batched(rows(), Wishlist, batch_size)
+
+
+def make_visits(user_ids, place_ids, per_user=5, seed=0, batch_size=BATCH_SIZE):
+    """Visits to popular places; some users go back to the same place."""
+    rng = random.Random(seed)
+    places, cum_weights = popularity(place_ids, rng)
+    with transaction.atomic():
+        _batched(
+            (VisitedPlace(user_id=user_id, place_id=place_id, visit_date=_moment(rng).date())
+             for user_id in user_ids
+             for place_id in rng.choices(places, cum_weights=cum_weights, k=rng.randint(0, per_user * 2))),
+            VisitedPlace, batch_size,
+        )
+
+
+def _booking_status(rng):
+    return rng.choices((BookingStatus.CONFIRMED, BookingStatus.CANCELLED), weights=(9, 1))[0]
+
+
+def make_bookings(count, user_ids, package_ids, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        _batched(
+            (Booking(user_id=rng.choice(user_ids), package_id=rng.choice(package_ids), status=_booking_status(rng),
+                     seats=rng.randint(1, 4))
+             for _ in range(count if package_ids else 0)),
+            Booking, batch_size,
+        )
+
+
+def make_event_bookings(count, user_ids, event_ids, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        _batched(
+            (EventBooking(user_id=rng.choice(user_ids), event_id=rng.choice(event_ids), date=_moment(rng).date(),
+                          time=datetime.time(rng.randint(8, 20)), status=_booking_status(rng),
+                          seats=rng.randint(1, 4))
+             for _ in range(count if event_ids else 0)),
+            EventBooking, batch_size,
+        )
+
+
+def make_notifications(count, user_ids, seed=0, read_ratio=0.6, batch_size=BATCH_SIZE):
+    """Notifications plus the unread counters ``notify()`` would have kept."""
+    rng = random.Random(seed)
+    unread = Counter()
+
+    def rows():
+        for _ in range(count):
+            notification = Notification(user_id=rng.choice(user_ids), content=sentence(rng, 8),
+                                        is_read=rng.random() < read_ratio)
+            if not notification.is_read:
+                unread[notification.user_id] += 1
+            yield notification
+
+    with transaction.atomic():
+        _batched(rows(), Notification, batch_size)
+        notifications.increment_unread(unread)
+
+
+def make_claims(count, user_ids, place_ids, seed=0, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        _batched(
+            (OwnershipClaim(user_id=rng.choice(user_ids), place_id=rng.choice(place_ids),
+                            status=rng.choice(ClaimStatus.values))
+             for _ in range(count)),
+            OwnershipClaim, batch_size,
+        )
+
+
+def make_activities(limit, batch_size=BATCH_SIZE):
+    """Feed activity for the newest ``limit`` stories, moderated reviews and visits each, left to fan out."""
+    sources = [
+        (Activity.STORY, TravelStory.objects.all(), 'published_at', None),
+        (Activity.REVIEW, Review.objects.filter(is_moderated=True), 'date', 'place_id'),
+        (Activity.VISIT, VisitedPlace.objects.all(), 'visit_date', 'place_id'),
+    ]
+    with transaction.atomic():
+        for verb, rows, created_field, place_field in sources:
+            rows = rows.order_by('-pk').values_list('user_id', 'pk', created_field, place_field or 'pk')[:limit]
+            _batched(
+                (Activity(actor_id=actor_id, verb=verb, object_id=object_id, created_at=_as_datetime(created_at),
+                          place_id=place_id if place_field else None)
+                 for actor_id, object_id, created_at, place_id in rows.iterator()),
+                Activity, batch_size,
+            )
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.combine(value, datetime.time(12), tzinfo=datetime.timezone.utc)
+
+
+# Per-place or per-user volumes of everything ``make_dataset`` writes.
+DATASET_RATIOS = {
+    'users_per_place': 0.5,
+    'reviews_per_place': 10,
+    'images_per_place': 3,
+    'events_per_place': 1,
+    'faqs_per_place': 2,
+    'threads_per_place': 0.5,
+    'replies_per_thread': 4,
+    'claims_per_place': 0.01,
+    'guides_per_user': 0.02,
+    'packages_per_guide': 3,
+    'stories_per_user': 0.2,
+    'follows_per_user': 20,
+    'wishlist_per_user': 5,
+    'visits_per_user': 5,
+    'bookings_per_user': 0.5,
+    'notifications_per_user': 5,
+    # Newest of each kind to put in feeds; fanning out costs a few milliseconds per activity.
+    'activities': 1_000,
+}
+
+
+def make_dataset(places, seed=0, derive=True, log=None, **ratios):
+    """Fill every table at a scale set by the number of places, from a few to millions.
+
+    Volumes follow ``DATASET_RATIOS`` (override any with keyword arguments)
+    and popular places and users attract most of the reviews, images,
+    threads, visits and followers.  Rows are bulk inserted, bypassing the
+    signals, so with ``derive`` every table the signals maintain (ratings,
+    thread stats, profile counters, calendar weeks, search index,
+    recommendations, feeds) is then rebuilt from the source tables.
+    Returns the row count of each model written.
+    """
+    ratios = {**DATASET_RATIOS, **ratios}
+    log = log or (lambda message: None)
+
+    def scaled(base, name):
+        return int(base * ratios[name])
+
+    log(f'{places:,} places and {max(10, scaled(places, "users_per_place")):,} users')
+    user_ids = make_users(max(10, scaled(places, 'users_per_place')), seed=seed)
+    make_places(places, seed=seed, admin_ids=user_ids[:max(1, len(user_ids) // 100)])
+    place_ids = list(Place.objects.values_list('id', flat=True))
+    users, total_places = len(user_ids), len(place_ids)
+
+    log('reviews, images, events and FAQs')
+    make_popular_reviews(scaled(total_places, 'reviews_per_place'), user_ids, place_ids, seed=seed)
+    make_images(scaled(total_places, 'images_per_place'), user_ids, place_ids, seed=seed)
+    make_events(scaled(total_places, 'events_per_place'), place_ids, seed=seed)
+    make_faqs(scaled(total_places, 'faqs_per_place'), place_ids, seed=seed)
+    threads = scaled(total_places, 'threads_per_place')
+    make_forum(threads, int(threads * ratios['replies_per_thread']), user_ids, place_ids, seed=seed)
+    make_claims(scaled(total_places, 'claims_per_place'), user_ids, place_ids, seed=seed)
+
+    log('guides, packages, stories, follows, wishlists, visits, bookings and notifications')
+    guide_ids = make_guides(random.Random(seed).sample(user_ids, max(1, scaled(users, 'guides_per_user'))), seed=seed)
+    package_ids = make_packages(int(len(guide_ids) * ratios['packages_per_guide']), guide_ids, seed=seed)
+    make_stories(scaled(users, 'stories_per_user'), user_ids, seed=seed)
+    make_follows(user_ids, per_user=max(1, scaled(1, 'follows_per_user')), seed=seed)
+    make_wishlists(user_ids, place_ids, per_user=ratios['wishlist_per_user'], seed=seed)
+    make_visits(user_ids, place_ids, per_user=ratios['visits_per_user'], seed=seed)
+    event_ids = list(Event.objects.values_list('id', flat=True))
+    make_bookings(scaled(users, 'bookings_per_user'), user_ids, package_ids, seed=seed)
+    make_event_bookings(scaled(users, 'bookings_per_user'), user_ids, event_ids, seed=seed)
+    make_notifications(scaled(users, 'notifications_per_user'), user_ids, seed=seed)
+    make_activities(ratios['activities'])
+
+    if derive:
+        log('derived tables: ratings, threads, counters, calendar, search, recommendations, feeds')
+        rebuild_place_ratings()
+        forum.rebuild_thread_stats()
+        counters.reconcile()
+        event_calendar.rebuild()
+        if search.is_available():
+            search.rebuild_index()
+        recommendations.refresh(full=True)
+        feed.drain_pending()
+
+    from django.apps import apps
+
+    return {model.__name__: model.objects.count() for model in apps.get_app_config('app').get_models()}
@@ -0,0 +1,63 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection, connections
+
+from main.database import read_only_name
+
+
+@contextmanager
+def scratch_database():
+    """Create a fresh, migrated database file for the duration of the block.
+
+    Aliases that mirror ``default`` in tests (the read replica) are pointed at
+    the scratch file read-only, so routed reads see the benchmark data.
+    """
+    directory = tempfile.mkdtemp(prefix='seekerwithin-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    original_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    mirrors = {
+        alias: connections[alias].settings_dict['NAME'] for alias in connections
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias
+    }
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].settings_dict['NAME'] = read_only_name(connection.settings_dict['NAME'])
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        for alias, name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = original_test_name
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def percentile(samples, fraction):
+    """The ``fraction`` percentile of already sorted ``samples`` (0 when empty)."""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Call ``fn`` repeatedly and return latency percentiles in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'min_ms': round(samples[0], 3),
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'max_ms': round(samples[-1], 3),
+    }
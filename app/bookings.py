@@ -0,0 +1,187 @@
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import cache, notifications
+from .models import Booking, BookingStatus, Event, EventBooking, TravelPackage
+
+
+# Resource model -> (booking model, name of the booking's FK to the resource).
+BOOKING_MODELS = {
+    TravelPackage: (Booking, 'package'),
+    Event: (EventBooking, 'event'),
+}
+
+RESOURCE_MODELS = {booking_model: (model, field) for model, (booking_model, field) in BOOKING_MODELS.items()}
+
+# Cached responses that show a resource's seats_remaining; events are served without it.
+SEAT_CACHE_NAMESPACES = {
+    TravelPackage: lambda pk: ['packages', f'package:{pk}'],
+}
+
+ACTIVE_STATUSES = (BookingStatus.HELD, BookingStatus.CONFIRMED)
+
+
+class BookingError(Exception):
+    pass
+
+
+class SoldOut(BookingError):
+    pass
+
+
+class InvalidTransition(BookingError):
+    pass
+
+
+def _hold_ttl():
+    return datetime.timedelta(seconds=getattr(settings, 'BOOKING_HOLD_SECONDS', 600))
+
+
+def take_seats(resource_model, resource_id, seats):
+    """Atomically claim ``seats``; ``UPDATE ... WHERE seats_remaining >= seats``.
+
+    Resources without a capacity are unlimited and always succeed.
+    """
+    claimed = resource_model.objects.filter(
+        Q(seats_remaining__gte=seats) | Q(capacity__isnull=True), pk=resource_id,
+    ).update(seats_remaining=F('seats_remaining') - seats)
+    if claimed:
+        _seats_changed(resource_model, resource_id)
+    return bool(claimed)
+
+
+def recount_seats(resource_model, resource_id):
+    """Set ``seats_remaining`` to capacity less the active bookings' seats, in one UPDATE.
+
+    It never drops below zero: while a reduced capacity is still overbooked
+    the resource stays sold out, and cancellations pay off that deficit
+    before any seat is offered again.
+    """
+    booking_model, resource_field = BOOKING_MODELS[resource_model]
+    taken = (
+        booking_model.objects.filter(status__in=ACTIVE_STATUSES, **{resource_field: OuterRef('pk')})
+        .values(resource_field).annotate(total=Sum('seats')).values('total')
+    )
+    resource_model.objects.filter(pk=resource_id, capacity__isnull=False).update(
+        seats_remaining=Greatest(F('capacity') - Coalesce(Subquery(taken), 0, output_field=IntegerField()), 0),
+    )
+    _seats_changed(resource_model, resource_id)
+
+
+def _seats_changed(resource_model, resource_id):
+    namespaces = SEAT_CACHE_NAMESPACES.get(resource_model)
+    if namespaces is not None:
+        transaction.on_commit(lambda: cache.invalidate(*namespaces(resource_id)))
+
+
+def _existing(booking_model, user_id, idempotency_key):
+    if not idempotency_key:
+        return None
+    return booking_model.objects.filter(user_id=user_id, idempotency_key=idempotency_key).first()
+
+
+def reserve(resource, user_id, seats=1, idempotency_key=None, hold=False):
+    """Book ``seats`` on an Event or TravelPackage without ever overselling.
+
+    Returns ``(booking, created)``.  A repeated ``idempotency_key`` returns the
+    original booking instead of taking more seats.  With ``hold=True`` the
+    booking is ``HELD`` until ``confirm`` or until ``BOOKING_HOLD_SECONDS``
+    pass, after which ``expire_holds`` gives the seats back.  Raises
+    ``SoldOut`` when not enough seats remain.
+
+    The conditional decrement is the first statement of the transaction, so
+    on SQLite the write lock is taken up front and held only briefly.
+    """
+    resource_model = type(resource)
+    booking_model, resource_field = BOOKING_MODELS[resource_model]
+    existing = _existing(booking_model, user_id, idempotency_key)
+    if existing is not None:
+        return existing, False
+
+    fields = {
+        'user_id': user_id,
+        resource_field: resource,
+        'seats': seats,
+        'idempotency_key': idempotency_key or None,
+        'status': BookingStatus.HELD if hold else BookingStatus.CONFIRMED,
+        'hold_expires_at': timezone.now() + _hold_ttl() if hold else None,
+    }
+    if booking_model is EventBooking:
+        start = timezone.localtime(resource.start_date)
+        fields.update(date=start.date(), time=start.time())
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                if take_seats(resource_model, resource.pk, seats):
+                    return booking_model.objects.create(**fields), True
+        except IntegrityError:
+            # Lost an idempotency race: the other request's booking stands.
+            existing = _existing(booking_model, user_id, idempotency_key)
+            if existing is not None:
+                return existing, False
+            raise
+        if attempt == 0 and not expire_holds(resource_model, resource.pk):
+            break
+    raise SoldOut(f'Not enough seats left for {resource}.')
+
+
+def _transition(booking, from_statuses, to_status, release, extra=None):
+    booking_model = type(booking)
+    resource_model, resource_field = RESOURCE_MODELS[booking_model]
+    with transaction.atomic():
+        changed = booking_model.objects.filter(pk=booking.pk, status__in=from_statuses, **(extra or {})).update(
+            status=to_status,
+        )
+        if not changed:
+            return False
+        if release:
+            recount_seats(resource_model, getattr(booking, f'{resource_field}_id'))
+    booking.status = to_status
+    return True
+
+
+def confirm(booking):
+    """Turn an unexpired hold into a confirmed booking."""
+    if not _transition(booking, [BookingStatus.HELD], BookingStatus.CONFIRMED, release=False,
+                       extra={'hold_expires_at__gt': timezone.now()}):
+        raise InvalidTransition('Only an unexpired hold can be confirmed.')
+    notifications.notify(booking.user_id, f'Your booking #{booking.pk} is now {BookingStatus.CONFIRMED.label}.')
+
+
+def cancel(booking):
+    if not _transition(booking, ACTIVE_STATUSES, BookingStatus.CANCELLED, release=True):
+        raise InvalidTransition('Only held or confirmed bookings can be cancelled.')
+    notifications.notify(booking.user_id, f'Your booking #{booking.pk} is now {BookingStatus.CANCELLED.label}.')
+
+
+def expire_holds(resource_model=None, resource_id=None, now=None):
+    """Expire lapsed holds and return their seats; returns the number expired."""
+    now = now or timezone.now()
+    expired = 0
+    for model, (booking_model, resource_field) in BOOKING_MODELS.items():
+        if resource_model is not None and model is not resource_model:
+            continue
+        holds = booking_model.objects.filter(status=BookingStatus.HELD, hold_expires_at__lte=now)
+        if resource_id is not None:
+            holds = holds.filter(**{f'{resource_field}_id': resource_id})
+        for booking in holds.only('id', 'user_id', 'seats', f'{resource_field}_id'):
+            if _transition(booking, [BookingStatus.HELD], BookingStatus.EXPIRED, release=True):
+                expired += 1
+                notifications.notify(booking.user_id, f'Your hold on booking #{booking.pk} has expired.')
+    return expired
+
+
+def capacity_changed(resource):
+    """Recount ``seats_remaining`` after ``resource``'s capacity was edited."""
+    resource_model = type(resource)
+    with transaction.atomic():
+        if resource.capacity is None:
+            resource_model.objects.filter(pk=resource.pk).update(seats_remaining=None)
+        else:
+            recount_seats(resource_model, resource.pk)
@@ -0,0 +1,282 @@
+import csv
+import datetime
+import itertools
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import bookings, cache, event_calendar, search
+from .models import FAQ, Event, Place, PlaceImage, generate_slug
+from .signals import CACHE_NAMESPACES
+
+
+FORMATS = ('jsonl', 'csv')
+
+
+class Spec:
+    """How one model is written to and read from a file.
+
+    ``fields`` are the columns, in order; ``place`` is written as the place's
+    slug.  ``key`` is the natural key rows are upserted on.
+    """
+
+    def __init__(self, model, fields, key, search_kind=None):
+        self.model = model
+        self.fields = fields
+        self.key = key
+        self.search_kind = search_kind
+
+    @property
+    def own_fields(self):
+        return [name for name in self.fields if name != 'place']
+
+
+SPECS = {
+    'place': Spec(
+        Place,
+        ['slug', 'name', 'short_description', 'long_description', 'country', 'state', 'location',
+         'latitude', 'longitude', 'opening_time', 'closing_time', 'is_verified'],
+        key=('slug',), search_kind='place',
+    ),
+    'faq': Spec(FAQ, ['place', 'question', 'answer'], key=('place', 'question'), search_kind='faq'),
+    'event': Spec(
+        Event, ['place', 'title', 'description', 'start_date', 'end_date', 'event_type', 'capacity'],
+        key=('place', 'title', 'start_date'),
+    ),
+    'image': Spec(PlaceImage, ['place', 'image', 'is_approved'], key=('place', 'image')),
+}
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def detect_format(path, default='jsonl'):
+    suffix = str(path).rsplit('.', 1)[-1].lower()
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(suffix, default)
+
+
+# Export
+
+def export_rows(kind, chunk_size=2000):
+    """Stream the rows of ``kind`` as dicts in primary-key order."""
+    spec = SPECS[kind]
+    queryset = spec.model.objects.order_by('pk')
+    if 'place' in spec.fields:
+        queryset = queryset.values(*spec.own_fields, place_slug=F('place__slug'))
+    else:
+        queryset = queryset.values(*spec.fields)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        if 'place_slug' in row:
+            row['place'] = row.pop('place_slug')
+        yield {name: row[name] for name in spec.fields}
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _json_value(value):
+    # DjangoJSONEncoder rounds times to milliseconds, so a re-imported row would miss its natural key.
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def write_rows(stream, fmt, kind, rows):
+    """Write ``rows`` to a text stream; returns how many were written."""
+    written = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=SPECS[kind].fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({name: _csv_value(value) for name, value in row.items()})
+            written += 1
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        for row in rows:
+            stream.write(encoder.encode({name: _json_value(value) for name, value in row.items()}))
+            stream.write('\n')
+            written += 1
+    return written
+
+
+# Import
+
+def read_rows(stream, fmt):
+    """Lazily yield ``(line_number, dict)`` from a JSON Lines or CSV text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise BulkImportError(f'line {number}: {exc}')
+        yield number, row
+
+
+def _clean(spec, number, row):
+    values = {}
+    for name in spec.own_fields:
+        field = spec.model._meta.get_field(name)
+        raw = row.get(name)
+        # CSV has no null: an empty cell is a missing value, except for text.
+        if raw is None or (raw == '' and not isinstance(field, (models.CharField, models.TextField))):
+            if field.null:
+                values[name] = None
+            elif field.has_default():
+                values[name] = field.get_default()
+            else:
+                raise BulkImportError(f'line {number}: {name} is required')
+            continue
+        try:
+            value = field.to_python(raw)
+        except ValidationError as exc:
+            raise BulkImportError(f'line {number}: {name}: {exc.messages[0]}')
+        if isinstance(value, datetime.datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values[name] = value
+    return values
+
+
+def _place_ids(slugs):
+    slugs = list(slugs)
+    ids = {}
+    for start in range(0, len(slugs), 5000):
+        ids.update(Place.objects.filter(slug__in=slugs[start:start + 5000]).values_list('slug', 'id'))
+    return ids
+
+
+def _upsert_places(spec, rows, batch_size):
+    """``INSERT ... ON CONFLICT (slug) DO UPDATE`` through ``executemany``.
+
+    Bypasses ``bulk_create``'s per-row compiler work, which dominates the cost
+    of wide rows; imported columns are overwritten, the rating aggregates kept.
+    """
+    db = transaction.get_connection()
+    fields = [field for field in Place._meta.concrete_fields if not field.primary_key]
+    columns = ', '.join(db.ops.quote_name(field.column) for field in fields)
+    updates = ', '.join(
+        f'{name} = excluded.{name}' for name in (
+            db.ops.quote_name(Place._meta.get_field(field).column) for field in spec.fields if field != 'slug'
+        )
+    )
+    sql = (
+        f'INSERT INTO {Place._meta.db_table} ({columns}) VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT (slug) DO UPDATE SET {updates}'
+    )
+    params = [
+        [field.get_db_prep_save(values[field.name] if field.name in values else field.get_default(), db)
+         for field in fields]
+        for values in rows
+    ]
+    with db.cursor() as cursor:
+        for start in range(0, len(params), batch_size):
+            cursor.executemany(sql, params[start:start + batch_size])
+
+
+def _import_places(spec, chunk, batch_size):
+    by_slug = {}
+    for number, row in chunk:
+        values = _clean(spec, number, row)
+        values['slug'] = values.get('slug') or generate_slug(values['name'])
+        by_slug[values['slug']] = values  # a later duplicate in the same chunk wins
+    existing = _place_ids(by_slug)
+    _upsert_places(spec, by_slug.values(), batch_size)
+    # Deferred instances are cheap to build; only the pk is needed from here on.
+    objects = [Place.from_db(None, ['id'], [pk]) for pk in _place_ids(by_slug).values()]
+    return len(by_slug) - len(existing), len(existing), objects
+
+
+def _import_related(spec, chunk, batch_size):
+    model = spec.model
+    cleaned = []
+    for number, row in chunk:
+        values = _clean(spec, number, row)
+        values['place_slug'] = row.get('place')
+        cleaned.append((number, values))
+    place_ids = _place_ids({values['place_slug'] for _, values in cleaned})
+
+    by_key = {}
+    for number, values in cleaned:
+        slug = values.pop('place_slug')
+        if slug not in place_ids:
+            raise BulkImportError(f'line {number}: no place with slug {slug!r}')
+        values['place_id'] = place_ids[slug]
+        by_key[tuple(values[f'{name}_id' if name == 'place' else name] for name in spec.key)] = values
+
+    # Only rows that could match: same places and same value for the second key column.
+    second = spec.key[1]
+    lookup = {'place_id__in': set(place_ids.values()), f'{second}__in': {key[1] for key in by_key}}
+    existing = {
+        tuple(getattr(obj, f'{name}_id' if name == 'place' else name) for name in spec.key): obj
+        for obj in model.objects.filter(**lookup).only('id', 'place_id', *spec.key[1:], *(
+            ['capacity'] if model is Event else []))
+    }
+
+    to_create, to_update, resized = [], [], []
+    for key, values in by_key.items():
+        obj = model(**values)
+        old = existing.get(key)
+        if old is None:
+            if model is Event:
+                obj.seats_remaining = obj.capacity
+            to_create.append(obj)
+        else:
+            obj.pk = old.pk
+            to_update.append(obj)
+            if model is Event and old.capacity != obj.capacity:
+                resized.append(obj)
+    model.objects.bulk_create(to_create, batch_size=batch_size)
+    model.objects.bulk_update(to_update, [*spec.own_fields, 'place'], batch_size=batch_size)
+    for obj in resized:
+        bookings.capacity_changed(obj)
+    return len(to_create), len(to_update), to_create + to_update
+
+
+def import_rows(kind, rows, batch_size=1000, chunk_size=10_000, reindex=True, progress=None):
+    """Upsert ``(line_number, dict)`` rows of ``kind`` on its natural key.
+
+    Rows are handled ``chunk_size`` at a time, one transaction per chunk, so
+    memory stays bounded however long the input is.  Signals do not fire for
+    bulk writes, so each chunk refreshes the search index (unless
+    ``reindex`` is off) and the event calendar, and bumps the cache
+    namespaces itself.  ``progress`` is called with the running totals
+    after every chunk.
+    """
+    spec = SPECS[kind]
+    totals = {'rows': 0, 'created': 0, 'updated': 0}
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        with transaction.atomic():
+            if spec.model is Place:
+                created, updated, objects = _import_places(spec, chunk, batch_size)
+            else:
+                created, updated, objects = _import_related(spec, chunk, batch_size)
+            if reindex and spec.search_kind:
+                search.reindex(spec.search_kind, [obj.pk for obj in objects])
+            if spec.model is Event:
+                event_calendar.index_events([obj.pk for obj in objects])
+            elif spec.model is Place and updated:
+                event_calendar.places_changed([obj.pk for obj in objects])
+            namespaces = set(itertools.chain.from_iterable(CACHE_NAMESPACES[spec.model](obj) for obj in objects))
+            transaction.on_commit(lambda namespaces=namespaces: cache.invalidate(*namespaces))
+        totals['rows'] += len(chunk)
+        totals['created'] += created
+        totals['updated'] += updated
+        if progress:
+            progress(totals)
+    return totals
@@ -0,0 +1,208 @@
+import functools
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+MISSING = object()
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+class LRUCache:
+    """A thread-safe, per-process LRU map with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            _count('evictions', evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def local_cache():
+    global _local
+    with _local_lock:
+        if _local is None:
+            _local = LRUCache(_setting('RESPONSE_CACHE_LOCAL_ENTRIES', 1000))
+        return _local
+
+
+def shared_cache():
+    return caches[_setting('RESPONSE_CACHE_SHARED_ALIAS', 'default')]
+
+
+def _generation_key(namespace):
+    return f'gen:{namespace}'
+
+
+def generations(namespaces):
+    """Current generation token of each namespace, creating missing ones.
+
+    Tokens are random rather than incrementing integers, so a counter that is
+    evicted from the shared cache can never come back with an old value.
+    """
+    if not namespaces:
+        return []
+    cache = shared_cache()
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    tokens = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            found[key] = cache.get(key)
+        tokens.append(found[key])
+    return tokens
+
+
+def invalidate(*namespaces):
+    """Bump the generation of each namespace, orphaning every entry keyed on it."""
+    shared_cache().set_many({_generation_key(namespace): uuid.uuid4().hex for namespace in namespaces}, timeout=None)
+    _count('invalidations', len(namespaces))
+
+
+def _entry_key(key, namespaces):
+    raw = '|'.join([key, *namespaces, *generations(namespaces)])
+    return 'entry:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def read_through(key, namespaces, compute, timeout=None):
+    """Return the cached value for ``key``, computing and storing it on a miss.
+
+    Looks in the local LRU first, then the shared backend.  ``compute`` may
+    return ``MISSING`` to signal a value that must not be cached.
+    """
+    if not _setting('RESPONSE_CACHE_ENABLED', True):
+        return compute()
+    timeout = _setting('RESPONSE_CACHE_TIMEOUT', 300) if timeout is None else timeout
+    entry_key = _entry_key(key, namespaces)
+    value = local_cache().get(entry_key)
+    if value is not MISSING:
+        _count('local_hits')
+        return value
+    value = shared_cache().get(entry_key, MISSING)
+    if value is not MISSING:
+        _count('shared_hits')
+        local_cache().set(entry_key, value, timeout)
+        return value
+    _count('misses')
+    value = compute()
+    if value is not MISSING:
+        shared_cache().set(entry_key, value, timeout)
+        local_cache().set(entry_key, value, timeout)
+    return value
+
+
+def compute_etag(data):
+    encoded = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode(data)
+    return quote_etag(hashlib.sha1(encoded.encode()).hexdigest())
+
+
+def cache_response(*namespaces, timeout=None):
+    """Cache a GET API view's data per URL (scheme, host, path and query), with ETag support.
+
+    ``namespaces`` are formatted with the view's URL kwargs (``'place:{pk}'``)
+    and tie the entry to the generation counters bumped by model signals.
+    Non-200 and non-``Response`` results (e.g. streams) are passed through.
+    Apply it underneath ``@api_view``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            passthrough = []
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200:
+                    passthrough.append(response)
+                    return MISSING
+                return compute_etag(response.data), response.data
+
+            scopes = [namespace.format(**kwargs) for namespace in namespaces]
+            query = sorted(request.query_params.lists())
+            # Payloads embed absolute next-page links, so the origin is part of the key.
+            url = f'{request.scheme}://{request.get_host()}{request.path}'
+            key = f'{view.__module__}.{view.__qualname__}:{url}:{query}'
+            entry = read_through(key, scopes, compute, timeout)
+            if passthrough:
+                return passthrough[0]
+            etag, data = entry
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+                _count('not_modified')
+                return Response(status=304, headers={'ETag': etag})
+            return Response(data, headers={'ETag': etag})
+        return wrapper
+    return decorator
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    for name in ('local_hits', 'shared_hits', 'misses', 'evictions', 'invalidations', 'not_modified'):
+        snapshot.setdefault(name, 0)
+    lookups = snapshot['local_hits'] + snapshot['shared_hits'] + snapshot['misses']
+    snapshot['hit_ratio'] = round((snapshot['local_hits'] + snapshot['shared_hits']) / lookups, 4) if lookups else None
+    snapshot['local_entries'] = len(local_cache())
+    return snapshot
+
+
+def clear():
+    """Drop every cached entry and counter (used by tests and deployments)."""
+    local_cache().clear()
+    shared_cache().clear()
+    with _stats_lock:
+        _stats.clear()
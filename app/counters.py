@@ -0,0 +1,163 @@
+"""Per-user profile counters.
+
+``UserStats`` holds one row per user with everything a profile shows, so
+a profile is one primary-key read instead of six ``COUNT(*)`` queries.
+Signals apply each change as a delta inside the writer's transaction:
+increments are upserts, so a user's first follower creates the row, and
+decrements are plain UPDATEs clamped at zero, so they never resurrect the
+row of a user being deleted.  Removed visits recount ``places_visited``
+instead, since a cascade deletes every repeat visit before the first
+signal runs.  Bulk writes bypass signals and concurrent
+first visits can race, so ``reconcile()`` (``manage.py
+rebuild_user_stats``, run periodically) recomputes the counters from the
+source tables and repairs any drift.
+"""
+
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Review, TravelStory, User, UserFollow, UserStats, VisitedPlace, Wishlist
+
+
+COUNTER_FIELDS = ('followers', 'following', 'stories', 'reviews', 'places_visited', 'wishlist')
+REBUILD_BATCH_SIZE = 2000
+
+# The ``(user_id, counter)`` pairs one row of each model counts towards.
+COUNTED = {
+    UserFollow: lambda obj: [(obj.followed_id, 'followers'), (obj.follower_id, 'following')],
+    TravelStory: lambda obj: [(obj.user_id, 'stories')],
+    Wishlist: lambda obj: [(obj.user_id, 'wishlist')],
+    VisitedPlace: lambda obj: [(obj.user_id, 'places_visited')],
+}
+
+# Where each counter is recomputed from: rows, the user column, and what to count per user.
+SOURCES = {
+    'followers': (UserFollow.objects.all(), 'followed_id', Count('id')),
+    'following': (UserFollow.objects.all(), 'follower_id', Count('id')),
+    'stories': (TravelStory.objects.all(), 'user_id', Count('id')),
+    'reviews': (Review.objects.filter(is_moderated=True), 'user_id', Count('id')),
+    'places_visited': (VisitedPlace.objects.all(), 'user_id', Count('place_id', distinct=True)),
+    'wishlist': (Wishlist.objects.all(), 'user_id', Count('id')),
+}
+
+
+def add(field, counts):
+    """Add ``{user_id: n}`` to one counter: an upsert per positive ``n``, an UPDATE per negative one."""
+    if field not in COUNTER_FIELDS:
+        raise ValueError(f'Unknown counter {field!r}')
+    quote = connection.ops.quote_name
+    table, column = quote(UserStats._meta.db_table), quote(field)
+    increments = [(user_id, n) for user_id, n in counts.items() if n > 0]
+    decrements = [(n, user_id) for user_id, n in counts.items() if n < 0]
+    columns = ', '.join(quote(name) for name in COUNTER_FIELDS if name != field)
+    zeros = ', '.join('0' for name in COUNTER_FIELDS if name != field)
+    with connection.cursor() as cursor:
+        if increments:
+            cursor.executemany(
+                f'INSERT INTO {table} (user_id, {column}, {columns}) VALUES (%s, %s, {zeros}) '
+                f'ON CONFLICT (user_id) DO UPDATE SET {column} = {column} + excluded.{column}',
+                increments,
+            )
+        if decrements:
+            cursor.executemany(
+                f'UPDATE {table} SET {column} = MAX({column} + %s, 0) WHERE user_id = %s', decrements,
+            )
+
+
+def _apply(pairs, sign):
+    by_field = defaultdict(lambda: defaultdict(int))
+    for user_id, field in pairs:
+        by_field[field][user_id] += sign
+    for field, counts in by_field.items():
+        add(field, counts)
+
+
+def _another_visit(visit):
+    return VisitedPlace.objects.filter(user_id=visit.user_id, place_id=visit.place_id).exclude(pk=visit.pk).exists()
+
+
+def object_added(obj):
+    # Only a user's first visit to a place counts.
+    if isinstance(obj, VisitedPlace) and _another_visit(obj):
+        return
+    _apply(COUNTED[type(obj)](obj), 1)
+
+
+def object_removed(obj):
+    if isinstance(obj, VisitedPlace):
+        _recount_visits(obj.user_id)
+        return
+    _apply(COUNTED[type(obj)](obj), -1)
+
+
+def _recount_visits(user_id):
+    places = (
+        VisitedPlace.objects.filter(user_id=OuterRef('user_id')).values('user_id')
+        .annotate(count=Count('place_id', distinct=True)).values('count')
+    )
+    UserStats.objects.filter(user_id=user_id).update(
+        places_visited=Coalesce(Subquery(places), 0, output_field=IntegerField()),
+    )
+
+
+def review_changed(old, new):
+    """Count moderated reviews across a save or delete (either side may be None)."""
+    was_counted = old is not None and old.is_moderated
+    is_counted = new is not None and new.is_moderated
+    if was_counted != is_counted:
+        add('reviews', {(new or old).user_id: 1 if is_counted else -1})
+
+
+def stats_for(user):
+    """``user``'s counters; all zero when nothing has been counted yet."""
+    return getattr(user, 'stats', None) or UserStats(user=user)
+
+
+# Reconciliation
+
+def _expected(user_ids):
+    expected = {user_id: dict.fromkeys(COUNTER_FIELDS, 0) for user_id in user_ids}
+    for field, (rows, column, count) in SOURCES.items():
+        counts = rows.filter(**{f'{column}__in': user_ids}).values_list(column).annotate(count=count)
+        for user_id, value in counts:
+            expected[user_id][field] = value
+    return expected
+
+
+def reconcile(user_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """Recompute every counter from the source tables and fix rows that drifted.
+
+    Users are walked in primary-key batches, each read and repaired in one
+    transaction, so no signal increment lands between the count and the
+    write (SQLite writers hold the database lock for the transaction).
+    Users with nothing to count and no row are skipped.  Returns
+    ``(checked, repaired)``.
+    """
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    checked = repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1]
+        with transaction.atomic():
+            stored = {
+                row[0]: dict(zip(COUNTER_FIELDS, row[1:]))
+                for row in UserStats.objects.filter(user_id__in=batch).values_list('user_id', *COUNTER_FIELDS)
+            }
+            drifted = [
+                UserStats(user_id=user_id, **counts) for user_id, counts in _expected(batch).items()
+                if stored.get(user_id, dict.fromkeys(COUNTER_FIELDS, 0)) != counts
+            ]
+            UserStats.objects.bulk_create(
+                drifted, update_conflicts=True, unique_fields=['user'], update_fields=COUNTER_FIELDS,
+            )
+        checked += len(batch)
+        repaired += len(drifted)
+    return checked, repaired
@@ -0,0 +1,176 @@
+"""Date-range queries over events through a bucketed interval index.
+
+"Which events run between X and Y" is an overlap test, ``start_date < Y and
+end_date > X``, that no single B-tree index answers: either bound alone
+still leaves every earlier (or later) event to check.  ``EventWeek`` holds
+one row per event per week it overlaps, carrying the event's bounds, so a
+range query reads only the index entries of the weeks it covers,
+optionally narrowed by country or state, and fetches just the events that
+overlap.  Rows are rewritten by signals when an
+event moves or its place changes region, and by the bulk importer.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Event, EventWeek, Place
+
+
+CALENDAR_ORDERING = ('start_date', 'id')
+# What ``CalendarEventSerializer`` renders; the place's long description is never loaded.
+CALENDAR_FIELDS = (
+    'title', 'description', 'start_date', 'end_date', 'event_type',
+    'place__name', 'place__slug', 'place__country', 'place__state', 'place__location',
+)
+DAY = datetime.timedelta(days=1)
+WEEK = datetime.timedelta(days=7)
+WRITE_CHUNK = 1000
+LOOKUP_CHUNK = 5000
+
+
+def _slices(ids, size=LOOKUP_CHUNK):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def week_of(value):
+    """The Monday of the UTC week holding ``value``, an aware datetime or a date."""
+    if isinstance(value, datetime.datetime):
+        value = value.astimezone(datetime.timezone.utc).date()
+    return value - datetime.timedelta(days=value.weekday())
+
+
+def weeks_spanned(start, end):
+    """Every week from ``start`` to ``end`` inclusive; none if the event ends before it starts."""
+    week, last = week_of(start), week_of(end)
+    while week <= last:
+        yield week
+        week += WEEK
+
+
+# Maintenance
+
+def index_events(event_ids):
+    """Rewrite the ``EventWeek`` rows of ``event_ids`` from the events and their places."""
+    for ids in _slices(event_ids):
+        rows = Event.objects.filter(pk__in=ids).values_list(
+            'id', 'start_date', 'end_date', 'place__country', 'place__state',
+        )
+        weeks = [
+            EventWeek(event_id=event_id, week=week, start_date=start, end_date=end, country=country, state=state)
+            for event_id, start, end, country, state in rows
+            for week in weeks_spanned(start, end)
+        ]
+        with transaction.atomic():
+            EventWeek.objects.filter(event_id__in=ids).delete()
+            EventWeek.objects.bulk_create(weeks, batch_size=WRITE_CHUNK)
+
+
+def place_changed(place):
+    """Copy ``place``'s region onto its events' weeks; a no-op unless it changed."""
+    EventWeek.objects.filter(event__place_id=place.pk).exclude(country=place.country, state=place.state).update(
+        country=place.country, state=place.state,
+    )
+
+
+def places_changed(place_ids):
+    """``place_changed`` for many places at once, reading each region from the table."""
+    place = Place.objects.filter(events=OuterRef('event_id'))
+    for ids in _slices(place_ids):
+        EventWeek.objects.filter(event__place_id__in=ids).update(
+            country=Subquery(place.values('country')[:1]), state=Subquery(place.values('state')[:1]),
+        )
+
+
+def rebuild():
+    """Regenerate every ``EventWeek`` row in one ``INSERT ... SELECT``; returns the row count.
+
+    A recursive CTE walks each event from the Monday of its first week to
+    the Monday of its last.  ``date(x, '-6 days', 'weekday 1')`` is SQLite
+    for the Monday on or before ``x``; stored datetimes are UTC, as in
+    ``week_of()``.
+    """
+    quote = connection.ops.quote_name
+    sql = f'''
+        INSERT INTO {quote(EventWeek._meta.db_table)} (event_id, week, start_date, end_date, country, state)
+        WITH RECURSIVE spans(event_id, week, last, start_date, end_date, country, state) AS (
+            SELECT event.id, date(event.start_date, '-6 days', 'weekday 1'),
+                   date(event.end_date, '-6 days', 'weekday 1'), event.start_date, event.end_date,
+                   place.country, place.state
+            FROM {quote(Event._meta.db_table)} AS event
+            JOIN {quote(Place._meta.db_table)} AS place ON place.id = event.place_id
+            UNION ALL
+            SELECT event_id, date(week, '+7 days'), last, start_date, end_date, country, state
+            FROM spans WHERE week < last
+        )
+        SELECT event_id, week, start_date, end_date, country, state FROM spans WHERE week <= last
+    '''
+    with transaction.atomic():
+        EventWeek.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.rowcount
+
+
+# Reads
+
+def events_between(start, end, country=None, state=None, event_type=None):
+    """Events overlapping ``[start, end)``, with the place fields the calendar shows.
+
+    The overlap and region are checked on the ``EventWeek`` index entries of
+    the weeks covering the range; only matching events are read.
+    """
+    weeks = EventWeek.objects.filter(
+        week__gte=week_of(start), week__lte=week_of(end - datetime.timedelta(microseconds=1)),
+        start_date__lt=end, end_date__gt=start,
+    )
+    if country:
+        weeks = weeks.filter(country=country)
+    if state:
+        weeks = weeks.filter(state=state)
+    events = Event.objects.filter(pk__in=weeks.values('event_id'))
+    if event_type:
+        events = events.filter(event_type=event_type)
+    return events.select_related('place').only(*CALENDAR_FIELDS)
+
+
+def days_of(first_day, last_day):
+    """The current timezone's ``[start, end)`` covering ``first_day`` to ``last_day`` inclusive."""
+    start = timezone.make_aware(datetime.datetime.combine(first_day, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(last_day + DAY, datetime.time.min))
+    return start, end
+
+
+def group_by_day(events, first_day, last_day):
+    """The ids of ``events`` under each local date from ``first_day`` to ``last_day`` they run on.
+
+    A multi-day event is listed under every one of its days; days without
+    events are left out.  Events end exclusively, so one ending at midnight
+    is not listed under the day that midnight starts.
+    """
+    days = defaultdict(list)
+    for event in events:
+        day = max(timezone.localdate(event.start_date), first_day)
+        end = max(event.end_date - datetime.timedelta(microseconds=1), event.start_date)
+        last = min(timezone.localdate(end), last_day)
+        while day <= last:
+            days[day].append(event.id)
+            day += DAY
+    return [{'date': day, 'events': ids} for day, ids in sorted(days.items())]
+
+
+def naive_events_between(start, end, country=None, state=None, event_type=None):
+    """The same events from the overlap predicate alone, for benchmarks and tests."""
+    events = Event.objects.filter(start_date__lt=end, end_date__gt=start)
+    if country:
+        events = events.filter(place__country=country)
+    if state:
+        events = events.filter(place__state=state)
+    if event_type:
+        events = events.filter(event_type=event_type)
+    return events.select_related('place').only(*CALENDAR_FIELDS)
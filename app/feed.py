@@ -0,0 +1,209 @@
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .api_files.pagination import after_position, decode_cursor, encode_cursor
+from .models import Activity, FeedCelebrity, FeedItem, UserFollow
+
+
+logger = logging.getLogger(__name__)
+
+FEED_ORDERING = ('-created_at', '-activity_id')
+ACTIVITY_ORDERING = ('-created_at', '-id')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_setting('FEED_WORKERS', 1), thread_name_prefix='feed')
+        return _executor
+
+
+def _run_job(job, *args):
+    try:
+        job(*args)
+    except Exception:
+        logger.exception('Feed job %s%r failed', job.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def schedule(job, *args):
+    """Run ``job(*args)`` on the feed worker once the current transaction commits.
+
+    With ``FEED_WORKERS = 0`` the job runs inline instead.  Jobs lost to a
+    crash are recovered by ``run_feed_worker``, which drains pending activity.
+    """
+    def submit():
+        if _setting('FEED_WORKERS', 1) <= 0:
+            job(*args)
+        else:
+            _get_executor().submit(_run_job, job, *args)
+
+    transaction.on_commit(submit)
+
+
+def record_activity(actor_id, verb, object_id, created_at, place_id=None):
+    activity, created = Activity.objects.get_or_create(
+        verb=verb, object_id=object_id,
+        defaults={'actor_id': actor_id, 'created_at': created_at, 'place_id': place_id},
+    )
+    if created:
+        schedule(fan_out, activity.pk)
+    return activity
+
+
+def record_activities(verb, rows):
+    """Bulk ``record_activity`` for ``[(actor_id, object_id, created_at, place_id), ...]``.
+
+    New rows are left for one ``drain_pending`` job instead of a job each.
+    """
+    Activity.objects.bulk_create(
+        [Activity(actor_id=actor_id, verb=verb, object_id=object_id, created_at=created_at, place_id=place_id)
+         for actor_id, object_id, created_at, place_id in rows],
+        ignore_conflicts=True,
+    )
+    schedule(drain_pending)
+
+
+def remove_activity(verb, object_id):
+    # FeedItem has no signals or dependants, so the cascade is one DELETE.
+    Activity.objects.filter(verb=verb, object_id=object_id).delete()
+
+
+def remove_activities(verb, object_ids):
+    object_ids = list(object_ids)
+    for start in range(0, len(object_ids), 1000):
+        Activity.objects.filter(verb=verb, object_id__in=object_ids[start:start + 1000]).delete()
+
+
+def fan_out(activity_id):
+    """Copy one activity into every follower's feed, or mark it merge-on-read.
+
+    Actors above ``FEED_CELEBRITY_THRESHOLD`` followers are recorded in
+    ``FeedCelebrity`` and readers pull their activity at read time instead;
+    an actor back under the threshold has that activity fanned out too.
+    Runs in one transaction so the items and the ``fanned_out`` flag land together.
+    """
+    with transaction.atomic():
+        return _fan_out(activity_id)
+
+
+def _fan_out(activity_id):
+    activity = Activity.objects.filter(pk=activity_id, fanned_out=False).first()
+    if activity is None:
+        return 0
+    followers = UserFollow.objects.filter(followed_id=activity.actor_id).count()
+    if followers > _setting('FEED_CELEBRITY_THRESHOLD', 5000):
+        FeedCelebrity.objects.update_or_create(user_id=activity.actor_id, defaults={'follower_count': followers})
+        Activity.objects.filter(pk=activity.pk).update(fanned_out=True, merge_on_read=True)
+        return 0
+    written = 0
+    if FeedCelebrity.objects.filter(user_id=activity.actor_id).delete()[0]:
+        written += _materialize_merged(activity.actor_id)
+    # One set-based statement: follower ids never travel through Python.
+    feed_item, user_follow = FeedItem._meta.db_table, UserFollow._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {feed_item} (owner_id, activity_id, actor_id, created_at) '
+            f'SELECT follower_id, %s, %s, %s FROM {user_follow} WHERE followed_id = %s '
+            'ON CONFLICT DO NOTHING',
+            [activity.pk, activity.actor_id, FeedItem._meta.get_field('created_at').get_db_prep_value(
+                activity.created_at, connection), activity.actor_id],
+        )
+        written += cursor.rowcount
+    Activity.objects.filter(pk=activity.pk).update(fanned_out=True)
+    return written
+
+
+def _materialize_merged(actor_id):
+    """Fan out a demoted celebrity's merge-on-read activity.
+
+    ``read_feed`` only pulls activity of current celebrities, so once the
+    ``FeedCelebrity`` row is gone these would vanish from every feed.
+    """
+    feed_item, user_follow, activity = (model._meta.db_table for model in (FeedItem, UserFollow, Activity))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {feed_item} (owner_id, activity_id, actor_id, created_at) '
+            f'SELECT f.follower_id, a.id, a.actor_id, a.created_at FROM {activity} a '
+            f'JOIN {user_follow} f ON f.followed_id = a.actor_id '
+            'WHERE a.actor_id = %s AND a.merge_on_read '
+            'ON CONFLICT DO NOTHING',
+            [actor_id],
+        )
+        written = cursor.rowcount
+    Activity.objects.filter(actor_id=actor_id, merge_on_read=True).update(merge_on_read=False)
+    return written
+
+
+def backfill_follow(follower_id, followed_id):
+    """Seed a new follower's feed with the followed user's recent activity."""
+    if FeedCelebrity.objects.filter(user_id=followed_id).exists():
+        return
+    recent = (
+        Activity.objects.filter(actor_id=followed_id, fanned_out=True)
+        .order_by(*ACTIVITY_ORDERING).values_list('id', 'created_at')[:_setting('FEED_BACKFILL', 50)]
+    )
+    FeedItem.objects.bulk_create(
+        [FeedItem(owner_id=follower_id, activity_id=pk, actor_id=followed_id, created_at=created_at)
+         for pk, created_at in recent],
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(follower_id, followed_id):
+    FeedItem.objects.filter(owner_id=follower_id, actor_id=followed_id).delete()
+
+
+def drain_pending(limit=None):
+    """Fan out activity whose scheduled job never ran; returns activities processed."""
+    processed = 0
+    for pk in Activity.objects.filter(fanned_out=False).order_by('id').values_list('id', flat=True)[:limit]:
+        fan_out(pk)
+        processed += 1
+    return processed
+
+
+def read_feed(user_id, cursor=None, limit=20):
+    """One keyset page of a user's feed, newest first.
+
+    Merges the materialized ``FeedItem`` rows with the merge-on-read activity
+    of any celebrities the user follows.  Returns ``(activities, next_cursor)``.
+    """
+    position = decode_cursor(cursor, FeedItem, FEED_ORDERING) if cursor else None
+    items = FeedItem.objects.filter(owner_id=user_id).select_related('activity__actor', 'activity__place')
+    if position:
+        items = items.filter(after_position(FEED_ORDERING, position))
+    candidates = [item.activity for item in items.order_by(*FEED_ORDERING)[:limit + 1]]
+
+    celebrities = list(
+        UserFollow.objects.filter(follower_id=user_id, followed__feed_celebrity__isnull=False)
+        .values_list('followed_id', flat=True)
+    )
+    if celebrities:
+        pulled = Activity.objects.filter(actor_id__in=celebrities, merge_on_read=True).select_related('actor', 'place')
+        if position:
+            pulled = pulled.filter(after_position(ACTIVITY_ORDERING, position))
+        candidates = list(heapq.merge(
+            candidates, pulled.order_by(*ACTIVITY_ORDERING)[:limit + 1],
+            key=lambda activity: (activity.created_at, activity.pk), reverse=True,
+        ))
+
+    page = candidates[:limit]
+    next_cursor = None
+    if len(candidates) > limit:
+        next_cursor = encode_cursor([page[-1].created_at, page[-1].pk])
+    return page, next_cursor
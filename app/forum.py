@@ -0,0 +1,43 @@
+from django.db.models import Count, DateTimeField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ForumPost, ForumReply
+
+
+THREAD_ORDERING = ('-last_activity_at', '-id')
+REPLY_ORDERING = ('id',)
+
+
+def reply_added(reply):
+    """Count a new reply and move its thread's last activity forward, in one UPDATE.
+
+    F-expressions keep concurrent replies from losing increments, and the
+    UPDATE runs in the writer's transaction so the counters commit with it.
+    """
+    ForumPost.objects.filter(pk=reply.post_id).update(
+        reply_count=F('reply_count') + 1,
+        last_activity_at=Greatest('last_activity_at', Value(reply.reply_date, output_field=DateTimeField())),
+    )
+
+
+def _latest_reply_date():
+    return ForumReply.objects.filter(post=OuterRef('pk')).order_by('-reply_date').values('reply_date')[:1]
+
+
+def reply_removed(reply):
+    ForumPost.objects.filter(pk=reply.post_id, reply_count__gt=0).update(
+        reply_count=F('reply_count') - 1,
+        last_activity_at=Coalesce(Subquery(_latest_reply_date()), F('post_date')),
+    )
+
+
+def rebuild_thread_stats(post_ids=None):
+    """Recompute ``reply_count`` and ``last_activity_at`` from the replies; returns the posts updated."""
+    posts = ForumPost.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    counts = ForumReply.objects.filter(post=OuterRef('pk')).values('post').annotate(total=Count('id')).values('total')
+    return posts.update(
+        reply_count=Coalesce(Subquery(counts), 0),
+        last_activity_at=Coalesce(Subquery(_latest_reply_date()), F('post_date')),
+    )
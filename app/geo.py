@@ -0,0 +1,81 @@
+import heapq
+import math
+
+from django.db.models import Q
+
+from .models import Place
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return the lat range and lng ranges enclosing a circle of ``radius_km``.
+
+    Longitude comes back as a list of ranges because boxes that cross the
+    antimeridian are split in two; boxes touching a pole span every longitude.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return (max(min_lat, -90.0), min(max_lat, 90.0)), [(-180.0, 180.0)]
+
+    delta_lng = math.degrees(
+        math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))))
+    )
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    if max_lng - min_lng >= 360:
+        lng_ranges = [(-180.0, 180.0)]
+    elif min_lng < -180:
+        lng_ranges = [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    elif max_lng > 180:
+        lng_ranges = [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    else:
+        lng_ranges = [(min_lng, max_lng)]
+    return (min_lat, max_lat), lng_ranges
+
+
+def haversine_km(lat, lng, points):
+    """Great-circle distances from (lat, lng) to every (lat, lng) in ``points``."""
+    lat1 = math.radians(lat)
+    lng1 = math.radians(lng)
+    cos_lat1 = math.cos(lat1)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    distances = []
+    for lat2, lng2 in points:
+        lat2 = radians(lat2)
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(lng2) - lng1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * asin(sqrt(min(1.0, a))))
+    return distances
+
+
+def candidates_in_box(lat, lng, radius_km, queryset=None):
+    """Rows inside the bounding box, served by the (latitude, longitude) index."""
+    (min_lat, max_lat), lng_ranges = bounding_box(lat, lng, radius_km)
+    box = Q()
+    for min_lng, max_lng in lng_ranges:
+        box |= Q(longitude__gte=min_lng, longitude__lte=max_lng)
+    queryset = Place.objects.all() if queryset is None else queryset
+    return queryset.filter(box, latitude__gte=min_lat, latitude__lte=max_lat)
+
+
+def nearby_places(lat, lng, radius_km, limit, queryset=None):
+    """Return up to ``limit`` places within ``radius_km``, nearest first.
+
+    Only ``(id, latitude, longitude)`` is read for the candidates; full rows
+    are fetched for the winners alone.  Each place gets a ``distance_km``
+    attribute.
+    """
+    candidates = list(candidates_in_box(lat, lng, radius_km, queryset).values_list('id', 'latitude', 'longitude'))
+    distances = haversine_km(lat, lng, ((c[1], c[2]) for c in candidates))
+    nearest = heapq.nsmallest(
+        limit,
+        ((distance, candidate[0]) for distance, candidate in zip(distances, candidates) if distance <= radius_km),
+    )
+    places = Place.objects.in_bulk([pk for _, pk in nearest])
+    results = []
+    for distance, pk in nearest:
+        place = places[pk]
+        place.distance_km = round(distance, 3)
+        results.append(place)
+    return results
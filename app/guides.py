@@ -0,0 +1,26 @@
+import re
+
+from .models import GuideLanguage
+
+
+# "English, Nepali / Hindi and French" -> english, nepali, hindi, french
+SEPARATORS = re.compile(r'[,;/|]+|\s+(?:and|&)\s+', re.IGNORECASE)
+
+
+def language_codes(text):
+    """Normalize a free-text list of languages into unique, lower-case tags, in order."""
+    codes = []
+    for part in SEPARATORS.split(text or ''):
+        code = ' '.join(part.split()).casefold()[:50]
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def sync_languages(guide):
+    """Make ``guide``'s ``GuideLanguage`` rows match its ``languages`` text."""
+    codes = language_codes(guide.languages)
+    GuideLanguage.objects.filter(guide=guide).exclude(code__in=codes).delete()
+    GuideLanguage.objects.bulk_create(
+        [GuideLanguage(guide=guide, code=code) for code in codes], ignore_conflicts=True,
+    )
@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections
+from django.db.models import Sum
+from django.test import override_settings
+from django.utils import timezone
+
+from app import bookings
+from app.benchmarks.synthetic import make_places, make_users
+from app.benchmarks.utils import scratch_database
+from app.models import BookingStatus, Event, EventBooking, Place
+
+
+class Command(BaseCommand):
+    help = 'Hammer one event with concurrent bookings and check that it never oversells.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=100, help='Booking attempts per thread.')
+        parser.add_argument('--max-seats', type=int, default=3)
+        parser.add_argument('--hold-ratio', type=float, default=0.3)
+        parser.add_argument('--cancel-ratio', type=float, default=0.1)
+        parser.add_argument('--replay-ratio', type=float, default=0.1,
+                            help='Share of attempts that resend the previous idempotency key.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with scratch_database(), override_settings(NOTIFICATION_FLUSH_INTERVAL=0):
+            user_ids = make_users(options['threads'], seed=options['seed'])
+            make_places(1, seed=options['seed'])
+            now = timezone.now()
+            event = Event.objects.create(
+                place=Place.objects.get(),
+                title='Sold-out show', description='', event_type='festival',
+                start_date=now + timezone.timedelta(days=7), end_date=now + timezone.timedelta(days=8),
+                capacity=options['capacity'],
+            )
+            totals = {'booked': 0, 'replayed': 0, 'sold_out': 0, 'cancelled': 0, 'lock_retries': 0}
+            lock = threading.Lock()
+
+            def worker(index):
+                rng = random.Random(options['seed'] * 1000 + index)
+                user_id = user_ids[index]
+                counts = dict.fromkeys(totals, 0)
+                last_key = None
+                try:
+                    for attempt in range(options['attempts']):
+                        replay = last_key is not None and rng.random() < options['replay_ratio']
+                        key = last_key if replay else f'{user_id}-{attempt}'
+                        seats = rng.randint(1, options['max_seats'])
+                        hold = rng.random() < options['hold_ratio']
+                        while True:
+                            try:
+                                booking, created = bookings.reserve(event, user_id, seats, key, hold=hold)
+                                counts['booked' if created else 'replayed'] += 1
+                                last_key = key
+                                if created and hold:
+                                    bookings.confirm(booking)
+                                elif created and rng.random() < options['cancel_ratio']:
+                                    bookings.cancel(booking)
+                                    counts['cancelled'] += 1
+                            except bookings.SoldOut:
+                                counts['sold_out'] += 1
+                            except OperationalError as exc:
+                                if 'locked' not in str(exc):
+                                    raise
+                                counts['lock_retries'] += 1
+                                continue
+                            break
+                finally:
+                    close_old_connections()
+                with lock:
+                    for name, value in counts.items():
+                        totals[name] += value
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                for future in [pool.submit(worker, i) for i in range(options['threads'])]:
+                    future.result()
+            elapsed = time.perf_counter() - start
+
+            event.refresh_from_db()
+            active = EventBooking.objects.filter(
+                event=event, status__in=bookings.ACTIVE_STATUSES,
+            ).aggregate(seats=Sum('seats'))['seats'] or 0
+            attempts = options['threads'] * options['attempts']
+            self.stdout.write(
+                f"{attempts:,} attempts from {options['threads']} threads in {elapsed:.2f}s "
+                f"({attempts / elapsed:,.0f}/s)\n"
+                + ', '.join(f'{name} {value:,}' for name, value in totals.items())
+            )
+            self.stdout.write(
+                f'capacity {event.capacity:,}, active seats {active:,}, seats remaining {event.seats_remaining:,}, '
+                f"holds left {EventBooking.objects.filter(status=BookingStatus.HELD).count():,}"
+            )
+            if active + event.seats_remaining != event.capacity or active > event.capacity:
+                raise CommandError('Seat accounting is inconsistent: the event was oversold.')
+            self.stdout.write(self.style.SUCCESS('No oversell.'))
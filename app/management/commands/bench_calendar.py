@@ -0,0 +1,75 @@
+import datetime
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import event_calendar
+from app.benchmarks.synthetic import make_events, make_places
+from app.benchmarks.utils import measure, scratch_database
+from app.models import Place
+
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+SPAN_DAYS = 730
+
+# (label, days, filters): one page of the calendar as /app/events serves it.
+SHAPES = [
+    ('1 day', 1, {}),
+    ('1 week', 7, {}),
+    ('1 month', 31, {}),
+    ('1 week, country', 7, {'country': 'Nepal'}),
+    ('1 month, state', 31, {'state': 'State 7'}),
+    ('1 month, state, type', 31, {'state': 'State 7', 'event_type': 'festival'}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare the EventWeek interval index against the plain overlap predicate on synthetic events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=1_000_000)
+        parser.add_argument('--places', type=int, default=20_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=100, help='Page size, as the view applies it.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            make_places(options['places'], seed=options['seed'])
+            place_ids = list(Place.objects.values_list('id', flat=True))
+            started = time.perf_counter()
+            make_events(options['events'], place_ids, seed=options['seed'], start=START, days=SPAN_DAYS)
+            loaded = time.perf_counter() - started
+            started = time.perf_counter()
+            weeks = event_calendar.rebuild()
+            self.stdout.write(
+                f"{options['events']:,} events over {SPAN_DAYS} days loaded in {loaded:.1f}s; "
+                f"{weeks:,} week rows indexed in {time.perf_counter() - started:.1f}s"
+            )
+            self.stdout.write(
+                f"\n{'query':<22} {'index p50':>10} {'index p95':>10} "
+                f"{'naive p50':>10} {'naive p95':>10} {'matches':>8}"
+            )
+            for label, days, filters in SHAPES:
+                ranges = []
+                for _ in range(options['repeat']):
+                    first = (START + datetime.timedelta(days=rng.randrange(SPAN_DAYS - days))).date()
+                    ranges.append(event_calendar.days_of(first, first + datetime.timedelta(days=days - 1)))
+
+                def page(query, queue):
+                    start, end = next(queue)
+                    events = query(start, end, **filters).order_by(*event_calendar.CALENDAR_ORDERING)
+                    return list(events[:options['limit']])
+
+                indexed_queue, naive_queue = itertools.cycle(ranges), itertools.cycle(ranges)
+                indexed = measure(lambda: page(event_calendar.events_between, indexed_queue), repeat=len(ranges))
+                naive = measure(lambda: page(event_calendar.naive_events_between, naive_queue),
+                                repeat=max(1, len(ranges) // 4), warmup=0)
+                matches = event_calendar.events_between(*ranges[0], **filters).count()
+                self.stdout.write(
+                    f"{label:<22} {indexed['p50_ms']:>10.2f} {indexed['p95_ms']:>10.2f} "
+                    f"{naive['p50_ms']:>10.2f} {naive['p95_ms']:>10.2f} {matches:>8,}"
+                )
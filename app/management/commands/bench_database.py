@@ -0,0 +1,125 @@
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import override_settings
+
+from app.benchmarks.synthetic import make_places, make_reviews, make_users, sentence
+from app.benchmarks.utils import percentile, scratch_database
+from app.models import Place, Review
+from app.queries import place_detail_queryset
+from main.database import WRITE_ALIAS, sqlite_database
+
+
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def run_worker(index, deadline, user_ids, place_ids, options):
+    """One forked worker process: a random mix of page reads and review writes."""
+    rng = random.Random(options['seed'] * 1000 + index)
+    read_samples, write_samples, failures = [], [], 0
+    try:
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                if rng.random() < options['write_ratio']:
+                    Review.objects.create(
+                        user_id=rng.choice(user_ids), place_id=rng.choice(place_ids),
+                        rating=rng.randint(1, 5), content=sentence(rng), is_moderated=True,
+                    )
+                    samples = write_samples
+                else:
+                    if rng.random() < 0.5:
+                        list(Place.objects.order_by('-rating_avg', '-id')[:50])
+                    else:
+                        place_detail_queryset().get(pk=rng.choice(place_ids))
+                    samples = read_samples
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                failures += 1
+                continue
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        for alias in connections:
+            connections[alias].close()
+    return read_samples, write_samples, failures
+
+
+class Command(BaseCommand):
+    help = 'Compare mixed read/write throughput under the stock and tuned SQLite profiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes, as under gunicorn.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Run time per profile.')
+        parser.add_argument('--write-ratio', type=float, default=0.1)
+        parser.add_argument('--places', type=int, default=5_000)
+        parser.add_argument('--reviews', type=int, default=50_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def profiles(self, path):
+        # journal_mode persists in the file and needs exclusive access to
+        # change, so it is switched once per profile rather than per connection.
+        pragmas = dict(settings.SQLITE_PRAGMAS)
+        journal_mode = pragmas.pop('journal_mode', 'WAL')
+        tuned = sqlite_database(path, pragmas)['OPTIONS']
+        return [
+            ('stock', 'DELETE', {}, False),
+            ('wal', journal_mode, tuned, False),
+            ('wal+replica', journal_mode, tuned, True),
+        ]
+
+    def handle(self, *args, **options):
+        with scratch_database() as path, override_settings(
+            CACHES=BENCH_CACHES, RESPONSE_CACHE_SHARED_ALIAS='default', FEED_WORKERS=0,
+            NOTIFICATION_FLUSH_INTERVAL=0, IMAGE_RENDITION_WORKERS=0,
+        ):
+            user_ids = make_users(200, seed=options['seed'])
+            make_places(options['places'], seed=options['seed'])
+            place_ids = list(Place.objects.values_list('id', flat=True))
+            make_reviews(options['reviews'], user_ids, place_ids, seed=options['seed'])
+            self.stdout.write(
+                f"{options['workers']} worker processes, {options['write_ratio']:.0%} writes, "
+                f"{options['seconds']:g}s per profile"
+            )
+            self.stdout.write(
+                f"\n{'profile':>12} {'reads/s':>9} {'writes/s':>9} {'read p95':>9} {'write p95':>10} {'locked':>7}"
+            )
+            original_options = connections[WRITE_ALIAS].settings_dict['OPTIONS']
+            for label, journal_mode, database_options, replica in self.profiles(path):
+                for alias in connections:
+                    connections[alias].close()
+                connections[WRITE_ALIAS].settings_dict['OPTIONS'] = database_options
+                with connections[WRITE_ALIAS].cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+                with override_settings(SQLITE_READ_REPLICA=replica):
+                    result = self.run_profile(user_ids, place_ids, options)
+                self.stdout.write(
+                    f"{label:>12} {result['reads'] / options['seconds']:>9,.0f} "
+                    f"{result['writes'] / options['seconds']:>9,.0f} {result['read_p95']:>9.2f} "
+                    f"{result['write_p95']:>10.2f} {result['locked']:>7,}"
+                )
+            connections[WRITE_ALIAS].close()
+            connections[WRITE_ALIAS].settings_dict['OPTIONS'] = original_options
+
+    def run_profile(self, user_ids, place_ids, options):
+        for alias in connections:
+            connections[alias].close()
+        deadline = time.time() + options['seconds']
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            futures = [
+                pool.submit(run_worker, index, deadline, user_ids, place_ids, options)
+                for index in range(options['workers'])
+            ]
+            results = [future.result() for future in futures]
+        reads = sorted(sample for read_samples, _, _ in results for sample in read_samples)
+        writes = sorted(sample for _, write_samples, _ in results for sample in write_samples)
+        return {
+            'reads': len(reads), 'writes': len(writes), 'locked': sum(failures for _, _, failures in results),
+            'read_p95': percentile(reads, 0.95), 'write_p95': percentile(writes, 0.95),
+        }
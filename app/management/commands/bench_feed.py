@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.db.models import Count
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from app import feed
+from app.benchmarks.synthetic import make_follows, make_users
+from app.benchmarks.utils import measure, scratch_database
+from app.models import Activity, FeedCelebrity, FeedItem, UserFollow
+
+
+class Command(BaseCommand):
+    help = 'Load-test feed fan-out and reads on a skewed (power-law) follower graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--follows-per-user', type=int, default=50)
+        parser.add_argument('--skew', type=float, default=1.1)
+        parser.add_argument('--activities', type=int, default=5_000)
+        parser.add_argument('--thresholds', type=int, nargs='+', default=[10**9, 2000, 500],
+                            help='Celebrity thresholds to compare; a huge value means pure fan-out.')
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            user_ids = make_users(options['users'], seed=options['seed'])
+            make_follows(user_ids, options['follows_per_user'], options['skew'], seed=options['seed'])
+            counts = sorted(
+                UserFollow.objects.values('followed_id').annotate(n=Count('id')).values_list('n', flat=True),
+                reverse=True,
+            )
+            self.stdout.write(
+                f'{len(user_ids):,} users, {sum(counts):,} follows; followers per user: '
+                f'max {counts[0]:,}, p99 {counts[len(counts) // 100]:,}, median {counts[len(counts) // 2]:,}'
+            )
+            now = timezone.now()
+            Activity.objects.bulk_create(
+                Activity(actor_id=rng.choice(user_ids), verb=Activity.STORY, object_id=i,
+                         created_at=now - timezone.timedelta(seconds=i))
+                for i in range(options['activities'])
+            )
+            readers = rng.sample(user_ids, min(options['repeat'], len(user_ids)))
+
+            self.stdout.write(
+                f"\n{'threshold':>11} {'fanout_s':>9} {'items':>11} {'items/s':>10} "
+                f"{'celebs':>7} {'read p50':>9} {'read p95':>9} {'page3 p50':>10}"
+            )
+            for threshold in options['thresholds']:
+                FeedItem.objects.all().delete()
+                FeedCelebrity.objects.all().delete()
+                Activity.objects.update(fanned_out=False, merge_on_read=False)
+                with override_settings(FEED_CELEBRITY_THRESHOLD=threshold):
+                    start = time.perf_counter()
+                    feed.drain_pending()
+                    elapsed = time.perf_counter() - start
+                items = FeedItem.objects.count()
+                queue = iter(readers * 3)
+                first_page = measure(lambda: feed.read_feed(next(queue), limit=20), repeat=len(readers), warmup=0)
+
+                def third_page():
+                    user_id = next(deep_queue)
+                    _, cursor = feed.read_feed(user_id, limit=20)
+                    if cursor:
+                        _, cursor = feed.read_feed(user_id, cursor, limit=20)
+                    if cursor:
+                        feed.read_feed(user_id, cursor, limit=20)
+
+                deep_queue = iter(readers)
+                deep = measure(third_page, repeat=len(readers), warmup=0)
+                label = 'none' if threshold >= 10**9 else f'{threshold:,}'
+                self.stdout.write(
+                    f"{label:>11} {elapsed:>9.2f} {items:>11,} {items / elapsed if elapsed else 0:>10,.0f} "
+                    f"{FeedCelebrity.objects.count():>7} {first_page['p50_ms']:>9.2f} {first_page['p95_ms']:>9.2f} "
+                    f"{deep['p50_ms']:>10.2f}"
+                )
@@ -0,0 +1,102 @@
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.test import override_settings
+
+from app import bulk
+from app.benchmarks.synthetic import place_rows
+from app.benchmarks.utils import scratch_database
+from app.models import Place
+
+
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def _rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _timed_in_child(job, *args):
+    """Run ``job`` in a forked process; returns (seconds, peak extra memory in MB)."""
+    base = _rss_kb()
+    start = time.perf_counter()
+    job(*args)
+    elapsed = time.perf_counter() - start
+    for alias in connections:
+        connections[alias].close()
+    return elapsed, max(0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024
+
+
+def _bulk_import(path, batch_size, chunk_size):
+    with open(path, encoding='utf-8') as stream:
+        bulk.import_rows('place', bulk.read_rows(stream, 'jsonl'), batch_size=batch_size, chunk_size=chunk_size)
+
+
+def _loaddata(path):
+    call_command('loaddata', path, verbosity=0)
+
+
+class Command(BaseCommand):
+    help = 'Compare import_content against loaddata on synthetic places: throughput and peak memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument('--skip-loaddata', action='store_true', help='loaddata needs the whole file in memory.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='seekerwithin-import-')
+        jsonl_path = os.path.join(directory, 'places.jsonl')
+        fixture_path = os.path.join(directory, 'places.json')
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        with open(jsonl_path, 'w', encoding='utf-8') as jsonl, open(fixture_path, 'w', encoding='utf-8') as fixture:
+            fixture.write('[')
+            for i, row in enumerate(place_rows(options['rows'], options['seed'], slug_prefix='bench')):
+                row.pop('admin_id')
+                jsonl.write(encoder.encode(row) + '\n')
+                fixture.write((',' if i else '') + encoder.encode({'model': 'app.place', 'fields': row}))
+            fixture.write(']')
+        self.stdout.write(
+            f"{options['rows']:,} places: {os.path.getsize(jsonl_path) / 2**20:,.1f} MB JSON Lines, "
+            f"{os.path.getsize(fixture_path) / 2**20:,.1f} MB fixture"
+        )
+        self.stdout.write(f"\n{'method':>14} {'seconds':>9} {'rows/s':>10} {'peak MB':>9} {'rows':>10}")
+
+        runs = [('import_content', _bulk_import, (jsonl_path, options['batch_size'], options['chunk_size']))]
+        if not options['skip_loaddata']:
+            runs.append(('loaddata', _loaddata, (fixture_path,)))
+        context = multiprocessing.get_context('fork')
+        try:
+            for label, job, job_args in runs:
+                with scratch_database(), override_settings(
+                    CACHES=BENCH_CACHES, RESPONSE_CACHE_SHARED_ALIAS='default', FEED_WORKERS=0,
+                ):
+                    for alias in connections:
+                        connections[alias].close()
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        elapsed, peak = pool.submit(_timed_in_child, job, *job_args).result()
+                    loaded = Place.objects.count()
+                    self.stdout.write(
+                        f"{label:>14} {elapsed:>9.1f} {loaded / elapsed:>10,.0f} {peak:>9,.1f} {loaded:>10,}"
+                    )
+            self.stdout.write(
+                '\npeak MB is resident memory added during the run; for import_content it is mostly '
+                "SQLite's page cache and memory-mapped pages, which are capped by the cache_size and "
+                'mmap_size pragmas, not by the number of rows.'
+            )
+        finally:
+            os.remove(jsonl_path)
+            os.remove(fixture_path)
+            os.rmdir(directory)
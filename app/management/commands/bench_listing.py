@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from app.api_files.encoders import row_encoder
+from app.api_files.serializers import PlaceSerializer
+from app.benchmarks.synthetic import make_places, make_users
+from app.benchmarks.utils import measure, scratch_database
+from app.models import Place
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare PlaceSerializer against its compiled row encoder on place listings: '
+        'rows per second to fetch, serialize and render, with byte-identical output.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--places', type=int, default=20_000)
+        parser.add_argument('--rows', type=int, nargs='+', default=[50, 500, 5_000])
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        render = JSONRenderer().render
+        with scratch_database():
+            admin_ids = make_users(20, seed=options['seed'])
+            make_places(options['places'], seed=options['seed'], admin_ids=admin_ids)
+            self.stdout.write(
+                f"{'rows':>6} {'stage':<28} {'serializer rows/s':>18} {'encoder rows/s':>15} {'speedup':>8}"
+            )
+            for count in options['rows']:
+                places = Place.objects.order_by('id')[:count]
+                encoder = row_encoder(PlaceSerializer)
+                instances, rows = list(places), list(encoder.values(places))
+                if render(encoder.encode(rows)) != render(PlaceSerializer(instances, many=True).data):
+                    self.stderr.write(f'Output differs at {count} rows.')
+                stages = [
+                    ('serialize + render',
+                     lambda: render(PlaceSerializer(instances, many=True).data),
+                     lambda: render(encoder.encode(rows))),
+                    ('fetch + serialize + render',
+                     lambda: render(PlaceSerializer(places.all(), many=True).data),
+                     lambda: render(encoder.encode(encoder.values(places.all())))),
+                ]
+                for stage, serializer, compiled in stages:
+                    slow = measure(serializer, repeat=options['repeat'])['p50_ms']
+                    fast = measure(compiled, repeat=options['repeat'])['p50_ms']
+                    self.stdout.write(
+                        f"{count:>6,} {stage:<28} {count / slow * 1000:>18,.0f} {count / fast * 1000:>15,.0f} "
+                        f"{slow / fast:>7.1f}x"
+                    )
@@ -0,0 +1,179 @@
+import datetime
+import http.client
+import json
+import random
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.benchmarks import suite
+from app.benchmarks.http import require_servers, server_environment, serving
+from app.benchmarks.synthetic import WORDS, make_dataset, popularity
+from app.benchmarks.utils import percentile, scratch_database
+from app.models import ForumPost, Place, User
+
+
+# (route, weight, path): roughly the read traffic of the app, heaviest first.
+ROUTES = [
+    ('place detail', 30, '/app/places/{place}/'),
+    ('place list', 20, '/app/?limit=50&ordering={ordering}'),
+    ('places nearby', 10, '/app/places/nearby?lat={lat}&lng={lng}&radius_km=25'),
+    ('search', 10, '/app/search?q={word}'),
+    ('similar places', 8, '/app/places/{place}/similar'),
+    ('place forum', 6, '/app/places/{place}/forum'),
+    ('thread replies', 5, '/app/forum/{thread}/replies'),
+    ('user profile', 5, '/app/users/{user}/'),
+    ('event calendar', 4, '/app/events?from={day}&to={week_end}'),
+    ('package catalogue', 2, '/app/packages'),
+]
+
+
+class Traffic:
+    """Picks routes by weight and fills them with popular places, users and threads."""
+
+    def __init__(self, place_ids, user_ids, thread_ids, seed):
+        self.rng = random.Random(seed)
+        self.places = popularity(place_ids, random.Random(0))
+        self.users = popularity(user_ids, random.Random(1))
+        self.threads = popularity(thread_ids or [1], random.Random(2))
+        self.routes = [(route, path) for route, _, path in ROUTES]
+        self.weights = [weight for _, weight, _ in ROUTES]
+
+    def pick(self, ranked):
+        ids, cum_weights = ranked
+        return self.rng.choices(ids, cum_weights=cum_weights)[0]
+
+    def next(self):
+        route, path = self.rng.choices(self.routes, weights=self.weights)[0]
+        day = datetime.date(2024, 1, 1) + datetime.timedelta(days=self.rng.randrange(720))
+        return route, path.format(
+            place=self.pick(self.places), user=self.pick(self.users), thread=self.pick(self.threads),
+            ordering=self.rng.choice(('id', '-rating', '-reviews')), word=self.rng.choice(WORDS),
+            lat=round(self.rng.uniform(27.5, 28.0), 4), lng=round(self.rng.uniform(85.0, 85.5), 4),
+            day=day, week_end=day + datetime.timedelta(days=6),
+        )
+
+
+def run_client(port, traffic, deadline):
+    """One keep-alive connection issuing requests back to back; ``({route: [ms]}, {route: errors})``."""
+    samples, errors = defaultdict(list), defaultdict(int)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.time() < deadline:
+        route, path = traffic.next()
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors[route] += 1
+            connection.close()
+            continue
+        if response.status != 200:
+            errors[route] += 1
+            continue
+        samples[route].append((time.perf_counter() - start) * 1000)
+    connection.close()
+    return samples, errors
+
+
+def summarize(samples, errors, seconds):
+    """Per-route latency percentiles, throughput and errors, in ``suite.report()`` result form."""
+    results = {}
+    for route in sorted(set(samples) | set(errors)):
+        timings = sorted(samples[route])
+        results[f'load {route}'] = {
+            'requests': len(timings),
+            'errors': errors[route],
+            'rps': round(len(timings) / seconds, 1),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'max_ms': round(timings[-1], 3) if timings else 0.0,
+        }
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve a synthetic dataset with gunicorn or uvicorn and drive a weighted mix of read routes over HTTP; '
+        'report per-route latency and throughput as JSON and fail on regressions against a baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=['gunicorn', 'uvicorn'], default='gunicorn')
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent keep-alive connections.')
+        parser.add_argument('--seconds', type=float, default=30.0)
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes.')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+        parser.add_argument('--places', type=int, default=10_000, help='Dataset scale; everything else follows it.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='A previous --output to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p50 slowdown as a fraction of the baseline.')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Slowdowns smaller than this never count as regressions.')
+
+    def handle(self, *args, **options):
+        require_servers('bench_load')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+        with scratch_database() as path, tempfile.TemporaryDirectory(prefix='seekerwithin-load-') as directory:
+            started = time.perf_counter()
+            counts = make_dataset(options['places'], seed=options['seed'], log=self.stdout.write)
+            self.stdout.write(f'{sum(counts.values()):,} rows generated in {time.perf_counter() - started:.1f}s')
+            place_ids = list(Place.objects.values_list('id', flat=True))
+            user_ids = list(User.objects.values_list('id', flat=True))
+            thread_ids = list(ForumPost.objects.values_list('id', flat=True))
+            env = server_environment(directory, path)
+            with serving(options['server'], options, env, '/app/?limit=1') as port:
+                self.stdout.write(
+                    f"{options['clients']} clients for {options['seconds']:g}s against {options['server']} "
+                    f"({options['workers']} workers)"
+                )
+                deadline = time.time() + options['seconds']
+                with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+                    futures = [
+                        pool.submit(run_client, port, Traffic(place_ids, user_ids, thread_ids, options['seed'] + index),
+                                    deadline)
+                        for index in range(options['clients'])
+                    ]
+                    outcomes = [future.result() for future in futures]
+        samples, errors = defaultdict(list), defaultdict(int)
+        for client_samples, client_errors in outcomes:
+            for route, timings in client_samples.items():
+                samples[route].extend(timings)
+            for route, count in client_errors.items():
+                errors[route] += count
+        results = summarize(samples, errors, options['seconds'])
+
+        self.stdout.write(
+            f"\n{'route':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name.removeprefix('load '):<24} {result['rps']:>8,.1f} {result['p50_ms']:>8.2f} "
+                f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['max_ms']:>8.2f} {result['errors']:>7,}"
+            )
+        total = sum(result['requests'] for result in results.values())
+        self.stdout.write(f"{'all':<24} {total / options['seconds']:>8,.1f}")
+
+        report = suite.report(
+            results, server=options['server'], clients=options['clients'], workers=options['workers'],
+            seconds=options['seconds'], places=options['places'], seed=options['seed'], rows=counts,
+        )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+            self.stdout.write(f"\nWrote {options['output']}")
+        if baseline is not None:
+            regressions = suite.compare(baseline, report, options['tolerance'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}.'))
@@ -0,0 +1,56 @@
+import itertools
+import random
+
+from django.core.management.base import BaseCommand
+
+from app.benchmarks.synthetic import CLUSTERS, make_places, random_point
+from app.benchmarks.utils import measure, scratch_database
+from app.geo import candidates_in_box, haversine_km, nearby_places
+from app.models import Place
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /app/places/nearby query latency against radius on synthetic places.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--radii', type=float, nargs='+', default=[1, 5, 25, 100, 500])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--full-scan', action='store_true',
+                            help='Also time a Python haversine over every row, without the index.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with scratch_database():
+            loaded = 0
+            for size in sorted(options['sizes']):
+                make_places(size - loaded, seed=options['seed'] + loaded)
+                loaded = size
+                self.stdout.write(f'\n{size:,} places')
+                self.stdout.write(f"{'radius_km':>10} {'p50_ms':>9} {'p95_ms':>9} {'candidates':>11} {'results':>8}")
+                for radius in options['radii']:
+                    points = [random_point(rng) if i % 2 else rng.choice(CLUSTERS) for i in range(options['repeat'])]
+                    queue = itertools.cycle(points)
+
+                    def query():
+                        lat, lng = next(queue)
+                        return nearby_places(lat, lng, radius, options['limit'])
+
+                    stats = measure(query, repeat=len(points), warmup=len(points))
+                    lat, lng = points[0]
+                    candidates = candidates_in_box(lat, lng, radius).count()
+                    results = len(nearby_places(lat, lng, radius, options['limit']))
+                    self.stdout.write(
+                        f"{radius:>10g} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {candidates:>11,} {results:>8}"
+                    )
+                if options['full_scan']:
+                    lat, lng = CLUSTERS[0]
+
+                    def full_scan():
+                        rows = list(Place.objects.values_list('latitude', 'longitude'))
+                        return haversine_km(lat, lng, rows)
+
+                    stats = measure(full_scan, repeat=3, warmup=0)
+                    self.stdout.write(f"{'full scan':>10} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f}")
@@ -0,0 +1,48 @@
+
+from django.core.management.base import BaseCommand
+
+from app import search
+from app.benchmarks.synthetic import make_faqs, make_places, make_reviews, make_stories, make_users
+from app.benchmarks.utils import measure, scratch_database
+from app.models import Place
+
+# Common terms, rare long-tail terms, a prefix and a term that never matches
+# (the naive scan's worst case: it has to read every row).
+QUERIES = ['temple', 'peaceful lake', 'kalami', 'kalami rotesh', 'rotena dubo', 'nowhereland']
+
+class Command(BaseCommand):
+    help = 'Compare FTS5 search against the naive icontains scan at increasing document counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help='Total documents (places, reviews, FAQs and stories combined).')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        with scratch_database():
+            user_ids = make_users(500, seed=seed)
+            loaded = 0
+            for size in sorted(options['sizes']):
+                # 20% places, 50% reviews, 20% FAQs, 10% stories.
+                step = size - loaded
+                make_places(step // 5, seed=seed + loaded)
+                place_ids = list(Place.objects.values_list('id', flat=True))
+                make_reviews(step // 2, user_ids, place_ids, seed=seed + loaded)
+                make_faqs(step // 5, place_ids, seed=seed + loaded)
+                make_stories(step // 10, user_ids, seed=seed + loaded)
+                loaded = size
+                search.rebuild_index()
+
+                self.stdout.write(f'\n{size:,} documents')
+                self.stdout.write(f"{'query':<22} {'fts p50':>9} {'fts p95':>9} {'naive p50':>10} {'naive p95':>10} {'hits':>6}")
+                for query in QUERIES:
+                    fts = measure(lambda: search.search(query, limit=20), repeat=options['repeat'])
+                    naive_repeat = max(1, options['repeat'] // 5)
+                    naive = measure(lambda: search.naive_search(query, limit=20), repeat=naive_repeat, warmup=0)
+                    hits = len(search.search(query, limit=20))
+                    self.stdout.write(
+                        f"{query:<22} {fts['p50_ms']:>9.2f} {fts['p95_ms']:>9.2f} "
+                        f"{naive['p50_ms']:>10.2f} {naive['p95_ms']:>10.2f} {hits:>6}"
+                    )
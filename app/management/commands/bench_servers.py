@@ -0,0 +1,98 @@
+import http.client
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from app.benchmarks.http import require_servers, server_environment, serving
+from app.benchmarks.synthetic import make_faqs, make_places, make_reviews, make_users
+from app.benchmarks.utils import percentile, scratch_database
+from app.models import Place
+
+
+# (label, server, list path, detail path format)
+DEPLOYMENTS = [
+    ('wsgi', 'gunicorn', '/app/?limit=50', '/app/places/{pk}/'),
+    ('asgi sync views', 'uvicorn', '/app/?limit=50', '/app/places/{pk}/'),
+    ('asgi async views', 'uvicorn', '/app/async/places?limit=50', '/app/async/places/{pk}/'),
+]
+
+
+def run_client(port, paths, place_ids, deadline, seed):
+    """One keep-alive connection issuing requests back to back until ``deadline``."""
+    rng = random.Random(seed)
+    list_path, detail_path = paths
+    samples, errors = [], 0
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.time() < deadline:
+        path = list_path if rng.random() < 0.5 else detail_path.format(pk=rng.choice(place_ids))
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        if response.status != 200:
+            errors += 1
+            continue
+        samples.append((time.perf_counter() - start) * 1000)
+    connection.close()
+    return samples, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the place read endpoints under WSGI (gunicorn) and ASGI (uvicorn) against the same '
+        'synthetic database and report throughput and latency at rising concurrency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64],
+                            help='Concurrent keep-alive clients, one run per level.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Run time per level.')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes.')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+        parser.add_argument('--places', type=int, default=2_000)
+        parser.add_argument('--reviews', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        require_servers('bench_servers')
+        with scratch_database() as path, tempfile.TemporaryDirectory(prefix='seekerwithin-servers-') as directory:
+            user_ids = make_users(200, seed=options['seed'])
+            make_places(options['places'], seed=options['seed'])
+            place_ids = list(Place.objects.values_list('id', flat=True))
+            make_reviews(options['reviews'], user_ids, place_ids, seed=options['seed'])
+            make_faqs(options['places'] * 3, place_ids, seed=options['seed'])
+            env = server_environment(directory, path)
+            self.stdout.write(
+                f"{options['workers']} server worker(s), {options['threads']} gunicorn threads, "
+                f"{options['seconds']:g}s per level, half list pages and half place details"
+            )
+            self.stdout.write(
+                f"\n{'deployment':>17} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+            )
+            for label, server, *paths in DEPLOYMENTS:
+                self.run_deployment(label, server, paths, place_ids, env, options)
+
+    def run_deployment(self, label, server, paths, place_ids, env, options):
+        with serving(server, options, env, paths[0]) as port:
+            for level in options['concurrency']:
+                deadline = time.time() + options['seconds']
+                with ThreadPoolExecutor(max_workers=level) as pool:
+                    futures = [
+                        pool.submit(run_client, port, paths, place_ids, deadline, options['seed'] * 1000 + index)
+                        for index in range(level)
+                    ]
+                    results = [future.result() for future in futures]
+                samples = sorted(sample for client_samples, _ in results for sample in client_samples)
+                errors = sum(client_errors for _, client_errors in results)
+                self.stdout.write(
+                    f"{label:>17} {level:>7} {len(samples) / options['seconds']:>8,.0f} "
+                    f"{percentile(samples, 0.5):>8.2f} {percentile(samples, 0.99):>8.2f} {errors:>7,}"
+                )
@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from app.benchmarks import suite
+from app.benchmarks.synthetic import make_dataset
+from app.benchmarks.utils import scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the serializer, queryset and view micro-benchmarks on a synthetic dataset, write the results '
+        'as JSON and fail on regressions against a baseline run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--places', type=int, default=10_000, help='Dataset scale; everything else follows it.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', help='Run only benchmarks whose name contains this.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='A previous --output to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p50 slowdown as a fraction of the baseline.')
+        parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                            help='Slowdowns smaller than this never count as regressions.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+        # Measure the code, not query logging or the response cache; feed and rendition work runs inline.
+        with scratch_database(), override_settings(
+            DEBUG=False, RESPONSE_CACHE_ENABLED=False, FEED_WORKERS=0, IMAGE_RENDITION_WORKERS=0,
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            started = time.perf_counter()
+            counts = make_dataset(options['places'], seed=options['seed'], log=self.stdout.write)
+            self.stdout.write(
+                f'{sum(counts.values()):,} rows generated in {time.perf_counter() - started:.1f}s\n'
+            )
+            self.stdout.write(f"{'benchmark':<44} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'queries':>8}")
+            results = suite.run(
+                suite.Fixture.pick(), repeat=options['repeat'], warmup=options['warmup'], only=options['only'],
+                log=lambda name, result: self.stdout.write(
+                    f"{name:<44} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['max_ms']:>9.2f} "
+                    f"{result['queries']:>8}"
+                ),
+            )
+        report = suite.report(results, places=options['places'], seed=options['seed'], repeat=options['repeat'],
+                              rows=counts)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+            self.stdout.write(f"\nWrote {options['output']}")
+        if baseline is not None:
+            regressions = suite.compare(baseline, report, options['tolerance'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}.'))
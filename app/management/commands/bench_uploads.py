@@ -0,0 +1,152 @@
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import override_settings
+
+from app import uploads
+from app.benchmarks.synthetic import make_places, make_users
+from app.benchmarks.utils import percentile, scratch_database
+from app.models import ImageUpload, Place, PlaceImage, UploadStatus, User
+
+
+def make_photo(megapixels, seed):
+    """A noisy RGB JPEG of roughly ``megapixels``, about as hard to compress as a real photo."""
+    from PIL import Image
+
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    noise = [Image.effect_noise((width, height), 40 + 10 * (seed + band)) for band in range(3)]
+    buffer = io.BytesIO()
+    Image.merge('RGB', noise).save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+class PeakMemory(threading.Thread):
+    """Samples this process's resident set size; worker processes are not included."""
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = self.start_rss = self.rss()
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def rss():
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return 0
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return max(0, self.peak - self.start_rss)
+
+
+class Command(BaseCommand):
+    help = 'Upload synthetic photos concurrently, validated in the request versus chunked into the worker pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--uploads', type=int, default=4, help='Uploads per client.')
+        parser.add_argument('--megapixels', type=float, default=12)
+        parser.add_argument('--chunk-kb', type=int, default=1024)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        photo = make_photo(options['megapixels'], options['seed'])
+        directory = tempfile.mkdtemp(prefix='seekerwithin-uploads-')
+        try:
+            with scratch_database(), override_settings(
+                MEDIA_ROOT=os.path.join(directory, 'media'), IMAGE_UPLOAD_DIR=os.path.join(directory, 'parts'),
+                IMAGE_UPLOAD_MAX_CHUNK_SIZE=max(len(photo), options['chunk_kb'] * 1024),
+                IMAGE_RENDITION_WORKERS=0, IMAGE_UPLOAD_MAX_PENDING=options['clients'],
+            ):
+                user_ids = make_users(options['clients'], seed=options['seed'])
+                make_places(1, seed=options['seed'])
+                self.users = list(User.objects.filter(pk__in=user_ids))
+                self.place = Place.objects.get()
+                self.stdout.write(
+                    f"{options['clients']} clients x {options['uploads']} uploads of a "
+                    f"{len(photo) / 1024 / 1024:.1f} MiB, {options['megapixels']:g} MP JPEG\n"
+                )
+                self.stdout.write(
+                    f"{'mode':<10} {'uploads/s':>10} {'request p50':>12} {'request p95':>12} {'request max':>12} "
+                    f"{'done p50':>10} {'done p95':>10} {'peak RSS':>10} {'busy':>6}"
+                )
+                with override_settings(IMAGE_UPLOAD_WORKERS=0):
+                    self.run('inline', photo, len(photo), options)
+                with override_settings(IMAGE_UPLOAD_WORKERS=options['workers']):
+                    self.run('chunked', photo, options['chunk_kb'] * 1024, options)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, mode, photo, chunk_size, options):
+        requests, finished = [], []
+        busy = [0]
+        lock = threading.Lock()
+
+        def client(index):
+            user = self.users[index]
+            try:
+                for _ in range(options['uploads']):
+                    started = time.perf_counter()
+                    upload = uploads.start(user, self.place, 'photo.jpg', len(photo))
+                    for offset in range(0, len(photo), chunk_size):
+                        chunk = photo[offset:offset + chunk_size]
+                        while True:
+                            request_started = time.perf_counter()
+                            try:
+                                uploads.receive_chunk(upload, offset, len(photo), io.BytesIO(chunk), len(chunk))
+                            except uploads.Busy:
+                                with lock:
+                                    busy[0] += 1
+                                time.sleep(0.05)
+                                continue
+                            with lock:
+                                requests.append(time.perf_counter() - request_started)
+                            break
+                    while ImageUpload.objects.filter(pk=upload.pk, status=UploadStatus.PROCESSING).exists():
+                        time.sleep(0.01)
+                    with lock:
+                        finished.append(time.perf_counter() - started)
+            finally:
+                close_old_connections()
+
+        memory = PeakMemory()
+        memory.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            for future in [pool.submit(client, index) for index in range(options['clients'])]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        peak = memory.stop()
+        # Renditions are built after each image commits; let them land before the settings are restored.
+        while PlaceImage.objects.filter(image_renditions={}).exists():
+            time.sleep(0.05)
+        failed = ImageUpload.objects.filter(status=UploadStatus.FAILED).count()
+        if failed:
+            self.stderr.write(f'{failed} uploads failed.')
+
+        requests.sort()
+        finished.sort()
+        self.stdout.write(
+            f'{mode:<10} {len(finished) / elapsed:>10.1f} '
+            f'{statistics.median(requests) * 1000:>10.1f}ms {percentile(requests, 0.95) * 1000:>10.1f}ms '
+            f'{requests[-1] * 1000:>10.1f}ms {statistics.median(finished) * 1000:>8.0f}ms '
+            f'{percentile(finished, 0.95) * 1000:>8.0f}ms {peak / 1024 / 1024:>7.0f}MiB {busy[0]:>6}'
+        )
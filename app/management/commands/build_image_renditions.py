@@ -0,0 +1,55 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app import renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or stale image renditions for every image field.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every rendition, not just missing ones.')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2) or 1)
+
+    def jobs(self, model, rebuild_all):
+        if not rebuild_all:
+            return renditions.missing_renditions(model)
+        return (
+            (instance, field_name)
+            for instance in model.objects.iterator(chunk_size=500)
+            for field_name in renditions.RENDITION_FIELDS[model]
+            if getattr(instance, field_name)
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        self.built = self.failed = 0
+        window = options['workers'] * 4
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for model in renditions.RENDITION_FIELDS:
+                in_flight = deque()
+                for instance, field_name in self.jobs(model, options['all']):
+                    file = getattr(instance, field_name)
+                    future = executor.submit(renditions.render, renditions.read_source(file), *renditions.render_args())
+                    in_flight.append((instance, field_name, file.name, future))
+                    if len(in_flight) >= window:
+                        self.collect(*in_flight.popleft())
+                while in_flight:
+                    self.collect(*in_flight.popleft())
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {self.built:,} rendition sets ({self.failed:,} failed) in {time.perf_counter() - start:.1f}s.'
+        ))
+
+    def collect(self, instance, field_name, source_name, future):
+        try:
+            rendition_map = renditions.store(source_name, future.result())
+        except Exception as exc:
+            self.failed += 1
+            self.stderr.write(f'{type(instance).__name__} {instance.pk}.{field_name}: {exc}')
+            return
+        renditions.save_map(type(instance), instance.pk, field_name, source_name, rendition_map)
+        self.built += 1
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Refresh precomputed similar places for places whose wishlists, visits or reviews changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild interaction weights from scratch and recompute every place.')
+        parser.add_argument('--neighbours', type=int, help='Similar places kept per place.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = recommendations.refresh(full=options['full'], neighbours=options['neighbours'])
+        elapsed = time.perf_counter() - start
+        if not stats['dirty']:
+            self.stdout.write('Nothing changed since the last run.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full rebuild' if stats['full'] else 'Refreshed'}: {stats['dirty']:,} changed places, "
+            f"{stats['recomputed']:,} rows recomputed, {stats['merged']:,} lists merged, "
+            f"{stats['rows']:,} neighbours written in {elapsed:.1f}s."
+        ))
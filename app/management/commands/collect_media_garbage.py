@@ -0,0 +1,32 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app import media
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed image blobs that no image field refers to any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24),
+            help='Keep unreferenced blobs written or uploaded again within this many hours.',
+        )
+        parser.add_argument('--recount', action='store_true', help='Recompute every reference count first.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['recount']:
+            self.stdout.write(f'Repaired {media.recount():,} reference counts.')
+        removed, freed, repaired = media.collect_garbage(
+            datetime.timedelta(hours=options['grace_hours']), dry_run=options['dry_run'],
+        )
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed:,} blobs ({freed / 1024 / 1024:,.1f} MiB), '
+            f'kept {repaired:,} still referenced, in {time.perf_counter() - start:.1f}s.'
+        ))
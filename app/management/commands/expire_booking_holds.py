@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.bookings import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Expire lapsed booking holds and return their seats.'
+
+    def handle(self, *args, **options):
+        expired = expire_holds()
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired:,} holds.'))
@@ -0,0 +1,17 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.uploads import expire
+
+
+class Command(BaseCommand):
+    help = 'Delete image uploads idle for longer than --hours, with their part files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24)
+
+    def handle(self, *args, **options):
+        expired = expire(timezone.now() - datetime.timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired:,} uploads.'))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.queries import canonical_queries
+
+
+def query_plan(queryset):
+    """``EXPLAIN QUERY PLAN`` detail lines for ``queryset`` on SQLite, indented by depth."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        rows = cursor.fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def is_full_scan(detail):
+    # "SCAN t USING [COVERING] INDEX ..." walks an index; a bare "SCAN t" reads every row.
+    detail = detail.strip()
+    return detail.startswith('SCAN ') and ' USING ' not in detail
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN over the canonical queries and flag full table scans and temp sorts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only flagged ones.')
+        parser.add_argument('--strict', action='store_true', help='Exit with an error if any query does a full scan.')
+
+    def handle(self, *args, **options):
+        if any(connections[alias].vendor != 'sqlite' for alias in connections):
+            raise CommandError('explain_queries understands SQLite query plans only.')
+        scans = []
+        for label, queryset in canonical_queries():
+            plan = query_plan(queryset)
+            scan = any(is_full_scan(line) for line in plan)
+            sort = any('USE TEMP B-TREE' in line for line in plan)
+            if scan:
+                scans.append(label)
+                status = self.style.ERROR('SCAN')
+            elif sort:
+                status = self.style.WARNING('SORT')
+            else:
+                status = self.style.SUCCESS('ok')
+            self.stdout.write(f'{status:<4} {label}')
+            if scan or sort or options['verbose_plans']:
+                for line in plan:
+                    self.stdout.write(f'       {line}')
+        if scans and options['strict']:
+            raise CommandError(f'{len(scans)} queries scan a whole table: {", ".join(scans)}')
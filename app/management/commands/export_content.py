@@ -0,0 +1,28 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.bulk import FORMATS, SPECS, detect_format, export_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream places, FAQs, events or place images to JSON Lines or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(SPECS))
+        parser.add_argument('path', help="Output file, or '-' for stdout.")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension, else jsonl.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        start = time.perf_counter()
+        stream = sys.stdout if options['path'] == '-' else open(options['path'], 'w', newline='', encoding='utf-8')
+        try:
+            written = write_rows(stream, fmt, options['kind'], export_rows(options['kind'], options['chunk_size']))
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.perf_counter() - start
+        self.stderr.write(f"Exported {written:,} {options['kind']} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s).")
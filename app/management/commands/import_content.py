@@ -0,0 +1,51 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.bulk import FORMATS, SPECS, BulkImportError, detect_format, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream places, FAQs, events or place images from JSON Lines or CSV, upserting on natural keys.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(SPECS))
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension, else jsonl.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT/UPDATE statement.')
+        parser.add_argument('--chunk-size', type=int, default=10_000, help='Rows per transaction.')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Skip search indexing; run rebuild_search_index afterwards.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        start = time.perf_counter()
+
+        def progress(totals):
+            elapsed = time.perf_counter() - start
+            self.stderr.write(
+                f"\r{totals['rows']:,} rows, {totals['created']:,} created, {totals['updated']:,} updated, "
+                f"{totals['rows'] / elapsed:,.0f} rows/s",
+                ending='',
+            )
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        try:
+            totals = import_rows(
+                options['kind'], read_rows(stream, fmt), batch_size=options['batch_size'],
+                chunk_size=options['chunk_size'], reindex=not options['no_index'], progress=progress,
+            )
+        except BulkImportError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stderr.write('')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['rows']:,} {options['kind']} rows ({totals['created']:,} created, "
+            f"{totals['updated']:,} updated) in {elapsed:.1f}s."
+        ))
+        if options['kind'] == 'image' and totals['created']:
+            self.stdout.write('Run build_image_renditions to generate renditions for the new images.')
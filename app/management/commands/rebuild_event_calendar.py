@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import event_calendar
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the EventWeek interval index from every event and its place.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = event_calendar.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows:,} event weeks in {time.perf_counter() - start:.1f}s.'
+        ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.forum import rebuild_thread_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute ForumPost reply counts and last activity from the replies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('post_ids', type=int, nargs='*', help='Limit the rebuild to these posts.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        updated = rebuild_thread_stats(options['post_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {updated:,} threads in {time.perf_counter() - start:.1f}s.'
+        ))
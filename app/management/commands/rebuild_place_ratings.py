@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.ratings import REBUILD_BATCH_SIZE, rebuild_place_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute Place rating aggregates from moderated reviews and repair drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('place_ids', type=int, nargs='*', help='Limit the rebuild to these places.')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        checked, repaired = rebuild_place_ratings(
+            place_ids=options['place_ids'] or None,
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked:,} places, repaired {repaired:,} in {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FTS5 search index over places, reviews, FAQs and travel stories.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('The search index requires the SQLite backend.')
+        start = time.perf_counter()
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt in {time.perf_counter() - start:.1f}s.'))
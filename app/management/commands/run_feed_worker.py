@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import feed
+
+
+class Command(BaseCommand):
+    help = 'Fan out activity that has not reached followers yet (e.g. after a crash or bulk import).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the backlog and exit.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--batch', type=int, default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = feed.drain_pending(options['batch'])
+            if processed:
+                self.stdout.write(f'Fanned out {processed} activities.')
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,183 @@
+"""Reference counts and garbage collection for content-addressed images.
+
+Every image field stores its file in ``ContentAddressedStorage``, where
+identical uploads share one blob, so a file can only be removed once no
+field points at it.  ``MediaBlob`` counts those references: signals
+compare each saved row's image names with the stored ones and apply the
+difference, and deletes release theirs.  Counts never delete anything by
+themselves.  ``collect_garbage()`` (``manage.py collect_media_garbage``)
+removes blobs whose count is zero, after checking the image fields
+directly since bulk writes bypass the signals, and only once the file has
+been untouched for a grace period, so an upload that is not yet saved
+onto a row survives.
+"""
+
+import functools
+import os
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import MediaBlob
+from .storage import ContentAddressedStorage, blob_storage, is_blob
+
+
+LOOKUP_CHUNK = 500
+
+
+@functools.cache
+def blob_fields():
+    """``{model: (field name, ...)}`` for every file field kept in content-addressed storage."""
+    fields = {}
+    for model in apps.get_app_config('app').get_models():
+        names = tuple(
+            field.name for field in model._meta.get_fields()
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+        )
+        if names:
+            fields[model] = names
+    return fields
+
+
+def _fields(model, update_fields=None):
+    names = blob_fields().get(model, ())
+    if update_fields is not None:
+        names = tuple(name for name in names if name in update_fields)
+    return names
+
+
+def references(instance, fields=None):
+    """The blob names ``instance`` points at, with how many of its fields point at each."""
+    names = (getattr(instance, name).name for name in fields or _fields(type(instance)))
+    return Counter(name for name in names if is_blob(name))
+
+
+def stored_references(instance, update_fields=None):
+    """``references()`` of the row as stored, or None when the save cannot change them."""
+    fields = _fields(type(instance), update_fields)
+    if not fields:
+        return None
+    if instance._state.adding or instance.pk is None:
+        return Counter()
+    row = type(instance).objects.filter(pk=instance.pk).values_list(*fields).first()
+    return Counter(name for name in row or () if is_blob(name))
+
+
+def add_references(counts):
+    """Add ``{name: n}`` to blob reference counts: an upsert per positive ``n``, an UPDATE per negative one."""
+    quote = connection.ops.quote_name
+    table = quote(MediaBlob._meta.db_table)
+    increments = [(name, n, timezone.now()) for name, n in counts.items() if n > 0]
+    decrements = [(n, name) for name, n in counts.items() if n < 0]
+    with connection.cursor() as cursor:
+        if increments:
+            cursor.executemany(
+                f'INSERT INTO {table} (name, ref_count, created_at) VALUES (%s, %s, %s) '
+                f'ON CONFLICT (name) DO UPDATE SET ref_count = ref_count + excluded.ref_count',
+                increments,
+            )
+        if decrements:
+            cursor.executemany(
+                f'UPDATE {table} SET ref_count = MAX(ref_count + %s, 0) WHERE name = %s', decrements,
+            )
+
+
+def instance_saved(instance, previous, update_fields=None):
+    """Apply the change in ``instance``'s references since ``previous`` (``stored_references()``)."""
+    if previous is None:
+        return
+    delta = references(instance, _fields(type(instance), update_fields))
+    delta.subtract(previous)
+    add_references({name: n for name, n in delta.items() if n})
+
+
+def instance_deleted(instance):
+    add_references({name: -n for name, n in references(instance).items()})
+
+
+# Garbage collection
+
+def reference_counts(names):
+    """How many image fields point at each of ``names``, read from the fields themselves."""
+    counts = Counter()
+    for model, fields in blob_fields().items():
+        for field in fields:
+            rows = model._default_manager.filter(**{f'{field}__in': names}).values_list(field)
+            counts.update(dict(rows.annotate(count=Count('pk'))))
+    return counts
+
+
+def _chunks(items, size=LOOKUP_CHUNK):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _set_counts(counts):
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, ref_count=n) for name, n in counts.items()],
+        update_conflicts=True, unique_fields=['name'], update_fields=['ref_count'],
+    )
+
+
+def recount():
+    """Recompute every stored reference count from the image fields; returns how many were wrong."""
+    repaired = 0
+    last_pk = 0
+    while True:
+        rows = MediaBlob.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'name', 'ref_count')
+        rows = list(rows[:LOOKUP_CHUNK])
+        if not rows:
+            return repaired
+        last_pk = rows[-1][0]
+        with transaction.atomic():
+            actual = reference_counts([name for _, name, _ in rows])
+            drifted = {name: actual[name] for _, name, stored in rows if actual[name] != stored}
+            _set_counts(drifted)
+        repaired += len(drifted)
+
+
+def collect_garbage(grace, dry_run=False):
+    """Delete blobs nothing points at that were untouched for ``grace``.
+
+    Returns ``(removed, freed_bytes, repaired)``; ``repaired`` counts blobs
+    whose stored count said zero while some field still pointed at them.
+    """
+    storage = blob_storage()
+    older_than = time.time() - grace.total_seconds()
+    removed = freed = repaired = 0
+    for chunk in _chunks(storage.blobs(older_than=older_than)):
+        sizes = dict(chunk)
+        counted = set(MediaBlob.objects.filter(name__in=sizes, ref_count__gt=0).values_list('name', flat=True))
+        candidates = [name for name in sizes if name not in counted]
+        if not candidates:
+            continue
+        with transaction.atomic():
+            still_used = reference_counts(candidates)
+            if not dry_run:
+                _set_counts(still_used)
+            repaired += len(still_used)
+            unreferenced = [name for name in candidates if name not in still_used]
+            if not dry_run:
+                MediaBlob.objects.filter(name__in=unreferenced).delete()
+        for name in unreferenced:
+            # Re-checked last: an upload of the same content refreshes the mtime.
+            if os.stat(storage.path(name)).st_mtime >= older_than:
+                continue
+            if not dry_run:
+                storage.purge(name)
+            removed += 1
+            freed += sizes[name]
+    if not dry_run:
+        for path in storage.abandoned_uploads(older_than):
+            os.remove(path)
+    return removed, freed, repaired
@@ -0,0 +1,78 @@
+# Generated by Django 5.1 on 2026-10-18 07:41
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Place = apps.get_model('app', 'Place')
+    Review = apps.get_model('app', 'Review')
+    stars = {f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    rows = (
+        Review.objects.filter(is_moderated=True)
+        .values('place_id')
+        .annotate(rating_count=Count('id'), rating_sum=Sum('rating'), **stars)
+    )
+    for row in rows.iterator():
+        place_id = row.pop('place_id')
+        row['rating_avg'] = row['rating_sum'] / row['rating_count']
+        Place.objects.filter(pk=place_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_place_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['rating_avg', 'id'], name='place_rating_avg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['rating_count', 'id'], name='place_rating_count_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+# Frozen copies of app.search.CREATE_INDEX and of what rebuild_index() inserts;
+# a migration must not import app code that follows the current models.
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS app_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    place_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+POPULATE_INDEX = [
+    "INSERT INTO app_search_index (rowid, kind, object_id, place_id, title, body) "
+    "SELECT id * 8 + 1, 'place', id, id, name, "
+    "short_description || ' ' || long_description || ' ' || location || ' ' || state || ' ' || country "
+    "FROM app_place",
+    "INSERT INTO app_search_index (rowid, kind, object_id, place_id, title, body) "
+    "SELECT id * 8 + 2, 'review', id, place_id, '', content FROM app_review WHERE is_moderated",
+    "INSERT INTO app_search_index (rowid, kind, object_id, place_id, title, body) "
+    "SELECT id * 8 + 3, 'faq', id, place_id, question, answer FROM app_faq",
+    "INSERT INTO app_search_index (rowid, kind, object_id, place_id, title, body) "
+    "SELECT id * 8 + 4, 'story', id, NULL, title, content FROM app_travelstory",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    for statement in POPULATE_INDEX:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS app_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_place_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_notification_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='seats',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Leave empty for unlimited', null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='seats_remaining',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventbooking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventbooking',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventbooking',
+            name='seats',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='travelpackage',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Leave empty for unlimited', null=True),
+        ),
+        migrations.AddField(
+            model_name='travelpackage',
+            name='seats_remaining',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('held', 'Held'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='confirmed', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='eventbooking',
+            name='status',
+            field=models.CharField(choices=[('held', 'Held'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='confirmed', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'held')), fields=['hold_expires_at'], name='booking_open_holds_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventbooking',
+            index=models.Index(condition=models.Q(('status', 'held')), fields=['hold_expires_at'], name='eventbooking_open_holds_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='booking_unique_idempotency_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventbooking',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='eventbooking_unique_idempotency_key'),
+        ),
+    ]
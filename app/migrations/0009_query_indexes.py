@@ -0,0 +1,77 @@
+# Generated by Django 5.1 on 2026-10-18 08:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicates(apps, schema_editor):
+    """Keep the oldest row of each pair so the unique constraints can be added."""
+    for model_name, fields in (('UserFollow', ('follower_id', 'followed_id')), ('Wishlist', ('user_id', 'place_id'))):
+        model = apps.get_model('app', model_name)
+        keep = model.objects.values(*fields).annotate(keep_id=Min('id')).values('keep_id')
+        model.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_booking_capacity'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='forumpost',
+            name='place',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='forum_posts', to='app.place'),
+        ),
+        migrations.AlterField(
+            model_name='userfollow',
+            name='followed',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='userfollow',
+            name='follower',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='wishlist',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['place', 'start_date', 'id'], name='event_place_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['place', '-post_date', '-id'], name='forumpost_place_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'id'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placeimage',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['place', '-upload_date', '-id'], name='placeimage_place_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_moderated', True)), fields=['place', '-date', '-id'], name='review_place_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfollow',
+            index=models.Index(fields=['followed', 'follower'], name='userfollow_followed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userfollow',
+            constraint=models.UniqueConstraint(fields=('follower', 'followed'), name='userfollow_unique_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='wishlist',
+            constraint=models.UniqueConstraint(fields=('user', 'place'), name='wishlist_unique_place'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1 on 2026-10-18 08:08
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_slugs(apps, schema_editor):
+    Place = apps.get_model('app', 'Place')
+    batch = []
+    for place in Place.objects.filter(slug__isnull=True).only('id', 'name').iterator(chunk_size=2000):
+        place.slug = f"{slugify(place.name)[:60] or 'place'}-{place.pk}"
+        batch.append(place)
+        if len(batch) >= 2000:
+            Place.objects.bulk_update(batch, ['slug'])
+            batch = []
+    Place.objects.bulk_update(batch, ['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='slug',
+            field=models.SlugField(blank=True, help_text='Generated from the name when left empty', max_length=80, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_slugs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_place_slug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ownershipclaim',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='ownershipclaim',
+            index=models.Index(fields=['status', 'id'], name='ownershipclaim_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['id'], name='place_unverified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placeimage',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['id'], name='placeimage_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_moderated', False)), fields=['id'], name='review_pending_idx'),
+        ),
+    ]
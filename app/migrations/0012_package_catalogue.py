@@ -0,0 +1,74 @@
+# Generated by Django 5.1 on 2026-10-18 08:20
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of app.guides.language_codes(), so later changes there do not alter this migration.
+SEPARATORS = re.compile(r'[,;/|]+|\s+(?:and|&)\s+', re.IGNORECASE)
+
+
+def language_codes(text):
+    codes = []
+    for part in SEPARATORS.split(text or ''):
+        code = ' '.join(part.split()).casefold()[:50]
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def backfill_languages(apps, schema_editor):
+    TouristGuide = apps.get_model('app', 'TouristGuide')
+    GuideLanguage = apps.get_model('app', 'GuideLanguage')
+    GuideLanguage.objects.bulk_create(
+        (GuideLanguage(guide_id=guide_id, code=code)
+         for guide_id, languages in TouristGuide.objects.values_list('id', 'languages').iterator(chunk_size=2000)
+         for code in language_codes(languages)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_moderation_queues'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuideLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='itinerary',
+            name='package',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='itineraries', to='app.travelpackage'),
+        ),
+        migrations.AddIndex(
+            model_name='itinerary',
+            index=models.Index(fields=['package', 'day_number'], name='itinerary_package_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelpackage',
+            index=models.Index(fields=['price', 'id'], name='travelpackage_price_idx'),
+        ),
+        migrations.AddField(
+            model_name='guidelanguage',
+            name='guide',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='language_tags', to='app.touristguide'),
+        ),
+        migrations.AddIndex(
+            model_name='guidelanguage',
+            index=models.Index(fields=['code', 'guide'], name='guidelanguage_code_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='guidelanguage',
+            constraint=models.UniqueConstraint(fields=('guide', 'code'), name='guidelanguage_unique_code'),
+        ),
+        migrations.RunPython(backfill_languages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-18 08:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_package_catalogue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.FloatField()),
+                ('stale', models.BooleanField(default=True)),
+                ('changed_at', models.DateTimeField()),
+                ('place', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='interactions', to='app.place')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='place_interactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['place', 'user'], name='placeinteraction_place_idx'), models.Index(condition=models.Q(('stale', True)), fields=['place'], name='placeinteraction_stale_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'place'), name='placeinteraction_unique_pair')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlaceSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('place', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='app.place')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_from', to='app.place')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['place', '-score', 'similar'], name='placesimilarity_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('place', 'similar'), name='placesimilarity_unique_pair')],
+            },
+        ),
+    ]
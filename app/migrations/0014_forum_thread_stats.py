@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-18 08:28
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_thread_stats(apps, schema_editor):
+    ForumPost = apps.get_model('app', 'ForumPost')
+    ForumReply = apps.get_model('app', 'ForumReply')
+    replies = ForumReply.objects.filter(post=OuterRef('pk'))
+    ForumPost.objects.update(
+        reply_count=Coalesce(Subquery(replies.values('post').annotate(total=Count('id')).values('total')), 0),
+        last_activity_at=Coalesce(
+            Subquery(replies.order_by('-reply_date').values('reply_date')[:1]), F('post_date'),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_place_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_thread_stats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['place', '-last_activity_at', '-id'], name='forumpost_place_active_idx'),
+        ),
+    ]
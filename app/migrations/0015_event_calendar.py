@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-18 08:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from app.event_calendar import weeks_spanned
+
+
+def backfill_weeks(apps, schema_editor):
+    Event = apps.get_model('app', 'Event')
+    EventWeek = apps.get_model('app', 'EventWeek')
+    rows = Event.objects.values_list('id', 'start_date', 'end_date', 'place__country', 'place__state')
+    EventWeek.objects.bulk_create(
+        (EventWeek(event_id=event_id, week=week, start_date=start, end_date=end, country=country, state=state)
+         for event_id, start, end, country, state in rows.iterator(chunk_size=2000)
+         for week in weeks_spanned(start, end)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_forum_thread_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('country', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('event', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='weeks', to='app.event')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week', 'start_date', 'end_date', 'event'], name='eventweek_week_idx'), models.Index(fields=['country', 'week', 'start_date', 'end_date', 'event'], name='eventweek_country_idx'), models.Index(fields=['state', 'week', 'start_date', 'end_date', 'event'], name='eventweek_state_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'week'), name='eventweek_unique_week')],
+            },
+        ),
+        migrations.RunPython(backfill_weeks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1 on 2026-10-18 08:46
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_user_stats(apps, schema_editor):
+    UserFollow = apps.get_model('app', 'UserFollow')
+    UserStats = apps.get_model('app', 'UserStats')
+    sources = [
+        ('followers', UserFollow.objects.all(), 'followed_id', Count('id')),
+        ('following', UserFollow.objects.all(), 'follower_id', Count('id')),
+        ('stories', apps.get_model('app', 'TravelStory').objects.all(), 'user_id', Count('id')),
+        ('reviews', apps.get_model('app', 'Review').objects.filter(is_moderated=True), 'user_id', Count('id')),
+        ('places_visited', apps.get_model('app', 'VisitedPlace').objects.all(), 'user_id',
+         Count('place_id', distinct=True)),
+        ('wishlist', apps.get_model('app', 'Wishlist').objects.all(), 'user_id', Count('id')),
+    ]
+    stats = defaultdict(dict)
+    for field, rows, column, count in sources:
+        for user_id, value in rows.values_list(column).annotate(count=count):
+            stats[user_id][field] = value
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id, **counts) for user_id, counts in stats.items()), batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_event_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers', models.IntegerField(default=0)),
+                ('following', models.IntegerField(default=0)),
+                ('stories', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0, help_text='Moderated reviews only')),
+                ('places_visited', models.IntegerField(default=0, help_text='Distinct places')),
+                ('wishlist', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='visitedplace',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='visitedplace',
+            index=models.Index(fields=['user', 'place'], name='visitedplace_user_place_idx'),
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
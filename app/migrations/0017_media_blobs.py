@@ -0,0 +1,49 @@
+# Generated by Django 5.1 on 2026-10-18 08:51
+
+import app.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='placeimage',
+            name='image',
+            field=models.ImageField(storage=app.storage.blob_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='travelpackage',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=app.storage.blob_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='travelstory',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=app.storage.blob_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='cover_image',
+            field=models.ImageField(blank=True, null=True, storage=app.storage.blob_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=app.storage.blob_storage, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-18 09:19
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Greatest, Least
+
+
+def clamp_ratings(apps, schema_editor):
+    # Rows written around the validators (bulk writes, raw SQL) would fail the
+    # new constraint; clamp them and recount their places' aggregates.
+    Place = apps.get_model('app', 'Place')
+    Review = apps.get_model('app', 'Review')
+    out_of_range = Review.objects.filter(Q(rating__lt=1) | Q(rating__gt=5))
+    place_ids = set(out_of_range.values_list('place_id', flat=True))
+    if not place_ids:
+        return
+    out_of_range.update(rating=Greatest(Least('rating', 5), 1))
+    stars = {f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    rows = (
+        Review.objects.filter(place_id__in=place_ids, is_moderated=True)
+        .values('place_id')
+        .annotate(rating_count=Count('id'), rating_sum=Sum('rating'), **stars)
+    )
+    for row in rows:
+        place_id = row.pop('place_id')
+        row['rating_avg'] = row['rating_sum'] / row['rating_count']
+        Place.objects.filter(pk=place_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_image_uploads'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(condition=models.Q(('rating__gte', 1), ('rating__lte', 5)), name='review_rating_range'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 09:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_review_rating_range'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forumpost',
+            name='post_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
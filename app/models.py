@@ -1,9 +1,15 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.utils.text import slugify
 
+from .storage import blob_storage
 
 
+# Upload paths from before images moved to content-addressed storage; migration 0001 still refers to them.
 def user_image_path(instance, filename):
     return f'users/{instance.id}/images/{filename}'
 
@@ -19,9 +25,14 @@ def travel_package_image_path(instance, filename):
 def travel_story_image_path(instance, filename):
     return f'travel_stories/{instance.title}/images/{filename}'
 
+def generate_slug(name):
+    return f"{slugify(name)[:60] or 'place'}-{uuid.uuid4().hex[:8]}"
+
 class User(AbstractUser):
-    profile_image = models.ImageField(upload_to=user_image_path, null=True, blank=True)
-    cover_image = models.ImageField(upload_to=user_image_path, null=True, blank=True)
+    profile_image = models.ImageField(storage=blob_storage, null=True, blank=True)
+    cover_image = models.ImageField(storage=blob_storage, null=True, blank=True)
+    profile_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    cover_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(blank=True)
     joined_date = models.DateTimeField(auto_now_add=True)
 
@@ -30,6 +41,9 @@ class User(AbstractUser):
 
 class Place(models.Model):
     name = models.CharField(max_length=255)
+    # Natural key for bulk import/export (see app/bulk.py).
+    slug = models.SlugField(max_length=80, unique=True, null=True, blank=True,
+                            help_text="Generated from the name when left empty")
     short_description = models.TextField()
     long_description = models.TextField()
     country = models.CharField(max_length=100)
@@ -42,16 +56,50 @@ class Place(models.Model):
     admin = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='administered_places')
     is_verified = models.BooleanField(default=False)
 
+    # Aggregates over moderated reviews, maintained by app.ratings.
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='place_lat_lng_idx'),
+            models.Index(fields=['rating_avg', 'id'], name='place_rating_avg_idx'),
+            models.Index(fields=['rating_count', 'id'], name='place_rating_count_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_verified=False), name='place_unverified_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = generate_slug(self.name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
 class PlaceImage(models.Model):
     place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='images')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    image = models.ImageField(upload_to=place_image_path)
+    image = models.ImageField(storage=blob_storage)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     upload_date = models.DateTimeField(auto_now_add=True)
     is_approved = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Partial: Django filters booleans as a bare column, which only a
+            # matching index condition (not an equality prefix) can serve.
+            models.Index(fields=['place', '-upload_date', '-id'], condition=models.Q(is_approved=True),
+                         name='placeimage_place_recent_idx'),
+            # The admin moderation queue.
+            models.Index(fields=['id'], condition=models.Q(is_approved=False), name='placeimage_pending_idx'),
+        ]
+
     def __str__(self):
         return f"{self.place.name} - Image {self.id}"
 
@@ -63,6 +111,17 @@ class Review(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     is_moderated = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            # save() skips the validators; app.ratings indexes a column per star.
+            models.CheckConstraint(condition=models.Q(rating__gte=1, rating__lte=5), name='review_rating_range'),
+        ]
+        indexes = [
+            models.Index(fields=['place', '-date', '-id'], condition=models.Q(is_moderated=True),
+                         name='review_place_recent_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_moderated=False), name='review_pending_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s review of {self.place.name}"
 
@@ -75,6 +134,23 @@ class TouristGuide(models.Model):
     def __str__(self):
         return f"Guide: {self.user.username}"
 
+class GuideLanguage(models.Model):
+    """One normalized entry of ``TouristGuide.languages``, kept in step by a signal (see app/guides.py)."""
+
+    guide = models.ForeignKey(TouristGuide, on_delete=models.CASCADE, related_name='language_tags', db_index=False)
+    code = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['guide', 'code'], name='guidelanguage_unique_code'),
+        ]
+        indexes = [
+            models.Index(fields=['code', 'guide'], name='guidelanguage_code_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.guide_id}: {self.code}"
+
 class TravelPackage(models.Model):
     guide = models.ForeignKey(TouristGuide, on_delete=models.CASCADE, related_name='packages')
     title = models.CharField(max_length=255)
@@ -83,16 +159,30 @@ class TravelPackage(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     inclusions = models.TextField()
     exclusions = models.TextField()
-    image = models.ImageField(upload_to=travel_package_image_path, null=True, blank=True)
+    image = models.ImageField(storage=blob_storage, null=True, blank=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text="Leave empty for unlimited")
+    seats_remaining = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['price', 'id'], name='travelpackage_price_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 class Itinerary(models.Model):
-    package = models.ForeignKey(TravelPackage, on_delete=models.CASCADE, related_name='itineraries')
+    # Prefetches read a package's days in order from the index below.
+    package = models.ForeignKey(TravelPackage, on_delete=models.CASCADE, related_name='itineraries', db_index=False)
     day_number = models.IntegerField()
     description = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['package', 'day_number'], name='itinerary_package_day_idx'),
+        ]
+
     def __str__(self):
         return f"{self.package.title} - Day {self.day_number}"
 
@@ -103,15 +193,68 @@ class Event(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     event_type = models.CharField(max_length=100)
+    capacity = models.PositiveIntegerField(null=True, blank=True, help_text="Leave empty for unlimited")
+    seats_remaining = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['place', 'start_date', 'id'], name='event_place_start_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+class EventWeek(models.Model):
+    """One week an event overlaps, for calendar range queries (see app/event_calendar.py).
+
+    ``week`` is the Monday, in UTC.  The event's bounds and its place's
+    country and state are copied in, so that a range query checks overlap
+    and region inside an index and reads only the events that match.
+    """
+
+    # The unique constraint leads with event and replaces the FK index.
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='weeks', db_index=False)
+    week = models.DateField()
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    country = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'week'], name='eventweek_unique_week'),
+        ]
+        indexes = [
+            models.Index(fields=['week', 'start_date', 'end_date', 'event'], name='eventweek_week_idx'),
+            models.Index(fields=['country', 'week', 'start_date', 'end_date', 'event'], name='eventweek_country_idx'),
+            models.Index(fields=['state', 'week', 'start_date', 'end_date', 'event'], name='eventweek_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id}: week of {self.week}"
+
 class ForumPost(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='forum_posts')
+    # forumpost_place_recent_idx leads with place and replaces the FK index.
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='forum_posts', db_index=False)
     content = models.TextField()
-    post_date = models.DateTimeField(auto_now_add=True)
+    # Set when the post is built rather than by auto_now_add, so save() can copy it.
+    post_date = models.DateTimeField(default=timezone.now, editable=False)
+    # Maintained by app.forum as replies are written and deleted.
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['place', '-post_date', '-id'], name='forumpost_place_recent_idx'),
+            models.Index(fields=['place', '-last_activity_at', '-id'], name='forumpost_place_active_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # A new thread was last active when it was posted.
+            self.last_activity_at = self.post_date
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username}'s post about {self.place.name}"
@@ -123,29 +266,59 @@ class ForumReply(models.Model):
     reply_date = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Reply to {self.post}"
+        return f"Reply to post {self.post_id}"
 
 class Wishlist(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The unique constraint's index leads with user, so no separate FK index.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     place = models.ForeignKey(Place, on_delete=models.CASCADE)
     date_added = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'place'], name='wishlist_unique_place'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s wishlist item: {self.place.name}"
 
 class VisitedPlace(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # visitedplace_user_place_idx leads with user and replaces the FK index.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     place = models.ForeignKey(Place, on_delete=models.CASCADE)
     visit_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'place'], name='visitedplace_user_place_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} visited {self.place.name}"
 
+class BookingStatus(models.TextChoices):
+    HELD = 'held', 'Held'
+    CONFIRMED = 'confirmed', 'Confirmed'
+    CANCELLED = 'cancelled', 'Cancelled'
+    EXPIRED = 'expired', 'Expired'
+
+
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     package = models.ForeignKey(TravelPackage, on_delete=models.CASCADE)
     booking_date = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(max_length=50)
+    status = models.CharField(max_length=50, choices=BookingStatus.choices, default=BookingStatus.CONFIRMED)
+    seats = models.PositiveSmallIntegerField(default=1)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='booking_unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['hold_expires_at'], condition=models.Q(status='held'), name='booking_open_holds_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s booking for {self.package.title}"
@@ -155,7 +328,19 @@ class EventBooking(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     date = models.DateField()
     time = models.TimeField()
-    status = models.CharField(max_length=50)
+    status = models.CharField(max_length=50, choices=BookingStatus.choices, default=BookingStatus.CONFIRMED)
+    seats = models.PositiveSmallIntegerField(default=1)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='eventbooking_unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['hold_expires_at'], condition=models.Q(status='held'),
+                         name='eventbooking_open_holds_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s booking for {self.event.title}"
@@ -166,15 +351,98 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='notification_user_id_idx'),
+            models.Index(fields=['user', 'id'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username}: {self.content[:50]}..."
 
+
+class NotificationCounter(models.Model):
+    """Unread notification count per user, kept in step by app.notifications."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+class UserStats(models.Model):
+    """Profile counters per user, kept in step by app.counters and repaired by ``rebuild_user_stats``."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    followers = models.IntegerField(default=0)
+    following = models.IntegerField(default=0)
+    stories = models.IntegerField(default=0)
+    reviews = models.IntegerField(default=0, help_text="Moderated reviews only")
+    places_visited = models.IntegerField(default=0, help_text="Distinct places")
+    wishlist = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for user {self.user_id}"
+
+class MediaBlob(models.Model):
+    """A file in content-addressed storage and how many image fields point at it.
+
+    Kept in step by app.media; ``collect_media_garbage`` deletes blobs left unreferenced.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.name
+
+class UploadStatus(models.TextChoices):
+    RECEIVING = 'receiving', 'Receiving'
+    PROCESSING = 'processing', 'Processing'
+    DONE = 'done', 'Done'
+    FAILED = 'failed', 'Failed'
+
+class ImageUpload(models.Model):
+    """A resumable, chunked place image upload; see app.uploads."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_uploads')
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='+')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=UploadStatus.choices, default=UploadStatus.RECEIVING)
+    error = models.CharField(max_length=255, blank=True)
+    image = models.ForeignKey(PlaceImage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Expiry scans idle uploads.
+            models.Index(fields=['updated_at'], name='imageupload_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+class ClaimStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    APPROVED = 'approved', 'Approved'
+    REJECTED = 'rejected', 'Rejected'
+
 class OwnershipClaim(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     place = models.ForeignKey(Place, on_delete=models.CASCADE)
-    status = models.CharField(max_length=50)
+    status = models.CharField(max_length=50, choices=ClaimStatus.choices, default=ClaimStatus.PENDING)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='ownershipclaim_status_idx'),
+        ]
+
     def __str__(self):
         return f"Claim for {self.place.name} by {self.user.username}"
 
@@ -183,7 +451,8 @@ class TravelStory(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
     published_at = models.DateTimeField(auto_now_add=True)
-    image = models.ImageField(upload_to=travel_story_image_path, null=True, blank=True)
+    image = models.ImageField(storage=blob_storage, null=True, blank=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.title
@@ -197,9 +466,120 @@ class FAQ(models.Model):
         return f"FAQ for {self.place.name}: {self.question[:50]}..."
 
 class UserFollow(models.Model):
-    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
-    followed = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+    # Both directions are served by the two-column indexes below, which also
+    # cover the other id, so the single-column FK indexes are left out.
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following', db_index=False)
+    followed = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers', db_index=False)
     followed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followed'], name='userfollow_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['followed', 'follower'], name='userfollow_followed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower.username} follows {self.followed.username}"
+
+class Activity(models.Model):
+    STORY = 'story'
+    REVIEW = 'review'
+    VISIT = 'visit'
+    VERB_CHOICES = [(STORY, 'Published a story'), (REVIEW, 'Reviewed a place'), (VISIT, 'Visited a place')]
+
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+    fanned_out = models.BooleanField(default=False)
+    merge_on_read = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['verb', 'object_id'], name='activity_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['actor', 'created_at', 'id'], name='activity_actor_time_idx'),
+            models.Index(fields=['id'], condition=models.Q(fanned_out=False), name='activity_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} {self.object_id}"
+
+
+class FeedItem(models.Model):
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_items', db_index=False)
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name='feed_items')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'activity'], name='feeditem_unique_activity'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'created_at', 'activity'], name='feeditem_owner_time_idx'),
+            models.Index(fields=['owner', 'actor'], name='feeditem_owner_actor_idx'),
+        ]
+
+    def __str__(self):
+        return f"Feed item {self.activity_id} for {self.owner_id}"
+
+
+class FeedCelebrity(models.Model):
+    """Users with too many followers to fan out to; their activity is merged on read."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='feed_celebrity')
+    follower_count = models.PositiveIntegerField()
+    marked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Celebrity {self.user_id}"
+
+
+class PlaceInteraction(models.Model):
+    """How strongly a user has engaged with a place (see app/recommendations.py).
+
+    ``stale`` marks places whose similarities need recomputing; a row whose
+    weight drops to zero is kept as a marker until that has happened.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='place_interactions', db_index=False)
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='interactions', db_index=False)
+    weight = models.FloatField()
+    stale = models.BooleanField(default=True)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'place'], name='placeinteraction_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['place', 'user'], name='placeinteraction_place_idx'),
+            models.Index(fields=['place'], condition=models.Q(stale=True), name='placeinteraction_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.place_id}: {self.weight}"
+
+
+class PlaceSimilarity(models.Model):
+    """One of a place's top neighbours by item-item cosine similarity, precomputed offline."""
+
+    place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='similarities', db_index=False)
+    similar = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='similar_from')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['place', 'similar'], name='placesimilarity_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['place', '-score', 'similar'], name='placesimilarity_top_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.follower.username} follows {self.followed.username}"
\ No newline at end of file
+        return f"{self.place_id} ~ {self.similar_id}: {self.score:.3f}"
@@ -0,0 +1,59 @@
+"""Bulk moderation for the admin queues.
+
+Each change is one UPDATE over the selected rows.  ``QuerySet.update`` sends
+no signals, so the work the signal handlers would have done per row (rating
+aggregates, recommendation weights, search rows, feed activity, cache
+generations, profile counters) is redone here once for the whole batch.
+"""
+
+import itertools
+from collections import Counter
+
+from django.db import transaction
+
+from . import cache, counters, feed, recommendations, search
+from .models import Activity
+from .ratings import rebuild_place_ratings
+from .signals import CACHE_NAMESPACES
+
+
+def _invalidate(model, rows):
+    namespaces = set(itertools.chain.from_iterable(CACHE_NAMESPACES[model](row) for row in rows))
+    transaction.on_commit(lambda: cache.invalidate(*namespaces))
+
+
+@transaction.atomic
+def set_reviews_moderated(queryset, moderated):
+    """Approve or reject reviews; returns how many changed state."""
+    pending = queryset.exclude(is_moderated=moderated)
+    rows = list(pending.only('id', 'user_id', 'place_id', 'date'))
+    if not rows:
+        return 0
+    changed = pending.update(is_moderated=moderated)
+    rebuild_place_ratings({row.place_id for row in rows})
+    recommendations.interactions_changed({(row.user_id, row.place_id) for row in rows})
+    sign = 1 if moderated else -1
+    counters.add('reviews', {user_id: sign * count for user_id, count in Counter(row.user_id for row in rows).items()})
+    search.reindex('review', [row.pk for row in rows])
+    if moderated:
+        feed.record_activities(Activity.REVIEW, [(row.user_id, row.pk, row.date, row.place_id) for row in rows])
+    else:
+        feed.remove_activities(Activity.REVIEW, [row.pk for row in rows])
+    _invalidate(queryset.model, rows)
+    return changed
+
+
+@transaction.atomic
+def set_images_approved(queryset, approved):
+    pending = queryset.exclude(is_approved=approved)
+    rows = list(pending.only('id', 'place_id'))
+    if not rows:
+        return 0
+    changed = pending.update(is_approved=approved)
+    _invalidate(queryset.model, rows)
+    return changed
+
+
+def set_claims_status(queryset, status):
+    # Claims have no derived data to refresh.
+    return queryset.exclude(status=status).update(status=status)
@@ -0,0 +1,186 @@
+import asyncio
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+
+from .models import Notification, NotificationCounter
+
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Broker:
+    """Wake server-sent-event streams in this process when a user gets mail.
+
+    ``publish`` may be called from any thread; subscribers are asyncio events
+    living on the ASGI event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers[user_id].add(waiter)
+        return waiter
+
+    def unsubscribe(self, user_id, waiter):
+        with self._lock:
+            self._subscribers[user_id].discard(waiter)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def publish(self, user_ids):
+        with self._lock:
+            waiters = [waiter for user_id in user_ids for waiter in self._subscribers.get(user_id, ())]
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+
+broker = Broker()
+
+
+def increment_unread(counts):
+    """Add ``{user_id: n}`` to the unread counters with one upsert statement."""
+    if not counts:
+        return
+    table = NotificationCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (user_id, unread) VALUES (%s, %s) '
+            'ON CONFLICT (user_id) DO UPDATE SET unread = unread + excluded.unread',
+            list(counts.items()),
+        )
+
+
+def write_batch(pending):
+    """Insert ``[(user_id, content), ...]`` and bump counters in one transaction."""
+    if not pending:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(
+            [Notification(user_id=user_id, content=content) for user_id, content in pending],
+            batch_size=_setting('NOTIFICATION_BATCH_SIZE', 500),
+        )
+        increment_unread(Counter(user_id for user_id, _ in pending))
+    broker.publish({user_id for user_id, _ in pending})
+    return created
+
+
+class NotificationQueue:
+    """Buffer notifications in memory and flush them in batches from one thread.
+
+    A flush happens when ``NOTIFICATION_BATCH_SIZE`` items are waiting or
+    ``NOTIFICATION_FLUSH_INTERVAL`` seconds have passed, and once more at exit.
+    A batch that fails to write (the database is locked, say) goes back to the
+    front of the buffer and is retried, the interval doubling each time, for
+    up to ``NOTIFICATION_MAX_ATTEMPTS`` attempts before it is dropped.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._failures = 0
+
+    def put(self, user_id, content):
+        with self._lock:
+            self._buffer.append((user_id, content))
+            full = len(self._buffer) >= _setting('NOTIFICATION_BATCH_SIZE', 500)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='notifications', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write what is buffered; returns how many notifications were written."""
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        try:
+            write_batch(pending)
+        except Exception:
+            self._failures += 1
+            if self._failures >= _setting('NOTIFICATION_MAX_ATTEMPTS', 5):
+                logger.exception('Dropping %d notifications after %d attempts', len(pending), self._failures)
+                self._failures = 0
+            else:
+                logger.warning('Could not write %d notifications; retrying', len(pending), exc_info=True)
+                with self._lock:
+                    self._buffer[:0] = pending
+            return 0
+        self._failures = 0
+        return len(pending)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(_setting('NOTIFICATION_FLUSH_INTERVAL', 0.5) * 2 ** self._failures)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+    def __len__(self):
+        return len(self._buffer)
+
+
+queue = NotificationQueue()
+
+
+def notify(user_id, content):
+    """Queue a notification once the surrounding transaction commits.
+
+    With ``NOTIFICATION_FLUSH_INTERVAL = 0`` it is written immediately instead.
+    """
+    def enqueue():
+        if _setting('NOTIFICATION_FLUSH_INTERVAL', 0.5) <= 0:
+            write_batch([(user_id, content)])
+        else:
+            queue.put(user_id, content)
+
+    transaction.on_commit(enqueue)
+
+
+def unread_count(user_id):
+    return NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first() or 0
+
+
+def mark_read(user_id, notification_id):
+    with transaction.atomic():
+        changed = Notification.objects.filter(pk=notification_id, user_id=user_id, is_read=False).update(is_read=True)
+        if changed:
+            NotificationCounter.objects.filter(user_id=user_id).update(unread=F('unread') - changed)
+    return bool(changed)
+
+
+def mark_all_read(user_id):
+    """One UPDATE for the notifications; the counter is reset rather than decremented."""
+    with transaction.atomic():
+        changed = Notification.objects.filter(user_id=user_id, is_read=False).update(is_read=True)
+        NotificationCounter.objects.filter(user_id=user_id).update(unread=0)
+    return changed
+
+
+def read_state_changed(old, new):
+    """Keep the counter in step with saves and deletes that bypass the helpers above."""
+    was_unread = old is not None and not old.is_read
+    is_unread = new is not None and not new.is_read
+    if was_unread == is_unread:
+        return
+    user_id = (new or old).user_id
+    if is_unread:
+        increment_unread({user_id: 1})
+    else:
+        NotificationCounter.objects.filter(user_id=user_id).update(unread=F('unread') - 1)
@@ -0,0 +1,321 @@
+"""Per-request performance instrumentation.
+
+``PerformanceMiddleware`` records, for every request, the wall time, the
+SQL queries run (count, total time and exact duplicates) and the time
+spent building serializer data and rendering JSON.  The figures go into a
+rolling window of samples per route, served as p50/p95/p99 at
+``/app/metrics``, and out as a ``Server-Timing`` header to staff, or to
+everyone with ``PERFORMANCE_SERVER_TIMING``.  Staff can add ``?profile=1``
+to get a sampling profile of the request instead of its body.
+
+Queries are seen through an execute wrapper installed on every connection
+as it opens; it reports to the request bound in a context variable, so
+queries run from ``sync_to_async`` threads are counted too.  Serializers
+built on ``TimedSerializerMixin`` and ``TimedJSONRenderer`` (DRF's default
+renderer in settings) add their time to the same request.  Work done
+while a streaming response is being consumed is not included.  Metrics
+are per process.
+"""
+
+import contextvars
+import logging
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('performance_request', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RequestStats:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.spans = defaultdict(float)
+        self._open = set()
+
+    def record_query(self, sql, params, many, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        # An executemany() batch is never counted as a duplicate of another.
+        self.statements[sql, self.queries if many else repr(params)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier one exactly, parameters included."""
+        return self.queries - len(self.statements)
+
+    def most_repeated(self):
+        (sql, _), count = self.statements.most_common(1)[0]
+        return sql, count
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        db = f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries ({self.duplicates} duplicate)"'
+        entries = [f'total;dur={self.total * 1000:.2f}', db]
+        entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.spans.items()]
+        return ', '.join(entries)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, params, many, time.perf_counter() - start)
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the current request's ``name`` timing.
+
+    Nested spans of the same name count once, for the outermost block.
+    """
+    stats = _current.get()
+    if stats is None or name in stats._open:
+        yield
+        return
+    stats._open.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.spans[name] += time.perf_counter() - start
+        stats._open.discard(name)
+
+
+class TimedSerializerMixin:
+    """Count a serializer's ``to_representation`` towards the request's ``serialize`` timing."""
+
+    def to_representation(self, instance):
+        with span('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """DRF's ``JSONRenderer``, counted towards the request's ``render`` timing."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+# Route histograms
+
+def percentile(samples, fraction):
+    """The ``fraction`` percentile of already sorted ``samples`` (0 when empty)."""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+
+class RouteMetrics:
+    """The last ``window`` samples of every route, plus lifetime counts, behind one lock."""
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = {}
+        self._counts = Counter()
+        self._duplicates = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, route, stats):
+        with self._lock:
+            samples = self._samples.get(route)
+            if samples is None:
+                samples = self._samples[route] = deque(maxlen=self.window)
+            samples.append((stats.total * 1000, stats.db_time * 1000, stats.queries))
+            self._counts[route] += 1
+            self._duplicates[route] += stats.duplicates
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: list(samples) for route, samples in self._samples.items()}
+            counts, duplicates = dict(self._counts), dict(self._duplicates)
+        result = {}
+        for route, samples in sorted(routes.items()):
+            summary = {'count': counts[route], 'window': len(samples), 'duplicate_queries': duplicates[route]}
+            for index, name in enumerate(('total_ms', 'db_ms', 'queries')):
+                values = sorted(sample[index] for sample in samples)
+                summary[name] = {
+                    label: round(percentile(values, fraction), 3)
+                    for label, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+                }
+            result[route] = summary
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._duplicates.clear()
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def route_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RouteMetrics(_setting('PERFORMANCE_WINDOW', 1000))
+        return _metrics
+
+
+def route_of(request):
+    match = request.resolver_match
+    return f"{request.method} {'/' + match.route if match is not None else '<unmatched>'}"
+
+
+# Profiling
+
+class Sampler(threading.Thread):
+    """A sampling profiler for one thread, reported as collapsed stacks.
+
+    Every ``interval`` seconds it reads the target thread's current frame
+    and counts the stack, outermost call first.  The output is one
+    ``frame;frame;... count`` line per stack, the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='performance-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def profile_response(request, sampler, stats):
+    samples = sum(sampler.stacks.values())
+    header = (
+        f'# {route_of(request)}: {stats.total * 1000:.1f} ms, {stats.queries} queries '
+        f'({stats.db_time * 1000:.1f} ms, {stats.duplicates} duplicate), '
+        f'{samples} samples every {sampler.interval * 1000:g} ms\n'
+    )
+    return HttpResponse(header + sampler.collapsed(), content_type='text/plain; charset=utf-8')
+
+
+# Middleware
+
+class PerformanceMiddleware:
+    """Time each request and report it; see the module docstring.
+
+    Place it after ``AuthenticationMiddleware``: ``Server-Timing`` and
+    ``?profile=1`` check that the user is staff.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _setting('PERFORMANCE_METRICS_ENABLED', True):
+            return self.get_response(request)
+        staff = request.user.is_staff
+        stats, token, sampler = self.start(staff and request.GET.get('profile') == '1')
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, sampler, staff)
+
+    async def __acall__(self, request):
+        if not _setting('PERFORMANCE_METRICS_ENABLED', True):
+            return await self.get_response(request)
+        staff = (await request.auser()).is_staff
+        stats, token, sampler = self.start(staff and request.GET.get('profile') == '1')
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, sampler, staff)
+
+    def start(self, profile):
+        sampler = None
+        if profile:
+            sampler = Sampler(threading.get_ident(), _setting('PERFORMANCE_PROFILE_INTERVAL', 0.001))
+            sampler.start()
+        stats = RequestStats()
+        return stats, _current.set(stats), sampler
+
+    def finish(self, request, response, stats, sampler, staff):
+        stats.finish()
+        if sampler is not None:
+            sampler.stop()
+            response = profile_response(request, sampler, stats)
+        route_metrics().record(route_of(request), stats)
+        threshold = _setting('PERFORMANCE_DUPLICATE_WARNING', 5)
+        if threshold and stats.duplicates >= threshold:
+            sql, count = stats.most_repeated()
+            logger.warning('%s ran %d duplicate queries; most repeated (%dx): %s',
+                           route_of(request), stats.duplicates, count, sql)
+        if staff or _setting('PERFORMANCE_SERVER_TIMING', False):
+            response.headers['Server-Timing'] = stats.server_timing()
+        return response
+
+
+# Setup
+
+def _track_queries(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+_installed = False
+
+
+def install():
+    """Hook query tracking into every new connection."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_track_queries, dispatch_uid='performance_track_queries')
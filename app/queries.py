@@ -0,0 +1,123 @@
+import datetime
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .event_calendar import CALENDAR_ORDERING, events_between
+from .forum import REPLY_ORDERING, THREAD_ORDERING
+from .geo import candidates_in_box
+from .recommendations import recommended_places
+from .models import (
+    FAQ, Activity, BookingStatus, Event, EventBooking, FeedItem, ForumPost, ForumReply, GuideLanguage, Itinerary,
+    Notification, Place, PlaceImage, PlaceSimilarity, Review, TravelPackage, User, UserFollow, VisitedPlace, Wishlist,
+)
+
+
+DETAIL_REVIEWS = 20
+DETAIL_EVENTS = 20
+DETAIL_FORUM_POSTS = 10
+
+
+def place_detail_queryset(now=None):
+    """Places with everything ``PlaceDetailSerializer`` renders, in six queries.
+
+    One query for the place and one per relation, however many related rows
+    exist: approved images, the latest moderated reviews with their authors,
+    upcoming events, FAQs and the latest forum posts (reply counts are stored
+    on the post).  Sliced prefetches need ``to_attr``, hence the renamed
+    attributes.
+    """
+    now = now or timezone.now()
+    return Place.objects.prefetch_related(
+        Prefetch(
+            'images',
+            PlaceImage.objects.filter(is_approved=True).order_by('-upload_date', '-id'),
+            to_attr='approved_images',
+        ),
+        Prefetch(
+            'reviews',
+            Review.objects.filter(is_moderated=True).select_related('user').order_by('-date', '-id')[:DETAIL_REVIEWS],
+            to_attr='latest_reviews',
+        ),
+        Prefetch(
+            'events',
+            Event.objects.filter(end_date__gte=now).order_by('start_date', 'id')[:DETAIL_EVENTS],
+            to_attr='upcoming_events',
+        ),
+        'faqs',
+        Prefetch(
+            'forum_posts',
+            ForumPost.objects.select_related('user').order_by('-post_date', '-id')[:DETAIL_FORUM_POSTS],
+            to_attr='latest_forum_posts',
+        ),
+    )
+
+
+def package_catalogue_queryset():
+    """Packages with everything ``PackageCatalogueSerializer`` renders, in three queries.
+
+    The guide and its user are joined in; days and language tags are
+    prefetched in order, however many packages a page holds.
+    """
+    return TravelPackage.objects.select_related('guide__user').prefetch_related(
+        # Leading with package_id lets the IN (...) prefetch walk the index in order.
+        Prefetch('itineraries', Itinerary.objects.order_by('package_id', 'day_number', 'id')),
+        Prefetch('guide__language_tags', GuideLanguage.objects.order_by('code')),
+    )
+
+
+def canonical_queries(place_id=1, user_id=1, now=None):
+    """``(label, queryset)`` for the hot queries the app runs, for ``explain_queries``.
+
+    Prefetches are written for the single place the detail view loads; the
+    ids are placeholders since only the plan matters.
+    """
+    now = now or timezone.now()
+    week = datetime.timedelta(days=7)
+    return [
+        ('places by rating', Place.objects.order_by('-rating_avg', '-id')[:50]),
+        ('places by review count', Place.objects.filter(rating_count__gte=5).order_by('-rating_count', '-id')[:50]),
+        ('places keyset page', Place.objects.filter(id__gt=1000).order_by('id')[:50]),
+        ('places nearby', candidates_in_box(27.7, 85.3, 5)),
+        ('place detail', Place.objects.filter(pk=place_id)),
+        ('place approved images',
+         PlaceImage.objects.filter(place_id=place_id, is_approved=True).order_by('-upload_date', '-id')),
+        ('place latest reviews',
+         Review.objects.filter(place_id=place_id, is_moderated=True).order_by('-date', '-id')),
+        ('place upcoming events',
+         Event.objects.filter(place_id=place_id, end_date__gte=now).order_by('start_date', 'id')),
+        ('place faqs', FAQ.objects.filter(place_id=place_id)),
+        ('place latest forum posts', ForumPost.objects.filter(place_id=place_id).order_by('-post_date', '-id')),
+        ('place forum threads',
+         ForumPost.objects.filter(place_id=place_id).select_related('user').order_by(*THREAD_ORDERING)[:20]),
+        ('thread replies',
+         ForumReply.objects.filter(post_id=1, id__gt=1000).select_related('user').order_by(*REPLY_ORDERING)[:50]),
+        ('user notifications', Notification.objects.filter(user_id=user_id).order_by('-id')[:50]),
+        ('user unread notifications',
+         Notification.objects.filter(user_id=user_id, is_read=False).order_by('-id')[:50]),
+        ('user followers', UserFollow.objects.filter(followed_id=user_id).values_list('follower_id', flat=True)),
+        ('user following', UserFollow.objects.filter(follower_id=user_id).values_list('followed_id', flat=True)),
+        ('follow exists', UserFollow.objects.filter(follower_id=user_id, followed_id=user_id + 1)),
+        ('user feed page', FeedItem.objects.filter(owner_id=user_id).order_by('-created_at', '-activity_id')[:20]),
+        ('user activity', Activity.objects.filter(actor_id=user_id).order_by('-created_at', '-id')[:50]),
+        ('user profile', User.objects.select_related('stats').filter(pk=user_id)),
+        ('repeat visit', VisitedPlace.objects.filter(user_id=user_id, place_id=place_id).exclude(pk=1)),
+        ('user wishlist', Wishlist.objects.filter(user_id=user_id)),
+        ('wishlist contains', Wishlist.objects.filter(user_id=user_id, place_id=place_id)),
+        ('packages by price', TravelPackage.objects.order_by('price', 'id')[:20]),
+        ('package itineraries',
+         Itinerary.objects.filter(package_id__in=[1, 2]).order_by('package_id', 'day_number', 'id')),
+        ('guides speaking',
+         TravelPackage.objects.filter(guide__in=GuideLanguage.objects.filter(code='english').values('guide'))),
+        ('similar places',
+         PlaceSimilarity.objects.filter(place_id=place_id)
+         .select_related('similar').order_by('-score', 'similar_id')[:10]),
+        ('user recommendations', recommended_places(user_id, 20)),
+        # The calendar sorts its matches in a temp B-tree: only the covered weeks' events, never the table.
+        ('event calendar week', events_between(now, now + week).order_by(*CALENDAR_ORDERING)[:100]),
+        ('event calendar by country',
+         events_between(now, now + 4 * week, country='Nepal').order_by(*CALENDAR_ORDERING)[:100]),
+        ('event calendar by state',
+         events_between(now, now + 4 * week, state='Bagmati').order_by(*CALENDAR_ORDERING)[:100]),
+        ('lapsed event holds', EventBooking.objects.filter(status=BookingStatus.HELD, hold_expires_at__lte=now)),
+    ]
@@ -0,0 +1,92 @@
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import Place, Review
+
+
+STAR_FIELDS = {star: f'rating_{star}' for star in range(1, 6)}
+AGGREGATE_FIELDS = ['rating_count', 'rating_sum', 'rating_avg', *STAR_FIELDS.values()]
+REBUILD_BATCH_SIZE = 2000
+
+
+def counts_towards_rating(review):
+    return review.is_moderated
+
+
+def apply_rating_delta(place_id, rating, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one review's rating from a place.
+
+    A single UPDATE built from F-expressions, so concurrent writers never lose
+    increments.  ``rating_avg`` is computed from the pre-update columns, as SQL
+    evaluates every right-hand side against the old row.
+    """
+    count = F('rating_count') + sign
+    total = F('rating_sum') + sign * rating
+    Place.objects.filter(pk=place_id).update(
+        rating_count=count,
+        rating_sum=total,
+        rating_avg=Case(
+            When(rating_count__lte=-sign, then=Value(0.0)),
+            default=Cast(total, FloatField()) / count,
+            output_field=FloatField(),
+        ),
+        **{STAR_FIELDS[rating]: F(STAR_FIELDS[rating]) + sign},
+    )
+
+
+def review_changed(old, new):
+    """Apply the difference between two states of a review (either may be None)."""
+    old_key = (old.place_id, old.rating) if old is not None and counts_towards_rating(old) else None
+    new_key = (new.place_id, new.rating) if new is not None and counts_towards_rating(new) else None
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        apply_rating_delta(*old_key, sign=-1)
+    if new_key is not None:
+        apply_rating_delta(*new_key, sign=1)
+
+
+def _aggregates(place_ids):
+    star_counts = {
+        field: Count('id', filter=Q(rating=star)) for star, field in STAR_FIELDS.items()
+    }
+    rows = (
+        Review.objects.filter(place_id__in=place_ids, is_moderated=True)
+        .values('place_id')
+        .annotate(rating_count=Count('id'), rating_sum=Sum('rating'), **star_counts)
+    )
+    return {row.pop('place_id'): row for row in rows}
+
+
+def rebuild_place_ratings(place_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """Recompute rating aggregates from ``Review`` and fix any drifted places.
+
+    Walks places in primary-key batches so memory stays bounded; only rows
+    whose stored aggregates differ are written.  Returns ``(checked, repaired)``.
+    """
+    places = Place.objects.order_by('pk').only('pk', *AGGREGATE_FIELDS)
+    if place_ids is not None:
+        places = places.filter(pk__in=place_ids)
+    checked = repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(places.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        aggregates = _aggregates([place.pk for place in batch])
+        drifted = []
+        for place in batch:
+            expected = aggregates.get(place.pk, {})
+            expected = {field: expected.get(field, 0) for field in AGGREGATE_FIELDS if field != 'rating_avg'}
+            count = expected['rating_count']
+            expected['rating_avg'] = expected['rating_sum'] / count if count else 0.0
+            if any(getattr(place, field) != value for field, value in expected.items()):
+                for field, value in expected.items():
+                    setattr(place, field, value)
+                drifted.append(place)
+        if drifted:
+            Place.objects.bulk_update(drifted, AGGREGATE_FIELDS)
+        checked += len(batch)
+        repaired += len(drifted)
+    return checked, repaired
@@ -0,0 +1,282 @@
+"""Item-item place recommendations from wishlists, visits and reviews.
+
+``PlaceInteraction`` holds one weight per user and place, kept current by
+signals.  ``refresh()`` runs offline (``manage.py build_recommendations``):
+it computes the cosine similarity between places' interaction vectors and
+stores each place's top neighbours in ``PlaceSimilarity``, which the API
+reads with a single indexed query.  Only places whose interactions changed
+since the last run, and the neighbour lists that mention them, are redone.
+"""
+
+import heapq
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from . import cache
+from .models import Place, PlaceInteraction, PlaceSimilarity, Review, VisitedPlace, Wishlist
+
+
+WISHLIST_WEIGHT = 1.0
+VISIT_WEIGHT = 2.0
+# A moderated review adds its best rating minus this: 3 for five stars, nothing for two or fewer.
+REVIEW_BASELINE = 2
+WRITE_CHUNK = 1000
+LOOKUP_CHUNK = 5000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _slices(ids, size=LOOKUP_CHUNK):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+# Interactions
+
+def interaction_weights(pairs):
+    """The current weight of each ``(user_id, place_id)`` in ``pairs``, read from the source tables."""
+    weights = dict.fromkeys(pairs, 0.0)
+    users = {user_id for user_id, _ in weights}
+    places = {place_id for _, place_id in weights}
+    for key in Wishlist.objects.filter(user_id__in=users, place_id__in=places).values_list('user_id', 'place_id'):
+        if key in weights:
+            weights[key] += WISHLIST_WEIGHT
+    visits = VisitedPlace.objects.filter(user_id__in=users, place_id__in=places).values_list('user_id', 'place_id')
+    for key in visits.distinct():
+        if key in weights:
+            weights[key] += VISIT_WEIGHT
+    reviews = (
+        Review.objects.filter(user_id__in=users, place_id__in=places, is_moderated=True)
+        .values('user_id', 'place_id').annotate(best=Max('rating')).values_list('user_id', 'place_id', 'best')
+    )
+    for user_id, place_id, best in reviews:
+        if (user_id, place_id) in weights:
+            weights[user_id, place_id] += max(best - REVIEW_BASELINE, 0)
+    return weights
+
+
+def interactions_changed(pairs):
+    """Re-derive the weights of ``(user_id, place_id)`` pairs and mark changed places stale."""
+    weights = interaction_weights(pairs)
+    if not weights:
+        return
+    existing = {
+        (user_id, place_id): weight for user_id, place_id, weight in
+        PlaceInteraction.objects.filter(
+            user_id__in={user_id for user_id, _ in weights}, place_id__in={place_id for _, place_id in weights},
+        ).values_list('user_id', 'place_id', 'weight')
+    }
+    now = timezone.now()
+    changed = [
+        PlaceInteraction(user_id=user_id, place_id=place_id, weight=weight, stale=True, changed_at=now)
+        for (user_id, place_id), weight in weights.items() if existing.get((user_id, place_id), 0.0) != weight
+    ]
+    PlaceInteraction.objects.bulk_create(
+        changed, update_conflicts=True, unique_fields=['user', 'place'],
+        update_fields=['weight', 'stale', 'changed_at'],
+    )
+
+
+def rebuild_interactions(now=None):
+    """Recompute every weight from the source tables in one ``INSERT ... SELECT``; all rows start stale."""
+    now = now or timezone.now()
+    quote = connection.ops.quote_name
+    sql = f'''
+        INSERT INTO {quote(PlaceInteraction._meta.db_table)} (user_id, place_id, weight, stale, changed_at)
+        SELECT user_id, place_id, SUM(weight), %s, %s FROM (
+            SELECT user_id, place_id, %s AS weight FROM {quote(Wishlist._meta.db_table)}
+            UNION ALL
+            SELECT DISTINCT user_id, place_id, %s FROM {quote(VisitedPlace._meta.db_table)}
+            UNION ALL
+            SELECT user_id, place_id, CASE WHEN MAX(rating) > %s THEN MAX(rating) - %s ELSE 0 END
+            FROM {quote(Review._meta.db_table)} WHERE is_moderated GROUP BY user_id, place_id
+        ) GROUP BY user_id, place_id HAVING SUM(weight) > 0
+    '''
+    with transaction.atomic():
+        PlaceInteraction.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                True, connection.ops.adapt_datetimefield_value(now), WISHLIST_WEIGHT, VISIT_WEIGHT,
+                REVIEW_BASELINE, REVIEW_BASELINE,
+            ])
+
+
+# Similarity
+
+class InteractionMatrix:
+    """The sparse user x place weight matrix, indexed both ways round.
+
+    Users with more than ``max_user_places`` interactions keep only their
+    heaviest ones: the cost of a row grows with the square of a user's
+    history, and such users say little about any one pair of places.
+    """
+
+    def __init__(self, rows, max_user_places):
+        self.by_user = defaultdict(dict)
+        for user_id, place_id, weight in rows:
+            self.by_user[user_id][place_id] = weight
+        self.by_place = defaultdict(dict)
+        for user_id, places in self.by_user.items():
+            if len(places) > max_user_places:
+                kept = heapq.nlargest(max_user_places, places.items(), key=lambda item: (item[1], -item[0]))
+                places = self.by_user[user_id] = dict(kept)
+            for place_id, weight in places.items():
+                self.by_place[place_id][user_id] = weight
+        self._norms = {}
+
+    @classmethod
+    def load(cls, max_user_places):
+        rows = PlaceInteraction.objects.filter(weight__gt=0).values_list('user_id', 'place_id', 'weight')
+        return cls(rows.iterator(chunk_size=10_000), max_user_places)
+
+    def norm(self, place_id):
+        if place_id not in self._norms:
+            self._norms[place_id] = math.sqrt(sum(weight * weight for weight in self.by_place[place_id].values()))
+        return self._norms[place_id]
+
+    def row(self, place_id):
+        """Cosine similarity of ``place_id`` with every place that shares a user with it."""
+        dots = defaultdict(float)
+        for user_id, weight in self.by_place.get(place_id, {}).items():
+            for other, other_weight in self.by_user[user_id].items():
+                if other != place_id:
+                    dots[other] += weight * other_weight
+        norm = self.norm(place_id)
+        return {other: dot / (norm * self.norm(other)) for other, dot in dots.items()}
+
+
+def _top(scores, k):
+    """The ``k`` best ``(place_id, score)`` pairs, best first; ties go to the lower id."""
+    return heapq.nlargest(k, scores, key=lambda item: (item[1], -item[0]))
+
+
+def _merge(stored, fresh, dirty, k):
+    """Update a clean place's stored top-``k`` with fresh scores against dirty places.
+
+    Scores between two clean places have not changed, and every clean place
+    missing from a full stored list scored no higher than its last entry.
+    The merge is exact while ``k`` entries still reach that score; otherwise
+    ``None`` asks for the whole row to be recomputed.
+    """
+    top = _top([(other, score) for other, score in stored if other not in dirty] + list(fresh.items()), k)
+    if len(stored) < k or (len(top) == k and top[-1][1] >= stored[-1][1]):
+        return top
+    return None
+
+
+def _write(results):
+    place_ids = list(results)
+    written = 0
+    for start in range(0, len(place_ids), WRITE_CHUNK):
+        chunk = place_ids[start:start + WRITE_CHUNK]
+        rows = [
+            PlaceSimilarity(place_id=place_id, similar_id=other, score=score)
+            for place_id in chunk for other, score in results[place_id]
+        ]
+        with transaction.atomic():
+            PlaceSimilarity.objects.filter(place_id__in=chunk).delete()
+            PlaceSimilarity.objects.bulk_create(rows, batch_size=WRITE_CHUNK)
+        written += len(rows)
+    return written
+
+
+def refresh(full=False, neighbours=None, max_user_places=None):
+    """Bring ``PlaceSimilarity`` up to date; returns counts of what was done.
+
+    ``full`` rebuilds the interaction weights from the source tables and
+    recomputes every place; it is also used when nothing has been built yet.
+    """
+    k = neighbours or _setting('RECOMMENDATION_NEIGHBOURS', 20)
+    max_user_places = max_user_places or _setting('RECOMMENDATION_MAX_USER_PLACES', 500)
+    started = timezone.now()
+    full = full or not PlaceSimilarity.objects.exists()
+    if full:
+        rebuild_interactions(started)
+    dirty = set(PlaceInteraction.objects.filter(stale=True).values_list('place_id', flat=True).distinct())
+    stats = {'full': full, 'dirty': len(dirty), 'merged': 0, 'recomputed': 0, 'rows': 0}
+    if not dirty:
+        return stats
+
+    matrix = InteractionMatrix.load(max_user_places)
+    if full:
+        rows = {place_id: matrix.row(place_id) for place_id in matrix.by_place}
+        results = {place_id: _top(row.items(), k) for place_id, row in rows.items()}
+        stale_lists = set(PlaceSimilarity.objects.values_list('place_id', flat=True).distinct())
+        results.update({place_id: [] for place_id in stale_lists - results.keys()})
+        stats['recomputed'] = len(rows)
+    else:
+        rows = {place_id: matrix.row(place_id) for place_id in dirty}
+        results = {place_id: _top(row.items(), k) for place_id, row in rows.items()}
+        fresh = defaultdict(dict)
+        for place_id, row in rows.items():
+            for other, score in row.items():
+                fresh[other][place_id] = score
+        affected = set(fresh)
+        for ids in _slices(dirty):
+            affected.update(PlaceSimilarity.objects.filter(similar_id__in=ids).values_list('place_id', flat=True))
+        affected -= dirty
+        stored = defaultdict(list)
+        for ids in _slices(affected):
+            for place_id, other, score in (
+                PlaceSimilarity.objects.filter(place_id__in=ids).order_by('place_id', '-score', 'similar_id')
+                .values_list('place_id', 'similar_id', 'score')
+            ):
+                stored[place_id].append((other, score))
+        for place_id in affected:
+            merged = _merge(stored[place_id], fresh[place_id], dirty, k)
+            if merged is None:
+                merged = _top(matrix.row(place_id).items(), k)
+                stats['recomputed'] += 1
+            else:
+                stats['merged'] += 1
+            if merged != stored[place_id]:
+                results[place_id] = merged
+        stats['recomputed'] += len(dirty)
+
+    stats['rows'] = _write(results)
+    # Changes made while this ran are newer than ``started`` and stay stale.
+    for ids in [None] if full else _slices(dirty):
+        handled = PlaceInteraction.objects.filter(stale=True, changed_at__lte=started)
+        if ids is not None:
+            handled = handled.filter(place_id__in=ids)
+        handled.filter(weight__lte=0).delete()
+        handled.update(stale=False)
+    cache.invalidate('similar')
+    return stats
+
+
+# Reads
+
+def similar_places(place_id, limit):
+    """Up to ``limit`` places most similar to ``place_id``, each with a ``score``."""
+    rows = (
+        PlaceSimilarity.objects.filter(place_id=place_id).select_related('similar')
+        .order_by('-score', 'similar_id')[:limit]
+    )
+    places = []
+    for row in rows:
+        row.similar.score = row.score
+        places.append(row.similar)
+    return places
+
+
+def recommended_places(user_id, limit):
+    """Places the user has not interacted with, scored by similarity to those they have."""
+    mine = PlaceInteraction.objects.filter(user_id=user_id, weight__gt=0)
+    return (
+        Place.objects.filter(
+            similar_from__place__interactions__user_id=user_id,
+            similar_from__place__interactions__weight__gt=0,
+        )
+        .exclude(pk__in=mine.values('place_id'))
+        .annotate(score=Sum(F('similar_from__score') * F('similar_from__place__interactions__weight')))
+        .order_by('-score', 'id')[:limit]
+    )
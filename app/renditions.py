@@ -0,0 +1,226 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .models import PlaceImage, TravelPackage, TravelStory, User
+
+
+logger = logging.getLogger(__name__)
+
+# Image field -> JSON field holding its rendition map, per model.
+RENDITION_FIELDS = {
+    PlaceImage: {'image': 'image_renditions'},
+    User: {'profile_image': 'profile_image_renditions', 'cover_image': 'cover_image_renditions'},
+    TravelPackage: {'image': 'image_renditions'},
+    TravelStory: {'image': 'image_renditions'},
+}
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+_writer = None
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def render(source, widths, formats, quality, max_pixels):
+    """Resize ``source`` (a path or bytes) to each width in each format.
+
+    Runs in a worker process, so it only touches Pillow and returns plain
+    data: ``(width, height, [(target_width, fmt, bytes), ...])``.  Widths at or
+    above the original are collapsed into a single full-size rendition.
+    Images over ``max_pixels`` are refused from their header, before any
+    pixel is decoded.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as original:
+        if original.width * original.height > max_pixels:
+            raise ImageTooLarge(f'{original.width}x{original.height} is over {max_pixels:,} pixels')
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    width, height = image.size
+    targets = sorted({min(target, width) for target in widths})
+    outputs = []
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS,
+        )
+        for fmt in formats:
+            frame = resized
+            if fmt == 'jpeg' and frame.mode not in ('RGB', 'L'):
+                frame = frame.convert('RGB')
+            buffer = io.BytesIO()
+            frame.save(buffer, PIL_FORMATS[fmt], quality=quality, optimize=True)
+            outputs.append((target, fmt, buffer.getvalue()))
+    return width, height, outputs
+
+
+def store(source_name, rendered):
+    """Save rendered bytes under content-hash names and build the rendition map."""
+    width, height, outputs = rendered
+    renditions = {'source': source_name, 'width': width, 'height': height}
+    for target, fmt, data in outputs:
+        digest = hashlib.sha256(data).hexdigest()
+        name = f'renditions/{digest[:2]}/{digest[:32]}.{fmt}'
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+        renditions.setdefault(fmt, {})[str(target)] = name
+    return renditions
+
+
+def save_map(model, pk, field_name, source_name, renditions):
+    # Only record the map if the image has not been replaced in the meantime.
+    renditions_field = RENDITION_FIELDS[model][field_name]
+    model.objects.filter(pk=pk, **{field_name: source_name}).update(**{renditions_field: renditions})
+
+
+def render_args():
+    return (
+        _setting('IMAGE_RENDITION_WIDTHS', [160, 320, 640, 1280]),
+        _setting('IMAGE_RENDITION_FORMATS', ['webp', 'jpeg']),
+        _setting('IMAGE_RENDITION_QUALITY', 80),
+        _setting('IMAGE_RENDITION_MAX_PIXELS', 50_000_000),
+    )
+
+
+def read_source(file):
+    try:
+        return file.path
+    except NotImplementedError:
+        with file.open('rb') as handle:
+            return handle.read()
+
+
+def build_renditions(instance, field_name):
+    """Render one image field synchronously and store its map on the row."""
+    file = getattr(instance, field_name)
+    renditions = store(file.name, render(read_source(file), *render_args()))
+    save_map(type(instance), instance.pk, field_name, file.name, renditions)
+    setattr(instance, RENDITION_FIELDS[type(instance)][field_name], renditions)
+    return renditions
+
+
+def _get_executor():
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=_setting('IMAGE_RENDITION_WORKERS', 2))
+            _pending = threading.BoundedSemaphore(_setting('IMAGE_RENDITION_MAX_PENDING', 64))
+        return _executor, _pending
+
+
+def _replace_executor(broken):
+    """Swap a pool broken by a dead worker for a new one, with a new queue bound."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+    return _get_executor()
+
+
+def _submit_render(executor, *args):
+    try:
+        return executor.submit(render, *args)
+    except BrokenProcessPool:
+        # A worker died (OOM-killed on a huge image, say) and the pool refuses
+        # all further work; without a new one every later save would fail.
+        executor, _ = _replace_executor(executor)
+        return executor.submit(render, *args)
+
+
+def _get_writer():
+    global _writer
+    with _executor_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='renditions')
+        return _writer
+
+
+def save_rendered(model, pk, field_name, source_name, future, pending):
+    """Store a finished render and record its map; runs on the writer thread."""
+    try:
+        save_map(model, pk, field_name, source_name, store(source_name, future.result()))
+    except Exception:
+        logger.exception('Could not build renditions for %s %s.%s', model.__name__, pk, field_name)
+    finally:
+        pending.release()
+        connection.close()
+
+
+def _finish(model, pk, field_name, source_name, pending):
+    # Done callbacks run on the pool's management thread, which must not block
+    # on storage or hold a database connection; hand the result to the writer.
+    def callback(future):
+        _get_writer().submit(save_rendered, model, pk, field_name, source_name, future, pending)
+    return callback
+
+
+def schedule_renditions(instance, field_name):
+    """Queue rendition work for one field once the current transaction commits.
+
+    Work runs in a bounded process pool and results are saved by one writer
+    thread.  When the queue is full the job is dropped with a warning and
+    ``build_image_renditions`` picks it up later.
+    """
+    file = getattr(instance, field_name)
+    model, pk, source_name = type(instance), instance.pk, file.name
+
+    def submit():
+        if _setting('IMAGE_RENDITION_WORKERS', 2) <= 0:
+            try:
+                build_renditions(instance, field_name)
+            except Exception:
+                logger.exception('Could not build renditions for %s %s.%s', model.__name__, pk, field_name)
+            return
+        executor, pending = _get_executor()
+        if not pending.acquire(blocking=False):
+            logger.warning('Rendition queue full; skipping %s %s.%s', model.__name__, pk, field_name)
+            return
+        try:
+            future = _submit_render(executor, read_source(file), *render_args())
+        except Exception:
+            pending.release()
+            raise
+        future.add_done_callback(_finish(model, pk, field_name, source_name, pending))
+
+    transaction.on_commit(submit)
+
+
+def image_saved(instance):
+    """Schedule renditions for every image field whose file changed."""
+    for field_name, renditions_field in RENDITION_FIELDS[type(instance)].items():
+        file = getattr(instance, field_name)
+        renditions = getattr(instance, renditions_field)
+        if not file:
+            if renditions:
+                type(instance).objects.filter(pk=instance.pk).update(**{renditions_field: {}})
+            continue
+        if renditions.get('source') != file.name:
+            schedule_renditions(instance, field_name)
+
+
+def missing_renditions(model):
+    """Yield ``(instance, field_name)`` pairs whose renditions are absent or stale."""
+    for instance in model.objects.iterator(chunk_size=500):
+        for field_name, renditions_field in RENDITION_FIELDS[model].items():
+            file = getattr(instance, field_name)
+            if file and getattr(instance, renditions_field).get('source') != file.name:
+                yield instance, field_name
@@ -0,0 +1,239 @@
+import html
+import operator
+import re
+from functools import reduce
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import FAQ, Place, Review, TravelStory
+
+
+INDEX_TABLE = 'app_search_index'
+
+# Migration 0004 creates the table from a frozen copy of this statement;
+# a change here reaches existing databases through rebuild_index().
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS app_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    place_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# Rows are keyed by ``object_id * 8 + kind code`` so an object can be
+# replaced or removed through the rowid instead of scanning the index.
+KIND_CODES = {'place': 1, 'review': 2, 'faq': 3, 'story': 4}
+KIND_SHIFT = 8
+
+# Private-use markers survive FTS5 untouched; the output is HTML-escaped
+# before they are turned into <mark> tags.
+_MARK_START, _MARK_END = '\ue000', '\ue001'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _document(instance):
+    """Return ``(place_id, title, body)`` for an indexable instance, or None."""
+    if isinstance(instance, Place):
+        return instance.pk, instance.name, ' '.join([
+            instance.short_description, instance.long_description, instance.location,
+            instance.state, instance.country,
+        ])
+    if isinstance(instance, Review):
+        if not instance.is_moderated:
+            return None
+        return instance.place_id, '', instance.content
+    if isinstance(instance, FAQ):
+        return instance.place_id, instance.question, instance.answer
+    if isinstance(instance, TravelStory):
+        return None, instance.title, instance.content
+
+
+def _kind_of(instance):
+    for kind, model in (('place', Place), ('review', Review), ('faq', FAQ), ('story', TravelStory)):
+        if isinstance(instance, model):
+            return kind
+    raise TypeError(f'{type(instance).__name__} is not searchable')
+
+
+def _rowid(kind, object_id):
+    return object_id * KIND_SHIFT + KIND_CODES[kind]
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def index_object(instance):
+    """Insert, refresh or drop (e.g. an unmoderated review) one object's index row."""
+    if not is_available():
+        return
+    kind = _kind_of(instance)
+    document = _document(instance)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [_rowid(kind, instance.pk)])
+        if document is not None:
+            place_id, title, body = document
+            cursor.execute(
+                f'INSERT INTO {INDEX_TABLE} (rowid, kind, object_id, place_id, title, body) '
+                'VALUES (%s, %s, %s, %s, %s, %s)',
+                [_rowid(kind, instance.pk), kind, instance.pk, place_id, title, body],
+            )
+
+
+def remove_object(instance):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [_rowid(_kind_of(instance), instance.pk)])
+
+
+def _index_selects():
+    """``INSERT INTO index ... SELECT`` per kind; append a WHERE/AND on ``id`` to narrow it."""
+    place, review, faq, story = (model._meta.db_table for model in (Place, Review, FAQ, TravelStory))
+    insert = f'INSERT INTO {INDEX_TABLE} (rowid, kind, object_id, place_id, title, body) '
+    return {
+        'place': insert + (
+            f"SELECT id * {KIND_SHIFT} + {KIND_CODES['place']}, 'place', id, id, name, "
+            f"short_description || ' ' || long_description || ' ' || location || ' ' || state || ' ' || country "
+            f"FROM {place} WHERE 1"
+        ),
+        'review': insert + (
+            f"SELECT id * {KIND_SHIFT} + {KIND_CODES['review']}, 'review', id, place_id, '', content "
+            f"FROM {review} WHERE is_moderated"
+        ),
+        'faq': insert + (
+            f"SELECT id * {KIND_SHIFT} + {KIND_CODES['faq']}, 'faq', id, place_id, question, answer FROM {faq} WHERE 1"
+        ),
+        'story': insert + (
+            f"SELECT id * {KIND_SHIFT} + {KIND_CODES['story']}, 'story', id, NULL, title, content FROM {story} WHERE 1"
+        ),
+    }
+
+
+def rebuild_index():
+    """Recreate the index table and repopulate it with set-based INSERT ... SELECT statements.
+
+    The table is dropped rather than emptied so a changed ``CREATE_INDEX``
+    (tokenizer, prefix lengths) takes effect on the next rebuild.
+    """
+    if not is_available():
+        return
+    statements = [
+        f'DROP TABLE IF EXISTS {INDEX_TABLE}',
+        CREATE_INDEX,
+        *_index_selects().values(),
+        f"INSERT INTO {INDEX_TABLE} ({INDEX_TABLE}) VALUES ('optimize')",
+    ]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def reindex(kind, ids):
+    """Refresh the rows of many objects of one kind at once, e.g. after a bulk import."""
+    if not is_available():
+        return
+    ids = list(ids)
+    select = _index_selects()[kind]
+    with connection.cursor() as cursor:
+        # Slices keep each statement under SQLite's bound-parameter limit.
+        for start in range(0, len(ids), 1000):
+            batch = ids[start:start + 1000]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} WHERE rowid IN ({placeholders})', [_rowid(kind, pk) for pk in batch],
+            )
+            cursor.execute(f'{select} AND id IN ({placeholders})', batch)
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every term required, the last as a prefix."""
+    terms = _TOKEN_RE.findall(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _mark(text):
+    return html.escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search(text, kinds=None, limit=20, offset=0):
+    """Ranked full-text search; returns dicts with highlighted title and snippet."""
+    match = build_match_query(text)
+    if match is None:
+        return []
+    if not is_available():
+        return naive_search(text, kinds, limit, offset)
+    sql = (
+        f'SELECT kind, object_id, place_id, '
+        f'highlight({INDEX_TABLE}, 3, %s, %s), '
+        f"snippet({INDEX_TABLE}, 4, %s, %s, '…', 16), "
+        f'bm25({INDEX_TABLE}, 0, 0, 0, 10.0, 1.0) AS score '
+        f'FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s'
+    )
+    params = [_MARK_START, _MARK_END, _MARK_START, _MARK_END, match]
+    if kinds:
+        sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+        params.extend(kinds)
+    sql += ' ORDER BY score LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            'type': kind,
+            'id': object_id,
+            'place': place_id,
+            'title': _mark(title),
+            'snippet': _mark(snippet),
+            'score': round(-score, 4),
+        }
+        for kind, object_id, place_id, title, snippet, score in rows
+    ]
+
+
+NAIVE_FIELDS = {
+    'place': (Place.objects.all(), ('name', 'short_description', 'location', 'long_description'), 'name', 'id'),
+    'review': (Review.objects.filter(is_moderated=True), ('content',), None, 'place_id'),
+    'faq': (FAQ.objects.all(), ('question', 'answer'), 'question', 'place_id'),
+    'story': (TravelStory.objects.all(), ('title', 'content'), 'title', None),
+}
+
+
+def naive_search(text, kinds=None, limit=20, offset=0):
+    """The ``icontains`` scan over every searchable column, unranked.
+
+    Kept as the fallback for non-SQLite databases and as the baseline for
+    ``bench_search``.
+    """
+    terms = _TOKEN_RE.findall(text)
+    results = []
+    for kind, (queryset, fields, title_field, place_field) in NAIVE_FIELDS.items():
+        if kinds and kind not in kinds:
+            continue
+        condition = reduce(operator.and_, (
+            reduce(operator.or_, (Q(**{f'{field}__icontains': term}) for field in fields))
+            for term in terms
+        ))
+        wanted = offset + limit - len(results)
+        for obj in queryset.filter(condition)[:wanted]:
+            results.append({
+                'type': kind,
+                'id': obj.pk,
+                'place': getattr(obj, place_field) if place_field else None,
+                'title': html.escape(getattr(obj, title_field)) if title_field else '',
+                'snippet': html.escape(getattr(obj, fields[-1])[:200]),
+                'score': None,
+            })
+        if len(results) >= offset + limit:
+            break
+    return results[offset:offset + limit]
@@ -0,0 +1,299 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    FAQ, Activity, Booking, Event, EventBooking, ForumPost, ForumReply, Itinerary, Notification, Place,
+    PlaceImage, Review, TouristGuide, TravelPackage, TravelStory, User, UserFollow, VisitedPlace, Wishlist,
+)
+from .ratings import review_changed
+from . import (
+    bookings, cache, counters, event_calendar, feed, forum, guides, media, notifications, recommendations, renditions,
+    search,
+)
+
+
+# Fields whose pre-save values handlers compare against, per model.
+SNAPSHOT_FIELDS = {
+    Review: ('place_id', 'rating', 'is_moderated'),
+    Notification: ('user_id', 'is_read'),
+    Booking: ('status',),
+    EventBooking: ('status',),
+    Event: ('capacity', 'place_id', 'start_date', 'end_date'),
+    TravelPackage: ('capacity',),
+    TouristGuide: ('languages',),
+}
+
+
+def remember_previous_state(sender, instance, raw, **kwargs):
+    instance._previous_state = None
+    if not raw and instance.pk is not None:
+        instance._previous_state = sender.objects.filter(pk=instance.pk).only(*SNAPSHOT_FIELDS[sender]).first()
+
+
+for model in SNAPSHOT_FIELDS:
+    pre_save.connect(remember_previous_state, sender=model, dispatch_uid=f'remember_previous_state_{model.__name__}')
+
+
+@receiver(post_save, sender=Review)
+def update_ratings_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        review_changed(getattr(instance, '_previous_state', None), instance)
+
+
+@receiver(post_delete, sender=Review)
+def update_ratings_on_delete(sender, instance, **kwargs):
+    review_changed(instance, None)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=FAQ)
+@receiver(post_save, sender=TravelStory)
+def update_search_index(sender, instance, raw, **kwargs):
+    if not raw:
+        search.index_object(instance)
+
+
+@receiver(post_delete, sender=Place)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_delete, sender=TravelStory)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TravelPackage)
+@receiver(post_save, sender=TravelStory)
+def update_image_renditions(sender, instance, raw, **kwargs):
+    if not raw:
+        renditions.image_saved(instance)
+
+
+@receiver(pre_save, sender=PlaceImage)
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=TravelPackage)
+@receiver(pre_save, sender=TravelStory)
+def remember_media_references(sender, instance, raw, update_fields, **kwargs):
+    instance._previous_media = None if raw else media.stored_references(instance, update_fields)
+
+
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TravelPackage)
+@receiver(post_save, sender=TravelStory)
+def count_media_references(sender, instance, raw, update_fields, **kwargs):
+    if not raw:
+        media.instance_saved(instance, getattr(instance, '_previous_media', None), update_fields)
+
+
+@receiver(post_delete, sender=PlaceImage)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=TravelPackage)
+@receiver(post_delete, sender=TravelStory)
+def release_media_references(sender, instance, **kwargs):
+    media.instance_deleted(instance)
+
+
+# Cache namespaces touched by a change to each model.  Reviews also bump
+# 'places' because they rewrite the rating aggregates shown in listings.
+CACHE_NAMESPACES = {
+    # Calendar entries show their place's name and region.
+    Place: lambda obj: ['places', f'place:{obj.pk}', 'search', 'events'],
+    Review: lambda obj: ['places', f'place:{obj.place_id}', 'search'],
+    PlaceImage: lambda obj: [f'place:{obj.place_id}'],
+    FAQ: lambda obj: [f'place:{obj.place_id}', 'search'],
+    Event: lambda obj: ['events', f'place:{obj.place_id}'],
+    ForumPost: lambda obj: [f'place:{obj.place_id}', f'thread:{obj.pk}'],
+    # A reply changes its thread's counters, which the place pages show.
+    ForumReply: lambda obj: [f'place:{obj.post.place_id}', f'thread:{obj.post_id}'],
+    TravelPackage: lambda obj: ['packages', f'package:{obj.pk}'],
+    Itinerary: lambda obj: ['packages', f'package:{obj.package_id}'],
+    TouristGuide: lambda obj: ['packages'],
+    TravelStory: lambda obj: ['search'],
+}
+
+
+def invalidate_cache(sender, instance, **kwargs):
+    # Bumped only once the change is visible: a page recomputed from a replica
+    # before the commit would otherwise be cached under the new generation.
+    namespaces = CACHE_NAMESPACES[sender](instance)
+    transaction.on_commit(lambda: cache.invalidate(*namespaces))
+
+
+for model in CACHE_NAMESPACES:
+    post_save.connect(invalidate_cache, sender=model, dispatch_uid=f'invalidate_cache_{model.__name__}')
+    post_delete.connect(invalidate_cache, sender=model, dispatch_uid=f'invalidate_cache_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=TravelStory)
+def record_story_activity(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.record_activity(instance.user_id, Activity.STORY, instance.pk, instance.published_at)
+
+
+@receiver(post_save, sender=Review)
+def record_review_activity(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    if instance.is_moderated:
+        feed.record_activity(instance.user_id, Activity.REVIEW, instance.pk, instance.date, instance.place_id)
+    else:
+        feed.remove_activity(Activity.REVIEW, instance.pk)
+
+
+@receiver(post_save, sender=VisitedPlace)
+def record_visit_activity(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.record_activity(instance.user_id, Activity.VISIT, instance.pk, timezone.now(), instance.place_id)
+
+
+@receiver(post_delete, sender=TravelStory)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=VisitedPlace)
+def remove_activity(sender, instance, **kwargs):
+    verb = {TravelStory: Activity.STORY, Review: Activity.REVIEW, VisitedPlace: Activity.VISIT}[sender]
+    feed.remove_activity(verb, instance.pk)
+
+
+@receiver(post_save, sender=UserFollow)
+def backfill_feed_on_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.schedule(feed.backfill_follow, instance.follower_id, instance.followed_id)
+
+
+@receiver(post_delete, sender=UserFollow)
+def prune_feed_on_unfollow(sender, instance, **kwargs):
+    feed.unfollow(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        notifications.read_state_changed(getattr(instance, '_previous_state', None), instance)
+
+
+@receiver(post_delete, sender=Notification)
+def update_unread_on_delete(sender, instance, **kwargs):
+    notifications.read_state_changed(instance, None)
+
+
+@receiver(post_save, sender=UserFollow)
+def notify_new_follower(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        notifications.notify(instance.followed_id, f"{instance.follower.username} started following you.")
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=EventBooking)
+def notify_booking_status(sender, instance, created, raw, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if raw or created or previous is None or previous.status == instance.status:
+        return
+    title = instance.package.title if sender is Booking else instance.event.title
+    notifications.notify(instance.user_id, f"Your booking for {title} is now {instance.status}.")
+
+
+@receiver(post_save, sender=ForumReply)
+def update_thread_on_reply(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        forum.reply_added(instance)
+
+
+@receiver(post_delete, sender=ForumReply)
+def update_thread_on_reply_delete(sender, instance, **kwargs):
+    forum.reply_removed(instance)
+
+
+@receiver(post_save, sender=ForumReply)
+def notify_forum_reply(sender, instance, created, raw, **kwargs):
+    if not created or raw:
+        return
+    post = instance.post
+    if post.user_id != instance.user_id:
+        notifications.notify(post.user_id, f"{instance.user.username} replied to your post.")
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=TravelPackage)
+def sync_seats_remaining(sender, instance, raw, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    old_capacity = previous.capacity if previous is not None else None
+    if not raw and old_capacity != instance.capacity:
+        bookings.capacity_changed(instance)
+
+
+@receiver(post_save, sender=Event)
+def update_event_weeks(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    moved = previous is None or any(
+        getattr(previous, name) != getattr(instance, name) for name in ('place_id', 'start_date', 'end_date')
+    )
+    if created or moved:
+        event_calendar.index_events([instance.pk])
+
+
+@receiver(post_save, sender=Place)
+def update_event_regions(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        event_calendar.place_changed(instance)
+
+
+@receiver(post_save, sender=TouristGuide)
+def sync_guide_languages(sender, instance, raw, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if not raw and (previous is None or previous.languages != instance.languages):
+        guides.sync_languages(instance)
+
+
+@receiver(post_save, sender=Wishlist)
+@receiver(post_save, sender=VisitedPlace)
+@receiver(post_save, sender=Review)
+def update_interaction_on_save(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    pairs = {(instance.user_id, instance.place_id)}
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        pairs.add((instance.user_id, previous.place_id))
+    recommendations.interactions_changed(pairs)
+
+
+@receiver(post_delete, sender=Wishlist)
+@receiver(post_delete, sender=VisitedPlace)
+@receiver(post_delete, sender=Review)
+def update_interaction_on_delete(sender, instance, **kwargs):
+    recommendations.interactions_changed({(instance.user_id, instance.place_id)})
+
+
+@receiver(post_save, sender=UserFollow)
+@receiver(post_save, sender=TravelStory)
+@receiver(post_save, sender=Wishlist)
+@receiver(post_save, sender=VisitedPlace)
+def count_on_create(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.object_added(instance)
+
+
+@receiver(post_delete, sender=UserFollow)
+@receiver(post_delete, sender=TravelStory)
+@receiver(post_delete, sender=Wishlist)
+@receiver(post_delete, sender=VisitedPlace)
+def count_on_delete(sender, instance, **kwargs):
+    counters.object_removed(instance)
+
+
+@receiver(post_save, sender=Review)
+def count_reviews_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        counters.review_changed(getattr(instance, '_previous_state', None), instance)
+
+
+@receiver(post_delete, sender=Review)
+def count_reviews_on_delete(sender, instance, **kwargs):
+    counters.review_changed(instance, None)
@@ -0,0 +1,112 @@
+"""Content-addressed storage for uploaded images.
+
+``ContentAddressedStorage`` ignores the name an upload asks for (only the
+extension is kept) and stores the file as ``blobs/ab/cd/<sha256>.<ext>``.
+Identical uploads share one file, renaming a place or a story never moves
+anything, and since a name can only ever hold one content, the web server
+may serve ``blobs/`` with ``Cache-Control: public, max-age=31536000,
+immutable``.
+
+The digest is computed while the upload is streamed to a temporary file
+next to its destination, so no upload is held in memory, and the file is
+moved into place with an atomic rename.  Because a blob may be shared,
+``delete()`` never removes anything: ``app.media`` counts the image fields
+pointing at each blob and ``manage.py collect_media_garbage`` removes the
+ones nothing points at any more.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+
+
+BLOB_PREFIX = 'blobs'
+INCOMING = '.incoming'
+HASH_CHUNK_SIZE = 256 * 1024
+MAX_EXTENSION_LENGTH = 10
+
+
+def blob_storage():
+    """The storage of every image field, configured as ``STORAGES['blobs']``."""
+    return storages['blobs']
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX + '/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_name(self, digest, extension):
+        return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(); nothing to probe for here.
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        if len(extension) > MAX_EXTENSION_LENGTH:
+            extension = ''
+        incoming = self.path(f'{BLOB_PREFIX}/{INCOMING}')
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(dir=incoming)
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                # Large uploads are already on disk: hash them in place, then move them.
+                os.close(fd)
+                with open(content.temporary_file_path(), 'rb') as source:
+                    while chunk := source.read(HASH_CHUNK_SIZE):
+                        digest.update(chunk)
+                file_move_safe(content.temporary_file_path(), temporary, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, 'wb') as target:
+                    for chunk in content.chunks(HASH_CHUNK_SIZE):
+                        digest.update(chunk)
+                        target.write(chunk)
+            name = self.blob_name(digest.hexdigest(), extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temporary)
+                # A fresh mtime keeps the blob out of garbage collection until this upload is referenced.
+                os.utime(path)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # mkstemp() creates files readable by their owner only.
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, path)
+            return name
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def delete(self, name):
+        """Leave the file alone; blobs are shared and only garbage collection removes them."""
+
+    def purge(self, name):
+        """Really delete ``name``; for garbage collection only."""
+        super().delete(name)
+
+    def blobs(self, older_than=None):
+        """Yield ``(name, size)`` for every stored blob, optionally only those not touched since ``older_than``."""
+        root = self.path(BLOB_PREFIX)
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(name for name in subdirectories if name != INCOMING)
+            for filename in sorted(files):
+                stat = os.stat(os.path.join(directory, filename))
+                if older_than is None or stat.st_mtime < older_than:
+                    relative = os.path.relpath(os.path.join(directory, filename), self.location)
+                    yield relative.replace(os.sep, '/'), stat.st_size
+
+    def abandoned_uploads(self, older_than):
+        """Temporary files left behind by uploads that never finished."""
+        incoming = self.path(f'{BLOB_PREFIX}/{INCOMING}')
+        if not os.path.isdir(incoming):
+            return []
+        paths = (os.path.join(incoming, filename) for filename in os.listdir(incoming))
+        return [path for path in paths if os.stat(path).st_mtime < older_than]
@@ -0,0 +1,332 @@
+"""Resumable, chunked place image uploads with out-of-request validation.
+
+A client opens an ``ImageUpload`` with the file's name and size, then
+sends the bytes in order with ``PUT`` requests carrying ``Content-Range``.
+Each chunk is copied from the request stream straight into a part file
+at its offset, so neither the upload nor a chunk is ever held in memory,
+and a client that loses its connection asks for the upload and resumes at
+``received``.  A chunk claims its offset with a conditional UPDATE before
+any byte is written, so a chunk sent twice is written once, and the claim
+is given back if the body ends early.
+
+Once the last chunk lands the file is decoded in a bounded process pool:
+the format, byte size, dimensions and pixel count are checked from the
+header before any pixel is decoded (the decompression-bomb guard),
+the image is rotated upright from its EXIF orientation and re-encoded
+without metadata, which strips EXIF including GPS tags.  Only then is
+the ``PlaceImage`` created, unapproved.  When the pool is saturated the
+last chunk is refused with 503 and ``Retry-After``, so the client waits
+instead of the queue growing.  ``expire_image_uploads`` deletes idle
+uploads and any part file they left behind.
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ImageUpload, PlaceImage, UploadStatus
+
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 64 * 1024
+# Pillow format -> (extension, save options); anything else is refused.
+FORMATS = {
+    'JPEG': ('jpg', {'quality': 90, 'optimize': True}),
+    'PNG': ('png', {'optimize': True}),
+    'WEBP': ('webp', {'quality': 90}),
+}
+# Formats re-encoded as another: multi-picture JPEGs from phone cameras keep their first frame.
+SAVED_AS = {'MPO': 'JPEG'}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+_writer = None
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the upload stands; resume from ``received``."""
+
+    def __init__(self, received):
+        super().__init__(f'Expected the chunk starting at byte {received}.')
+        self.received = received
+
+
+class UploadClosed(UploadError):
+    pass
+
+
+class Busy(UploadError):
+    pass
+
+
+class InvalidImage(UploadError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def limits():
+    return {
+        'max_bytes': _setting('IMAGE_UPLOAD_MAX_BYTES', 30 * 1024 * 1024),
+        'max_dimension': _setting('IMAGE_UPLOAD_MAX_DIMENSION', 12000),
+        'max_pixels': _setting('IMAGE_UPLOAD_MAX_PIXELS', 50_000_000),
+    }
+
+
+def max_chunk_size():
+    return _setting('IMAGE_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def part_path(upload_id):
+    return os.path.join(_setting('IMAGE_UPLOAD_DIR', settings.MEDIA_ROOT), f'{upload_id.hex}.part')
+
+
+def parse_content_range(header, length):
+    """``(start, total)`` from ``bytes start-end/total``, checked against the body's ``length``."""
+    try:
+        unit, _, spec = header.partition(' ')
+        span, _, total = spec.partition('/')
+        start, _, end = span.partition('-')
+        start, end, total = int(start), int(end), int(total)
+    except ValueError:
+        raise UploadError('Content-Range must look like "bytes 0-1048575/4000000".')
+    if unit != 'bytes' or start < 0 or end < start or end - start + 1 != length:
+        raise UploadError('Content-Range does not match the request body.')
+    return start, total
+
+
+# Requests
+
+def start(user, place, filename, size):
+    """Open an upload of ``size`` bytes and create its empty part file."""
+    if size > limits()['max_bytes']:
+        raise UploadError(f"Images are limited to {limits()['max_bytes']:,} bytes.")
+    upload = ImageUpload.objects.create(user=user, place=place, filename=os.path.basename(filename), size=size)
+    os.makedirs(os.path.dirname(part_path(upload.pk)), exist_ok=True)
+    open(part_path(upload.pk), 'wb').close()
+    return upload
+
+
+def _get_executor():
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=_setting('IMAGE_UPLOAD_WORKERS', 2))
+            _pending = threading.BoundedSemaphore(_setting('IMAGE_UPLOAD_MAX_PENDING', 16))
+        return _executor, _pending
+
+
+def _replace_executor(broken):
+    """Swap a pool broken by a dead worker for a new one, with a new queue bound."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+    return _get_executor()
+
+
+def _copy(stream, path, offset, length):
+    """Copy ``length`` bytes of ``stream`` into ``path`` at ``offset``; the number actually copied."""
+    copied = 0
+    with open(path, 'r+b') as target:
+        target.seek(offset)
+        while copied < length:
+            chunk = stream.read(min(COPY_BUFFER_SIZE, length - copied))
+            if not chunk:
+                break
+            target.write(chunk)
+            copied += len(chunk)
+    return copied
+
+
+def receive_chunk(upload, offset, total, stream, length):
+    """Write one chunk, advance the upload and, after the last one, queue its processing."""
+    if upload.status != UploadStatus.RECEIVING:
+        raise UploadClosed(f'The upload is {upload.status}.')
+    if total != upload.size:
+        raise UploadError(f'The upload was opened for {upload.size:,} bytes.')
+    if length > max_chunk_size():
+        raise UploadError(f'Chunks are limited to {max_chunk_size():,} bytes.')
+    if offset != upload.received:
+        raise OffsetMismatch(upload.received)
+    if offset + length > upload.size:
+        raise UploadError('The chunk runs past the end of the upload.')
+    last = offset + length == upload.size
+    inline = _setting('IMAGE_UPLOAD_WORKERS', 2) <= 0
+    pending = None
+    if last and not inline:
+        _, pending = _get_executor()
+        if not pending.acquire(blocking=False):
+            raise Busy('Image processing is saturated; retry shortly.')
+    try:
+        # Claim the byte range first: a concurrent copy of this chunk finds the offset taken.
+        claimed = ImageUpload.objects.filter(pk=upload.pk, received=offset, status=UploadStatus.RECEIVING).update(
+            received=offset + length, updated_at=timezone.now(),
+        )
+        if not claimed:
+            upload.refresh_from_db()
+            raise OffsetMismatch(upload.received)
+        try:
+            if _copy(stream, part_path(upload.pk), offset, length) != length:
+                raise UploadError('The chunk ended early; resend it.')
+        except BaseException:
+            ImageUpload.objects.filter(
+                pk=upload.pk, received=offset + length, status=UploadStatus.RECEIVING,
+            ).update(received=offset, updated_at=timezone.now())
+            raise
+        if last:
+            ImageUpload.objects.filter(pk=upload.pk).update(status=UploadStatus.PROCESSING)
+    except BaseException:
+        if pending is not None:
+            pending.release()
+        raise
+    upload.received = offset + length
+    if last:
+        upload.status = UploadStatus.PROCESSING
+        if inline:
+            finish(upload.pk, lambda: process(part_path(upload.pk), limits()))
+            upload.refresh_from_db()
+        else:
+            _submit(upload, pending)
+    return upload
+
+
+def _get_writer():
+    global _writer
+    with _executor_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='uploads')
+        return _writer
+
+
+def _finish_processed(upload_id, future, pending):
+    """Record a finished validation; runs on the writer thread."""
+    try:
+        finish(upload_id, future.result)
+    except Exception:
+        logger.exception('Could not record image upload %s', upload_id)
+    finally:
+        pending.release()
+        connection.close()
+
+
+def _submit(upload, pending):
+    executor, _ = _get_executor()
+    try:
+        try:
+            future = executor.submit(process, part_path(upload.pk), limits())
+        except BrokenProcessPool:
+            # A worker died (killed decoding a hostile file, say) and the pool
+            # refuses all further work; start a new one for this and later uploads.
+            executor, _ = _replace_executor(executor)
+            future = executor.submit(process, part_path(upload.pk), limits())
+    except BaseException:
+        pending.release()
+        raise
+
+    # Done callbacks run on the pool's management thread, which must not block
+    # on storage or hold a database connection; hand the result to the writer.
+    def callback(future):
+        _get_writer().submit(_finish_processed, upload.pk, future, pending)
+
+    future.add_done_callback(callback)
+
+
+# Processing
+
+def process(path, limits):
+    """Validate and clean the image at ``path``; runs in a worker process.
+
+    Returns ``(format, width, height, bytes)``.  Dimensions and pixel count
+    are checked on the header alone, before anything is decoded.
+    """
+    from PIL import Image, ImageOps
+
+    if os.path.getsize(path) > limits['max_bytes']:
+        raise InvalidImage(f"Images are limited to {limits['max_bytes']:,} bytes.")
+    try:
+        with Image.open(path) as original:
+            image_format = SAVED_AS.get(original.format, original.format)
+            if image_format not in FORMATS:
+                raise InvalidImage(f"Unsupported image format {original.format or 'unknown'}.")
+            width, height = original.size
+            if max(width, height) > limits['max_dimension'] or width * height > limits['max_pixels']:
+                raise InvalidImage(f'The image is too large ({width}x{height}).')
+            icc_profile = original.info.get('icc_profile')
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (Image.DecompressionBombError, Image.UnidentifiedImageError, OSError, SyntaxError) as exc:
+        raise InvalidImage(f'Not a readable image: {exc}')
+    extension, options = FORMATS[image_format]
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    # Nothing from the original's metadata is carried over except its colour profile.
+    image.save(buffer, image_format, icc_profile=icc_profile, **options)
+    return image_format, image.width, image.height, buffer.getvalue()
+
+
+def finish(upload_id, result):
+    """Store the processed image as an unapproved ``PlaceImage``, or record why it failed.
+
+    ``result`` returns ``process()``'s output or raises its error.
+    """
+    upload = ImageUpload.objects.get(pk=upload_id)
+    try:
+        image_format, _, _, data = result()
+    except InvalidImage as exc:
+        _fail(upload, str(exc))
+        return
+    except Exception:
+        logger.exception('Could not process image upload %s', upload_id)
+        _fail(upload, 'The image could not be processed.')
+        return
+    stem = os.path.splitext(upload.filename)[0] or 'image'
+    with transaction.atomic():
+        image = PlaceImage(place_id=upload.place_id, user_id=upload.user_id, is_approved=False)
+        image.image.save(f'{stem}.{FORMATS[image_format][0]}', ContentFile(data), save=False)
+        image.save()
+        ImageUpload.objects.filter(pk=upload.pk).update(
+            status=UploadStatus.DONE, image=image, updated_at=timezone.now(),
+        )
+    _remove_part(upload.pk)
+
+
+def _fail(upload, error):
+    ImageUpload.objects.filter(pk=upload.pk).update(
+        status=UploadStatus.FAILED, error=error[:255], updated_at=timezone.now(),
+    )
+    _remove_part(upload.pk)
+
+
+def _remove_part(upload_id):
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def expire(older_than):
+    """Delete uploads idle since ``older_than``, with any part file left behind; returns how many."""
+    stale = list(ImageUpload.objects.filter(updated_at__lt=older_than).values_list('pk', flat=True))
+    for upload_id in stale:
+        _remove_part(upload_id)
+    ImageUpload.objects.filter(pk__in=stale).delete()
+    return len(stale)
@@ -1,7 +1,31 @@
-from django.urls import path
+from django.urls import path, re_path
 
 from . import views
 
 urlpatterns = [
     path('', views.all_places),
+    path('places/nearby', views.places_nearby),
+    path('places/<int:pk>/', views.place_detail),
+    path('places/<int:pk>/similar', views.similar_places),
+    path('places/<int:pk>/forum', views.place_forum),
+    path('places/<int:pk>/images/uploads', views.start_image_upload),
+    path('images/uploads/<uuid:upload_id>', views.image_upload),
+    path('forum/<int:pk>/replies', views.thread_replies),
+    path('async/places', views.all_places_async),
+    path('async/places/<int:pk>/', views.place_detail_async),
+    path('search', views.search),
+    path('packages', views.package_catalogue),
+    path('packages/<int:pk>/book', views.book_package),
+    path('events', views.events_calendar),
+    path('events/<int:pk>/book', views.book_event),
+    re_path(r'^bookings/(?P<kind>package|event)/(?P<pk>[0-9]+)/(?P<action>confirm|cancel)$', views.change_booking),
+    path('users/<int:pk>/', views.user_profile),
+    path('me/feed', views.my_feed),
+    path('me/recommendations', views.my_recommendations),
+    path('me/notifications', views.my_notifications),
+    path('me/notifications/read-all', views.mark_all_notifications_read),
+    path('me/notifications/<int:pk>/read', views.mark_notification_read),
+    path('me/notifications/stream', views.notification_stream),
+    path('cache/stats', views.cache_stats),
+    path('metrics', views.performance_metrics),
 ]
\ No newline at end of file
@@ -1,14 +1,476 @@
-from django.shortcuts import render
-from .models import Place
-from .api_files.serializers import PlaceSerializer
+import asyncio
+import datetime
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from .models import (
+    Booking, Event, EventBooking, ForumPost, ForumReply, GuideLanguage, ImageUpload, Notification, Place, TravelPackage,
+    User,
+)
+from .api_files.serializers import (
+    ActivitySerializer, BookingRequestSerializer, BookingSerializer, CalendarEventSerializer, EventBookingSerializer,
+    ForumReplySerializer, ForumThreadSerializer, ImageUploadRequestSerializer, ImageUploadSerializer,
+    NearbyPlaceSerializer, NotificationSerializer,
+    PackageCatalogueSerializer, PlaceDetailSerializer, PlaceSerializer, ScoredPlaceSerializer, UserProfileSerializer,
+)
+from .api_files.async_api import async_api_view, json_response
+from .api_files.encoders import row_encoder
+from .api_files.pagination import apaginate_keyset, apply_cursor, paginate_keyset
+from .api_files.params import get_bool, get_choice, get_date, get_fields, get_float, get_int
+from .api_files.streaming import astream_json_array, stream_json_array
+from . import bookings
+from . import event_calendar
+from .cache import cache_response
+from . import cache as response_cache
+from .feed import read_feed
+from .forum import REPLY_ORDERING, THREAD_ORDERING
+from . import notifications
+from . import performance
+from .geo import nearby_places
+from .guides import language_codes
+from .queries import package_catalogue_queryset, place_detail_queryset
+from . import recommendations
+from . import search as search_index
+from . import uploads
+from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.exceptions import ValidationError
 
 # Create your views here.
 
 
+PLACE_ORDERINGS = {
+    'id': ('id',),
+    '-id': ('-id',),
+    'rating': ('rating_avg', 'id'),
+    '-rating': ('-rating_avg', '-id'),
+    'reviews': ('rating_count', 'id'),
+    '-reviews': ('-rating_count', '-id'),
+}
+
+
+def _place_list(request):
+    """The filtered place queryset, its ordering and the row encoder, for either list view.
+
+    Listings are read-only, so rows skip the model and the serializer
+    fields: the compiled ``PlaceSerializer`` encoder turns ``values_list()``
+    tuples into the same output, projected to ``?fields=``.
+    """
+    encoder = row_encoder(PlaceSerializer, get_fields(request, PlaceSerializer))
+    ordering = PLACE_ORDERINGS[get_choice(request, 'ordering', PLACE_ORDERINGS, 'id')]
+    places = Place.objects.all()
+    min_rating = get_float(request, 'min_rating', minimum=0, maximum=5)
+    if min_rating is not None:
+        places = places.filter(rating_avg__gte=min_rating)
+    min_reviews = get_int(request, 'min_reviews', minimum=0)
+    if min_reviews is not None:
+        places = places.filter(rating_count__gte=min_reviews)
+    return places, ordering, encoder
+
+
 @api_view(['GET'])
+@cache_response('places')
 def all_places(request):
-    places = Place.objects.all()
-    serializer = PlaceSerializer(places, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    places, ordering, encoder = _place_list(request)
+    if get_bool(request, 'stream'):
+        places = apply_cursor(request, places, ordering)
+        return stream_json_array(encoder, encoder.values(places))
+
+    rows, next_url = paginate_keyset(request, encoder.values(places, ordering), ordering, position=encoder.position)
+    return Response({'next': next_url, 'results': encoder.encode(rows)})
+
+
+@api_view(['GET'])
+@cache_response('place:{pk}')
+def place_detail(request, pk):
+    place = get_object_or_404(place_detail_queryset(), pk=pk)
+    serializer = PlaceDetailSerializer(place, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@cache_response('places')
+def places_nearby(request):
+    lat = get_float(request, 'lat', minimum=-90, maximum=90, required=True)
+    lng = get_float(request, 'lng', minimum=-180, maximum=180, required=True)
+    radius_km = get_float(request, 'radius_km', 10.0, minimum=0, maximum=500)
+    limit = get_int(request, 'limit', 20, minimum=1, maximum=100)
+    places = nearby_places(lat, lng, radius_km, limit)
+    serializer = NearbyPlaceSerializer(places, many=True)
+    return Response({'results': serializer.data})
+
+
+@api_view(['GET'])
+@cache_response('similar')
+def similar_places(request, pk):
+    limit = get_int(request, 'limit', 10, minimum=1, maximum=50)
+    places = recommendations.similar_places(pk, limit)
+    if not places:
+        get_object_or_404(Place.objects.only('id'), pk=pk)
+    return Response({'results': ScoredPlaceSerializer(places, many=True).data})
+
+
+@api_view(['GET'])
+@cache_response('place:{pk}')
+def place_forum(request, pk):
+    get_object_or_404(Place.objects.only('id'), pk=pk)
+    threads = ForumPost.objects.filter(place_id=pk).select_related('user')
+    threads, next_url = paginate_keyset(request, threads, THREAD_ORDERING, default_limit=20, max_limit=100)
+    serializer = ForumThreadSerializer(threads, many=True, context={'request': request})
+    return Response({'next': next_url, 'results': serializer.data})
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+@cache_response('thread:{pk}')
+def thread_replies(request, pk):
+    post = get_object_or_404(ForumPost.objects.only('id'), pk=pk)
+    if request.method == 'POST':
+        serializer = ForumReplySerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(post=post, user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    replies = ForumReply.objects.filter(post=post).select_related('user')
+    if get_bool(request, 'stream'):
+        # Long threads are written out as rows leave the cursor, never held in memory.
+        replies = apply_cursor(request, replies, REPLY_ORDERING)
+        return stream_json_array(ForumReplySerializer(context={'request': request}), replies)
+    replies, next_url = paginate_keyset(request, replies, REPLY_ORDERING, default_limit=50, max_limit=200)
+    serializer = ForumReplySerializer(replies, many=True, context={'request': request})
+    return Response({'next': next_url, 'results': serializer.data})
+
+
+# Native async versions of the place reads, for ASGI deployments. Rows come
+# from aiterator()/aget(), so a request only leaves the event loop while a
+# query runs, and serialization never touches the database: every relation is
+# prefetched first. Responses match the sync views byte for byte but skip the
+# response cache, whose backends are synchronous.
+
+@async_api_view()
+async def all_places_async(request):
+    places, ordering, encoder = _place_list(request)
+    if get_bool(request, 'stream'):
+        places = apply_cursor(request, places, ordering)
+        return astream_json_array(encoder, encoder.values(places))
+
+    rows, next_url = await apaginate_keyset(
+        request, encoder.values(places, ordering), ordering, position=encoder.position,
+    )
+    return json_response({'next': next_url, 'results': encoder.encode(rows)})
+
+
+@async_api_view()
+async def place_detail_async(request, pk):
+    place = await aget_object_or_404(place_detail_queryset(), pk=pk)
+    serializer = PlaceDetailSerializer(place, context={'request': request})
+    return json_response(serializer.data)
+
+
+CALENDAR_MAX_DAYS = 92
+
+
+@api_view(['GET'])
+@cache_response('events')
+def events_calendar(request):
+    """Events running between ``from`` and ``to`` (inclusive dates), grouped by day.
+
+    Each event is serialized once in ``events``; ``days`` lists, per date,
+    the ids of the events running that day.  Pages are keyset-ordered by
+    start, so a day can continue onto the next page.
+    """
+    first_day = get_date(request, 'from', required=True)
+    last_day = get_date(request, 'to', required=True)
+    if last_day < first_day:
+        raise ValidationError({'to': 'Must not be before from.'})
+    if last_day - first_day >= datetime.timedelta(days=CALENDAR_MAX_DAYS):
+        raise ValidationError({'to': f'At most {CALENDAR_MAX_DAYS} days can be requested at once.'})
+    start, end = event_calendar.days_of(first_day, last_day)
+    events = event_calendar.events_between(
+        start, end, country=request.query_params.get('country'), state=request.query_params.get('state'),
+        event_type=request.query_params.get('event_type'),
+    )
+    events, next_url = paginate_keyset(
+        request, events, event_calendar.CALENDAR_ORDERING, default_limit=100, max_limit=500,
+    )
+    return Response({
+        'from': first_day,
+        'to': last_day,
+        'next': next_url,
+        'days': event_calendar.group_by_day(events, first_day, last_day),
+        'events': CalendarEventSerializer(events, many=True).data,
+    })
+
+
+PACKAGE_ORDERINGS = {
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'id': ('id',),
+    '-id': ('-id',),
+}
+
+
+@api_view(['GET'])
+@cache_response('packages')
+def package_catalogue(request):
+    ordering = PACKAGE_ORDERINGS[get_choice(request, 'ordering', PACKAGE_ORDERINGS, 'price')]
+    packages = package_catalogue_queryset()
+    min_price = get_float(request, 'min_price', minimum=0)
+    if min_price is not None:
+        packages = packages.filter(price__gte=min_price)
+    max_price = get_float(request, 'max_price', minimum=0)
+    if max_price is not None:
+        packages = packages.filter(price__lte=max_price)
+    min_days = get_int(request, 'min_days', minimum=0)
+    if min_days is not None:
+        packages = packages.filter(duration__gte=min_days)
+    max_days = get_int(request, 'max_days', minimum=0)
+    if max_days is not None:
+        packages = packages.filter(duration__lte=max_days)
+    languages = language_codes(request.query_params.get('language'))
+    if languages:
+        # Guides speaking any of them; a subquery, so packages are not repeated.
+        packages = packages.filter(guide__in=GuideLanguage.objects.filter(code__in=languages).values('guide'))
+
+    packages, next_url = paginate_keyset(request, packages, ordering, default_limit=20, max_limit=100)
+    serializer = PackageCatalogueSerializer(packages, many=True, context={'request': request})
+    return Response({'next': next_url, 'results': serializer.data})
+
+
+@api_view(['GET'])
+@cache_response('search')
+def search(request):
+    text = request.query_params.get('q', '').strip()
+    if not text:
+        raise ValidationError({'q': 'This parameter is required.'})
+    kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+    unknown = set(kinds) - set(search_index.KIND_CODES)
+    if unknown:
+        raise ValidationError({'type': f"Must be one of: {', '.join(search_index.KIND_CODES)}."})
+    limit = get_int(request, 'limit', 20, minimum=1, maximum=100)
+    offset = get_int(request, 'offset', 0, minimum=0, maximum=1000)
+    results = search_index.search(text, kinds, limit, offset)
+    return Response({'results': results})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response(response_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def performance_metrics(request):
+    return Response(performance.route_metrics().snapshot())
+
+
+@api_view(['GET'])
+def user_profile(request, pk):
+    # Every count comes from the joined UserStats row: one primary-key read.
+    user = get_object_or_404(User.objects.select_related('stats'), pk=pk)
+    return Response(UserProfileSerializer(user, context={'request': request}).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_feed(request):
+    limit = get_int(request, 'limit', 20, minimum=1, maximum=100)
+    activities, cursor = read_feed(request.user.pk, request.query_params.get('cursor'), limit)
+    next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor else None
+    serializer = ActivitySerializer(activities, many=True, context={'request': request})
+    return Response({'next': next_url, 'results': serializer.data})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_recommendations(request):
+    limit = get_int(request, 'limit', 20, minimum=1, maximum=100)
+    places = recommendations.recommended_places(request.user.pk, limit)
+    return Response({'results': ScoredPlaceSerializer(places, many=True).data})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_notifications(request):
+    items = Notification.objects.filter(user=request.user)
+    if get_bool(request, 'unread'):
+        items = items.filter(is_read=False)
+    items, next_url = paginate_keyset(request, items, ('-id',), default_limit=20, max_limit=100)
+    serializer = NotificationSerializer(items, many=True)
+    return Response({
+        'unread_count': notifications.unread_count(request.user.pk),
+        'next': next_url,
+        'results': serializer.data,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_notification_read(request, pk):
+    get_object_or_404(Notification.objects.only('id'), pk=pk, user=request.user)
+    notifications.mark_read(request.user.pk, pk)
+    return Response({'unread_count': notifications.unread_count(request.user.pk)})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_all_notifications_read(request):
+    marked = notifications.mark_all_read(request.user.pk)
+    return Response({'marked': marked, 'unread_count': 0})
+
+
+async def notification_stream(request):
+    """Server-sent events for the current user's new notifications.
+
+    Resumes after ``Last-Event-ID`` (or ``?after=``).  The stream wakes when
+    this process writes a notification for the user and re-checks the
+    database at every heartbeat, which also covers writes from other workers.
+    Under WSGI an endless stream would be drained into memory by the worker,
+    so the backlog is sent as one finite response and the client reconnects
+    after ``retry``, i.e. long polling.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    if last_id and last_id.isdigit():
+        last_id = int(last_id)
+    else:
+        latest = await Notification.objects.filter(user=user).order_by('-id').values_list('id', flat=True).afirst()
+        last_id = latest or 0
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+    encode = JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+    async def backlog(after):
+        return [item async for item in Notification.objects.filter(user=user, id__gt=after).order_by('id')[:100]]
+
+    def event(item):
+        return f'id: {item.pk}\nevent: notification\ndata: {encode(NotificationSerializer(item).data)}\n\n'
+
+    if not isinstance(request, ASGIRequest):
+        body = ''.join(['retry: 5000\n\n', *map(event, await backlog(last_id))])
+        return HttpResponse(body, content_type='text/event-stream', headers=headers)
+
+    async def events():
+        nonlocal last_id
+        waiter = notifications.broker.subscribe(user.pk)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                waiter[1].clear()
+                batch = await backlog(last_id)
+                for item in batch:
+                    last_id = item.pk
+                    yield event(item)
+                if len(batch) == 100:
+                    continue
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+        finally:
+            notifications.broker.unsubscribe(user.pk, waiter)
+
+    return StreamingHttpResponse(events(), content_type='text/event-stream', headers=headers)
+
+
+BOOKING_RESOURCES = {
+    'package': (TravelPackage, Booking, BookingSerializer),
+    'event': (Event, EventBooking, EventBookingSerializer),
+}
+
+
+def _book(request, kind, pk):
+    resource_model, _, serializer_class = BOOKING_RESOURCES[kind]
+    resource = get_object_or_404(resource_model, pk=pk)
+    params = BookingRequestSerializer(data=request.data)
+    params.is_valid(raise_exception=True)
+    try:
+        booking, created = bookings.reserve(
+            resource, request.user.pk, params.validated_data['seats'],
+            idempotency_key=request.headers.get('Idempotency-Key'),
+            hold=params.validated_data['hold'],
+        )
+    except bookings.SoldOut as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+    return Response(
+        serializer_class(booking).data,
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def book_package(request, pk):
+    return _book(request, 'package', pk)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def book_event(request, pk):
+    return _book(request, 'event', pk)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def change_booking(request, kind, pk, action):
+    _, booking_model, serializer_class = BOOKING_RESOURCES[kind]
+    booking = get_object_or_404(booking_model, pk=pk, user=request.user)
+    try:
+        {'confirm': bookings.confirm, 'cancel': bookings.cancel}[action](booking)
+    except bookings.InvalidTransition as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+    booking.refresh_from_db()
+    return Response(serializer_class(booking).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_image_upload(request, pk):
+    place = get_object_or_404(Place.objects.only('id'), pk=pk)
+    params = ImageUploadRequestSerializer(data=request.data)
+    params.is_valid(raise_exception=True)
+    try:
+        upload = uploads.start(request.user, place, params.validated_data['filename'], params.validated_data['size'])
+    except uploads.UploadError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    data = ImageUploadSerializer(upload).data
+    data['max_chunk_size'] = uploads.max_chunk_size()
+    return Response(data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def image_upload(request, upload_id):
+    """Report an upload's progress, or append the chunk in the request body (see app/uploads.py)."""
+    upload = get_object_or_404(ImageUpload, pk=upload_id, user=request.user)
+    if request.method == 'PUT':
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        try:
+            offset, total = uploads.parse_content_range(request.headers.get('Content-Range', ''), length)
+            # request.stream is read as it arrives; request.data would buffer the whole body.
+            uploads.receive_chunk(upload, offset, total, request.stream, length)
+        except uploads.OffsetMismatch as exc:
+            return Response({'detail': str(exc), 'received': exc.received}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadClosed as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        except uploads.Busy as exc:
+            return Response(
+                {'detail': str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'},
+            )
+        except uploads.UploadError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(ImageUploadSerializer(upload).data)
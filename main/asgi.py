@@ -2,6 +2,11 @@
 ASGI config for main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve through it (e.g. ``uvicorn main.asgi:application``) to use the
+server-sent event endpoint at /app/me/notifications/stream, which holds
+connections open on the event loop instead of tying up a worker thread, and
+the native async place reads under /app/async/places. ``manage.py
+bench_servers`` compares this deployment with WSGI under load.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
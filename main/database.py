@@ -0,0 +1,76 @@
+"""SQLite connection profile and the router that spreads reads to a replica alias.
+
+Nothing from the apps is imported here: settings.py uses these helpers
+before any app is loaded.
+"""
+
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import connections
+
+
+READ_ALIAS = 'replica'
+WRITE_ALIAS = 'default'
+
+# Pragmas that persist in the database file and cannot be set read-only.
+PERSISTENT_PRAGMAS = {'journal_mode'}
+
+
+def read_only_name(path):
+    """A URI that opens ``path`` read-only (Django always connects with ``uri=True``)."""
+    return f'file:{quote(str(Path(path).resolve()))}?mode=ro'
+
+
+def sqlite_database(path, pragmas, timeout=20, read_only=False, conn_max_age=60, **extra):
+    """Build a ``DATABASES`` entry for ``path`` that runs ``pragmas`` on every new connection.
+
+    Writers use ``BEGIN IMMEDIATE`` so a transaction that will write waits for
+    the lock up front (honouring ``timeout``) instead of failing with
+    "database is locked" when it tries to upgrade a read lock.
+    """
+    if read_only:
+        pragmas = {name: value for name, value in pragmas.items() if name not in PERSISTENT_PRAGMAS}
+    options = {
+        'timeout': timeout,
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+    }
+    if not read_only:
+        options['transaction_mode'] = 'IMMEDIATE'
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': read_only_name(path) if read_only else path,
+        'OPTIONS': options,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': conn_max_age != 0,
+        **extra,
+    }
+
+
+class ReadReplicaRouter:
+    """Send reads to the read-only alias and everything else to ``default``.
+
+    Reads stay on ``default`` while it is inside ``transaction.atomic()`` so a
+    transaction always sees its own uncommitted writes, and everywhere when
+    ``SQLITE_READ_REPLICA`` is off.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not getattr(settings, 'SQLITE_READ_REPLICA', False)
+            or READ_ALIAS not in connections
+            or connections[WRITE_ALIAS].in_atomic_block
+        ):
+            return WRITE_ALIAS
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return WRITE_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database file.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == WRITE_ALIAS
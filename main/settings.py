@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from .database import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.performance.PerformanceMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,11 +79,98 @@ WSGI_APPLICATION = 'main.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# WAL lets readers run alongside the single writer; 'replica' is a read-only
+# connection to the same file that main.database.ReadReplicaRouter sends
+# reads to. Set SQLITE_READ_REPLICA = False to keep everything on 'default'.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable across crashes in WAL mode, fsyncs only at checkpoints
+    'busy_timeout': 20000,
+    'cache_size': -64000,  # negative = KiB, so 64 MB of page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_READ_REPLICA = True
+
 DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3', SQLITE_PRAGMAS),
+}
+if SQLITE_READ_REPLICA:
+    DATABASES['replica'] = sqlite_database(
+        BASE_DIR / 'db.sqlite3', SQLITE_PRAGMAS, read_only=True, TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['main.database.ReadReplicaRouter']
+
+
+# Caches
+# 'default' is per process; 'shared' is visible to every worker and holds the
+# response cache entries and the generation counters used to invalidate them.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_CACHE_LOCAL_ENTRIES = 1000
+RESPONSE_CACHE_SHARED_ALIAS = 'shared'
+
+
+# Activity feed (see app/feed.py). Activity is copied into followers' feeds
+# by FEED_WORKERS background threads (0 = inline); actors with more than
+# FEED_CELEBRITY_THRESHOLD followers are merged into feeds at read time.
+FEED_WORKERS = 1
+FEED_CELEBRITY_THRESHOLD = 5000
+FEED_BACKFILL = 50
+
+
+# Notifications (see app/notifications.py) are buffered in memory and written
+# in batches; 0 writes each one as soon as its transaction commits. A batch
+# that fails is retried, backing off, up to NOTIFICATION_MAX_ATTEMPTS times.
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_FLUSH_INTERVAL = 0.5
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_STREAM_HEARTBEAT = 15
+
+
+# Seconds a held (unconfirmed) booking keeps its seats; see app/bookings.py.
+BOOKING_HOLD_SECONDS = 600
+
+
+# Place recommendations (see app/recommendations.py), rebuilt offline by
+# `manage.py build_recommendations`: neighbours stored per place, and the
+# most interactions per user that count towards similarity.
+RECOMMENDATION_NEIGHBOURS = 20
+RECOMMENDATION_MAX_USER_PLACES = 500
+
+
+# Per-request instrumentation (see app/performance.py): the last
+# PERFORMANCE_WINDOW samples per route at /app/metrics, a warning for requests
+# repeating PERFORMANCE_DUPLICATE_WARNING or more queries, Server-Timing
+# headers for staff (for everyone with PERFORMANCE_SERVER_TIMING), and
+# ?profile=1 for staff, sampling every PERFORMANCE_PROFILE_INTERVAL seconds.
+PERFORMANCE_METRICS_ENABLED = True
+PERFORMANCE_SERVER_TIMING = False
+PERFORMANCE_WINDOW = 1000
+PERFORMANCE_DUPLICATE_WARNING = 5
+PERFORMANCE_PROFILE_INTERVAL = 0.001
+
+
+REST_FRAMEWORK = {
+    # The stock renderers, with JSON rendering timed by app.performance.
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.performance.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 
@@ -129,6 +219,37 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+# Image fields store one file per distinct content under MEDIA_ROOT/blobs
+# (see app/storage.py); collect_media_garbage removes unreferenced blobs
+# untouched for MEDIA_GC_GRACE_HOURS.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'blobs': {'BACKEND': 'app.storage.ContentAddressedStorage'},
+}
+MEDIA_GC_GRACE_HOURS = 24
+
+# Resized copies generated for every uploaded image (see app/renditions.py).
+# IMAGE_RENDITION_WORKERS = 0 renders inline, which is handy for tests.
+IMAGE_RENDITION_WIDTHS = [160, 320, 640, 1280]
+IMAGE_RENDITION_FORMATS = ['webp', 'jpeg']
+IMAGE_RENDITION_QUALITY = 80
+# Larger images are refused from their header instead of being decoded.
+IMAGE_RENDITION_MAX_PIXELS = 50_000_000
+IMAGE_RENDITION_WORKERS = 2
+IMAGE_RENDITION_MAX_PENDING = 64
+
+# Chunked place image uploads (see app/uploads.py). Parts are written to
+# IMAGE_UPLOAD_DIR and validated in IMAGE_UPLOAD_WORKERS processes, with at
+# most IMAGE_UPLOAD_MAX_PENDING queued; 0 workers validates inline.
+IMAGE_UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+IMAGE_UPLOAD_MAX_BYTES = 30 * 1024 * 1024
+IMAGE_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+IMAGE_UPLOAD_MAX_DIMENSION = 12000
+IMAGE_UPLOAD_MAX_PIXELS = 50_000_000
+IMAGE_UPLOAD_WORKERS = 2
+IMAGE_UPLOAD_MAX_PENDING = 16
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 